@@ -1,12 +1,31 @@
 import asyncio
 import random
+import time
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 import datetime
 import json
 import csv
 import os
-import tkinter as tk
-from tkinter import filedialog, messagebox
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from page_pool import PagePool, RssMonitor
+from route_filter import install_route_filter
+from browser_service import launch_or_attach, open_context, stats as browser_stats
+from readiness import wait_until_ready, wait_for_count_above, stats as readiness_stats
+from pacing import Pacer, make_pacer
+from html_parsing import parse_html, select, select_one, text_content
+from structured_data import ajio_listing_items, ajio_listing_pagination
+from card_schema import extract_cards
+from http_fetch import AsyncFetcher, NotModified
+from hybrid_fetch import HybridFetcher
+from record_stream import JsonlWriter, rebuild_json, rebuild_csv
+from frontier import Frontier
+from response_cache import ResponseCache
+from incremental import ProductFingerprints
+from dedup import DedupIndex
+from retry_queue import RetryQueue, DeadLetters, status_error
+from sharding import SHARD_BATCH_SIZE
+from metrics import stats as metrics
 
 
 
@@ -21,12 +40,65 @@ HEADERS_LIST = [
     "Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148"
 ]
 
+# Show the browser window; batch runs (run_job.py) switch this off
+HEADLESS = False
+# Max live PDP tabs at once; pages are reused across products and closed at the end
+PDP_PAGE_LIMIT = 6
+# Politeness: minimum gap between PDP navigations across all tabs
+PDP_PACE_SECONDS = 0.5
+# Let the PDP pacer tune request rate and tabs in flight from the responses (starting at PDP_PACE_SECONDS, up to
+# PDP_PAGE_LIMIT) and back off on 429/503, timeouts and captcha pages; False = fixed PDP_PACE_SECONDS gap
+ADAPTIVE_PACING = True
+# How long a scroll may take to bring in new cards before the listing is treated as exhausted
+SCROLL_WAIT_MS = 3000
+# How the DOM path reads cards: "batch" = every new card in one page.evaluate (card_schema.py),
+# "live" = ~10 locator reads per card, each waiting up to 1.5 s for a missing field
+LISTING_EXTRACT_MODE = "batch"
+# "dom" = scroll the grid and read each card, "capture" = read the product-list JSON the grid itself loads
+# (page.on("response")) and page through that API directly; falls back to "dom" if no such response shows up
+LISTING_MODE = "dom"
+# Responses whose URL matches this carry the grid's product list
+LISTING_API_PATTERN = re.compile(r"/api/(category|search)/")
+# How long to keep scrolling for the first product-list response before falling back to the DOM path
+LISTING_API_WAIT_MS = 8000
+# Politeness: minimum gap between product-list API pages in capture mode
+LISTING_API_PACE_SECONDS = 0.5
+# "hybrid" = plain HTTP first with a browser tab only as fallback, "browser" = always navigate a tab
+PDP_FETCH_MODE = "hybrid"
+# Append each merged listing + PDP record to ajio_final_data.jsonl as soon as its PDP is done;
+# at the end the JSONL, JSON and CSV are rewritten in listing order by the same merge as without it
+STREAM_OUTPUT = True
+# Listing links and PDP URLs are tracked in ajio_frontier.sqlite so an interrupted run resumes where it stopped
+RESUME = True
+# Dev aid: serve pages from the on-disk response cache (output folder / http_cache) while entries are fresh, so
+# re-running after a selector change re-parses without hitting the site
+USE_RESPONSE_CACHE = False
+# Products whose listing card (price, rating, ...) is unchanged since the last run reuse that run's PDP fields:
+# "skip" = no request, "revalidate" = conditional GET on the HTTP path, "off" = always fetch
+INCREMENTAL_MODE = "skip"
+# Remember every scraped product ID in an on-disk Bloom filter (ajio_seen_ids.bloom) and don't
+# queue PDPs for products an earlier run already scraped. Duplicates within a run are always dropped.
+DEDUP_ACROSS_RUNS = False
+# Attach to a running `python browser_service.py serve` (e.g. "http://127.0.0.1:9222") instead of launching Chromium
+BROWSER_ENDPOINT = None
+# Failed PDPs are set aside and retried once every product has had its first go, with exponential backoff and
+# jitter (retry_queue.py); whatever still fails goes to ajio_dead_letters.jsonl for `retry_queue.py replay` and
+# keeps just its listing fields in the final output. False = no retries, failures go straight to the dead-letter file.
+RETRY_FAILED = True
+# Per-stage timings and counters go to ajio_run_report.json at the end of every run (metrics.py); a path here
+# also writes them in Prometheus text format, e.g. into node_exporter's textfile directory for nightly runs
+PROMETHEUS_TEXTFILE = None
+
 
 
 # ----------------------------------------
 # GUI SECTION
 # ----------------------------------------
 def launch_gui():
+    # tkinter is only imported here so headless runs (run_job.py) never load it
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+
     ajio_links = []
     output_dir = ""
     max_products = 5
@@ -98,6 +170,7 @@ async def safe_text(locator, timeout=1500):
 # ----------------------------------------
 # LISTING SCRAPER
 # ----------------------------------------
+@metrics.timed("extract")
 async def extract_product_details(product, index):
     try:
         data_id = await product.get_attribute("data-id") or f"AJIO_{index + 1}"
@@ -151,31 +224,51 @@ async def scrape_ajio_from_link(page, url, product_limit):
     scroll_attempts = 0
 
     try:
-        await page.goto(url, timeout=60000, wait_until="domcontentloaded")
+        with metrics.timer("navigate"):
+            await page.goto(url, timeout=60000, wait_until="domcontentloaded")
+        metrics.count("pages")
         await page.wait_for_selector("#products", timeout=20000)
     except Exception as e:
         print(f"❌ Failed to load {url} - {e}")
         return []
 
     while len(all_data) < product_limit and scroll_attempts < max_scroll_attempts:
-        await asyncio.sleep(1)  # Let page settle
+        # Let page settle: first load waits for cards, later rounds wait for the scroll to add more
+        if last_product_count == 0:
+            await wait_until_ready(page, "ajio", "listing", replaces=1.0)
+        else:
+            await wait_for_count_above(page, '#products .item', last_product_count, replaces=2.0, timeout_ms=SCROLL_WAIT_MS)
 
-        products = await page.locator('#products .item').all()
-        current_count = len(products)
+        if LISTING_EXTRACT_MODE == "batch":
+            # One round trip for every card the last scroll added
+            new_cards = await extract_cards(page, "ajio", last_product_count)
+            current_count = last_product_count + len(new_cards)
+        else:
+            products = await page.locator('#products .item').all()
+            current_count = len(products)
         if current_count == last_product_count:
             scroll_attempts += 1
             print(f"🔄 No new products detected after scroll #{scroll_attempts}, stopping scrolling...")
             break  # No new products loaded
         scroll_attempts = 0  # Reset if new products found
 
-        new_products = products[last_product_count:]
+        if LISTING_EXTRACT_MODE == "batch":
+            timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            batch_data = []
+            for i, card in enumerate(new_cards, last_product_count):
+                if card["Data ID"] == "N/A":
+                    card["Data ID"] = f"AJIO_{i + 1}"
+                card["Date of Extraction"] = timestamp
+                batch_data.append(card)
+        else:
+            new_products = products[last_product_count:]
 
-        product_tasks = [
-            extract_product_details(product, i + last_product_count)
-            for i, product in enumerate(new_products)
-        ]
-        batch_data = await asyncio.gather(*product_tasks)
-        batch_data = [item for item in batch_data if item]
+            product_tasks = [
+                extract_product_details(product, i + last_product_count)
+                for i, product in enumerate(new_products)
+            ]
+            batch_data = await asyncio.gather(*product_tasks)
+            batch_data = [item for item in batch_data if item]
 
         all_data.extend(batch_data)
         if len(all_data) >= product_limit:
@@ -188,18 +281,158 @@ async def scrape_ajio_from_link(page, url, product_limit):
         await page.evaluate(f"window.scrollTo(0, {scroll_y})")
         print(f"⬇️ Scrolled to {scroll_y}px, collected {len(all_data)} products so far...")
 
-        await asyncio.sleep(1)
+    return all_data[:product_limit]
+
+
+def listing_api_page_url(api_url, page_no):
+    parts = urlsplit(api_url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "currentPage"]
+    return urlunsplit(parts._replace(query=urlencode(query + [("currentPage", str(page_no))])))
+
+
+async def wait_for_listing_response(page, captured):
+    # The first grid page is usually server-rendered, so keep scrolling until the grid asks the API for more
+    deadline = time.perf_counter() + LISTING_API_WAIT_MS / 1000
+    scroll_y = 0
+    while time.perf_counter() < deadline:
+        try:
+            return await asyncio.wait_for(captured.get(), 0.5)
+        except asyncio.TimeoutError:
+            scroll_y += 800
+            await page.evaluate(f"window.scrollTo(0, {scroll_y})")
+    return None, None
+
+
+async def scrape_ajio_from_api(page, url, product_limit):
+    # Capture mode: the URL of the first product-list response the page makes is the template for every page
+    # (currentPage=0, 1, ...), fetched with the page's own cookies until the limit or the last page
+    print(f"\n🌐 Starting capture scrape from: {url}")
+    captured = asyncio.Queue()
+
+    async def on_response(response):
+        if response.ok and LISTING_API_PATTERN.search(response.url):
+            try:
+                payload = await response.json()
+            except Exception:
+                return  # not JSON after all
+            # Facet / banner calls share the prefix; only product lists are of use
+            if isinstance(payload, dict) and "products" in payload:
+                captured.put_nowait((response.url, payload))
+
+    page.on("response", on_response)
+    try:
+        with metrics.timer("navigate"):
+            await page.goto(url, timeout=60000, wait_until="domcontentloaded")
+        metrics.count("pages")
+        api_url, payload = await wait_for_listing_response(page, captured)
+    except Exception as e:
+        print(f"❌ Failed to load {url} - {e}")
+        return []
+    finally:
+        page.remove_listener("response", on_response)
+    if api_url is None:
+        print(f"⚠️ No product-list response within {LISTING_API_WAIT_MS} ms, reading the grid from the DOM instead")
+        return await scrape_ajio_from_link(page, url, product_limit)
+
+    timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    current, total_pages = ajio_listing_pagination(payload)
+    payloads = {current: payload}
+    pacer = Pacer(LISTING_API_PACE_SECONDS)
+    all_data = []
+    seen = set()
+    page_no = 0
+    while len(all_data) < product_limit and (total_pages is None or page_no < total_pages):
+        payload = payloads.pop(page_no, None)
+        if payload is None:
+            await pacer.wait()
+            try:
+                with metrics.timer("fetch"):
+                    response = await page.request.get(listing_api_page_url(api_url, page_no), timeout=30000)
+                    payload = await response.json() if response.ok else None
+                if payload is not None:
+                    metrics.count("pages")
+            except Exception as e:
+                print(f"⚠️ Product-list page {page_no} failed - {e}")
+                payload = None
+            if payload is None:
+                break
+        total_pages = ajio_listing_pagination(payload)[1] or total_pages
+        with metrics.timer("parse"):
+            new_items = [item for item in ajio_listing_items(payload, timestamp) if item["Data ID"] not in seen]
+        if not new_items:
+            print(f"🔄 Product-list page {page_no} brought nothing new, stopping")
+            break
+        seen.update(item["Data ID"] for item in new_items)
+        all_data.extend(new_items)
+        print(f"📦 Product-list page {page_no + 1}/{total_pages or '?'}: {len(all_data)} products so far...")
+        page_no += 1
 
     return all_data[:product_limit]
 
 # ----------------------------------------
 # PDP SCRAPER
 # ----------------------------------------
-async def extract_pdp_details(page, product_url, index):
-    try:
-        await page.goto(product_url, timeout=60000)
-        await page.wait_for_selector(".prod-container", timeout=10000)
+@metrics.timed("parse")
+@metrics.timed("parse")
+def pdp_markup_complete(markup):
+    # The page's PDP fields when it has them, else None; fetch_pdp_details() uses them rather than parsing again
+    tree = parse_html(markup)
+    if select_one(tree, ".prod-container") is None or not select(tree, "section.prod-desc ul.prod-list li.detail-list"):
+        return None
+    return pdp_fields(tree, None)
+
+
+@metrics.timed("parse")
+def parse_pdp_html(markup, product_url):
+    # Offline twin of extract_pdp_details() for HTML that came over plain HTTP or from page.content()
+    return pdp_fields(parse_html(markup), product_url)
+
 
+def pdp_fields(tree, product_url):
+    if select_one(tree, ".prod-container") is None:
+        raise ValueError("PDP container missing")
+
+    sizes = []
+    for item in select(tree, ".size-variant-item.size-instock"):
+        size = text_content(select_one(item, "span")).strip()
+        if size:
+            sizes.append(size)
+
+    details = []
+    for item in select(tree, "section.prod-desc ul.prod-list li.detail-list"):
+        text = text_content(item).strip()
+        if text:
+            details.append(text)
+
+    return {
+        "Product URL": product_url,
+        "Sizes Available": ", ".join(sizes) if sizes else "N/A",
+        "Product Details": " | ".join(details) if details else "N/A",
+        "Date of Extraction": datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+async def fetch_pdp_details(hybrid, product_url, headers=None):
+    markup, fields = await hybrid.fetch_checked(product_url, headers)
+    if fields is None:
+        # Loaded in the browser, so not parsed yet
+        return parse_pdp_html(markup, product_url)
+    fields["Product URL"] = product_url
+    return fields
+
+
+async def extract_pdp_details(page, product_url, ticket):
+    # ticket: the pacer slot's, told the navigation's status so a 429 / 5xx counts as the site pushing back
+    with metrics.timer("navigate"):
+        response = await page.goto(product_url, timeout=60000)
+    metrics.count("pages")
+    status = response.status if response else None
+    ticket.report(status)
+    if status is not None and (status == 429 or status >= 500):
+        raise status_error(status)
+    await page.wait_for_selector(".prod-container", timeout=10000)
+
+    with metrics.timer("extract"):
         sizes = []
         size_items = await page.locator(".size-variant-item.size-instock").all()
         for item in size_items:
@@ -214,72 +447,242 @@ async def extract_pdp_details(page, product_url, index):
             if text:
                 details.append(text.strip())
 
-        return {
-            "Product URL": product_url,
-            "Sizes Available": ", ".join(sizes) if sizes else "N/A",
-            "Product Details": " | ".join(details) if details else "N/A",
-            "Date of Extraction": datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
-    except Exception as e:
-        print(f"⚠️ Error scraping PDP #{index + 1} ({product_url}): {e}")
-        return {
-            "Product URL": product_url,
-            "Sizes Available": "Error",
-            "Product Details": "Error",
-            "Date of Extraction": datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
+    return {
+        "Product URL": product_url,
+        "Sizes Available": ", ".join(sizes) if sizes else "N/A",
+        "Product Details": " | ".join(details) if details else "N/A",
+        "Date of Extraction": datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
 
 
 # ----------------------------------------
 # MAIN ORCHESTRATOR
 # ----------------------------------------
-async def main():
-    ajio_links, output_dir, max_products = launch_gui()
+def open_frontier(output_dir):
+    return Frontier(os.path.join(output_dir, "ajio_frontier.sqlite"), "ajio")
+
+def open_cache(output_dir):
+    return ResponseCache(os.path.join(output_dir, "http_cache")) if USE_RESPONSE_CACHE else None
+
+def open_fingerprints(output_dir):
+    return ProductFingerprints(os.path.join(output_dir, "ajio_fingerprints.sqlite"), "ajio", INCREMENTAL_MODE)
+
+def open_dedup(output_dir):
+    return DedupIndex("ajio", os.path.join(output_dir, "ajio_seen_ids.bloom") if DEDUP_ACROSS_RUNS else None, DEDUP_ACROSS_RUNS)
+
+def open_retries(output_dir, stage, queue):
+    dead_letters = DeadLetters(os.path.join(output_dir, "ajio_dead_letters.jsonl"), "ajio", getattr(queue, "path", None))
+    return RetryQueue(f"ajio {stage}", dead_letters, None if RETRY_FAILED else 1)
+
+async def open_browser(p, cache):
+    user_agent = random.choice(HEADERS_LIST)
+    browser = await launch_or_attach(p, HEADLESS, BROWSER_ENDPOINT)
+    context = await open_context(
+        browser,
+        user_agent=user_agent,
+        viewport={"width": 1280, "height": 800},
+        locale="en-US",
+        timezone_id="Asia/Kolkata",
+        java_script_enabled=True,
+        bypass_csp=True,
+        ignore_https_errors=True
+    )
+    route_stats = await install_route_filter(context, "ajio", cache=cache)
+    return browser, context, route_stats
+
+async def scrape_listing_links(queue, context, max_products, dedup=None):
+    # Claims links until none are left. With a dedup index each link's PDPs are queued as it finishes;
+    # sharded runs leave that to the parent process.
+    scrape_link = scrape_ajio_from_api if LISTING_MODE == "capture" else scrape_ajio_from_link
+    done = 0
+    scraped = 0
+    started = time.perf_counter()
+    for link, _ in queue.claims("listing"):
+        page = await context.new_page()
+        try:
+            link_started = time.perf_counter()
+            products = await scrape_link(page, link, max_products)
+            elapsed = time.perf_counter() - link_started
+            print(f"⚡ {len(products)} products in {elapsed:.1f}s ({len(products) / elapsed if elapsed else 0.0:.1f}/s, "
+                  f"{LISTING_MODE} mode)")
+            scraped += len(products)
+            metrics.count("listing_products", len(products))
+            queue.complete("listing", link, products)
+            done += 1
+            if dedup is not None:
+                # Duplicates are dropped here, before any PDP is fetched, rather than after the merge
+                queue.enqueue("pdp", [(p["Product URL"], p) for p in products
+                                      if p["Product URL"] != "N/A" and dedup.admit(p)])
+        except Exception as e:
+            print(f"❌ Error scraping listing from {link}: {e}")
+            metrics.count("errors")
+            queue.fail("listing", link, e)
+        await page.close()
+    if done:
+        elapsed = time.perf_counter() - started
+        print(f"⚡ Listing: {scraped} products from {done} link(s) in {elapsed:.1f}s "
+              f"({scraped / elapsed if elapsed else 0.0:.1f} products/s, {LISTING_MODE} mode)")
+    return done
+
+def plan_pdp(product, fingerprints):
+    # Decided once per product, before its first attempt; retries reuse the decision
+    return fingerprints.plan(product, can_revalidate=PDP_FETCH_MODE == "hybrid")
+
+async def fetch_pdp(product, action, hybrid, pool, pacer, fingerprints):
+    # One attempt at a product's PDP fields, as plan_pdp() decided; raises if they could not be fetched or parsed.
+    # Returns (pdp, fetched), fetched being False when last run's fields were reused.
+    url = product["Product URL"]
+    if action == "skip":
+        return fingerprints.reuse(product), False
+    if PDP_FETCH_MODE == "hybrid":
+        headers = fingerprints.conditional_headers(product) if action == "revalidate" else None
+        try:
+            return await fetch_pdp_details(hybrid, url, headers), True
+        except NotModified:
+            return fingerprints.reuse(product, not_modified=True), False
+    # An exception leaving the pacer slot is reported to it as that error
+    async with pool.page() as page, pacer.slot() as ticket:
+        return await extract_pdp_details(page, url, ticket), True
+
+def save_pdp(product, pdp, fetched, hybrid, fingerprints, queue, sink=None):
+    url = product["Product URL"]
+    queue.complete("pdp", url, pdp)
+    metrics.count("products")
+    if fetched:
+        fingerprints.record(product, pdp, hybrid.validators.get(url))
+    else:
+        metrics.count("products_reused")
+    # The batch merge in scrape_ajio() one record at a time, in completion order
+    if sink is not None:
+        sink.write({**product, **pdp})
+
+def drop_pdp(product, error, queue, sink=None):
+    # Given up on: the URL stays open for the next run, and the merged output keeps just the listing fields
+    queue.fail("pdp", product["Product URL"], error)
+    if sink is not None:
+        sink.write(dict(product))
+
+async def scrape_pdp_item(idx, product, hybrid, pool, pacer, fingerprints, queue, sink=None, retries=None):
+    url = product["Product URL"]
+    action = plan_pdp(product, fingerprints)
+    try:
+        pdp, fetched = await fetch_pdp(product, action, hybrid, pool, pacer, fingerprints)
+    except Exception as e:
+        print(f"⚠️ Error scraping PDP #{idx + 1} ({url}): {e}")
+        if retries is not None:
+            # Retried by retry_pdp_items() once every product has had its first go, with the same plan;
+            # a dead-lettered product goes back on the frontier as just the listing item
+            retries.push("pdp", url, (product, action), e,
+                         replay={"kind": "pdp", "url": url, "payload": product, "redo": False})
+        else:
+            drop_pdp(product, e, queue, sink)
+        return None
+    save_pdp(product, pdp, fetched, hybrid, fingerprints, queue, sink)
+    return pdp
+
+async def retry_pdp_items(retries, hybrid, pool, pacer, fingerprints, queue, sink=None):
+    async def retry(item):
+        product, action = item.payload
+        pdp, fetched = await fetch_pdp(product, action, hybrid, pool, pacer, fingerprints)
+        save_pdp(product, pdp, fetched, hybrid, fingerprints, queue, sink)
+
+    await retries.drain(retry, lambda item: drop_pdp(item.payload[0], item.errors[-1], queue, sink))
+
+async def scrape_ajio(ajio_links, output_dir, max_products):
     os.makedirs(output_dir, exist_ok=True)
+    metrics.reset("ajio")
+    frontier = open_frontier(output_dir).begin(fresh=not RESUME)
+    frontier.enqueue("listing", ajio_links)
+    cache = open_cache(output_dir)
+    fingerprints = open_fingerprints(output_dir)
+    dedup = open_dedup(output_dir)
+    dedup.seed(frontier.payloads("pdp"))
 
     async with async_playwright() as p:
-        user_agent = random.choice(HEADERS_LIST)
-        browser = await p.chromium.launch(headless=False)
-        context = await browser.new_context(
-            user_agent=user_agent,
-            viewport={"width": 1280, "height": 800},
-            locale="en-US",
-            timezone_id="Asia/Kolkata",
-            java_script_enabled=True,
-            bypass_csp=True,
-            ignore_https_errors=True
-        )
-
-
-        final_listing_data = []
-        for link in ajio_links:
-            page = await context.new_page()
-            try:
-                products = await scrape_ajio_from_link(page, link, max_products)
-                final_listing_data.extend(products)
-            except Exception as e:
-                print(f"❌ Error scraping listing from {link}: {e}")
-            await page.close()
+        browser, context, route_stats = await open_browser(p, cache)
+
+        # Links finished by an interrupted run are not claimed again
+        await scrape_listing_links(frontier, context, max_products, dedup)
+        final_listing_data = [product for products in frontier.results("listing") for product in products]
+        print(frontier.summary("listing"))
 
         # Save listing JSON
         listing_path = os.path.join(output_dir, "ajio_data.json")
-        with open(listing_path, "w", encoding="utf-8") as jf:
+        with metrics.timer("write"), open(listing_path, "w", encoding="utf-8") as jf:
             json.dump(final_listing_data, jf, indent=4, ensure_ascii=False)
         print(f"\n✅ Total listing products scraped: {len(final_listing_data)}")
 
         # PDP Scraping with limited concurrency to avoid overload
-        pdp_tasks = [
-            extract_pdp_details(await context.new_page(), product["Product URL"], idx)
-            for idx, product in enumerate(final_listing_data)
-            ]
-        pdp_data = await asyncio.gather(*pdp_tasks)
+        pool = PagePool(context, PDP_PAGE_LIMIT)
+        pacer = make_pacer("ajio pdp", PDP_PACE_SECONDS, adaptive=ADAPTIVE_PACING, max_concurrency=PDP_PAGE_LIMIT)
+        rss_monitor = RssMonitor().start()
+        http = AsyncFetcher(concurrency=PDP_PAGE_LIMIT, per_host=PDP_PAGE_LIMIT, host_delay=0, cache=cache)
+        hybrid = HybridFetcher("ajio", "pdp", http, pdp_markup_complete, pool, pacer)
+        final_jsonl_path = os.path.join(output_dir, "ajio_final_data.jsonl")
+        sink = JsonlWriter(final_jsonl_path) if STREAM_OUTPUT else None
+        listing_by_url = {}
+        for product in final_listing_data:
+            listing_by_url.setdefault(product["Product URL"], product)
+        if sink is not None:
+            # PDPs finished by an interrupted run go back into the fresh stream first; those it gave up on
+            # (attempts used up, so not claimed again) keep just their listing fields, as drop_pdp() writes them
+            for pdp in frontier.results("pdp"):
+                sink.write({**listing_by_url.get(pdp["Product URL"], {}), **pdp})
+            for product in frontier.payloads("pdp", "failed"):
+                sink.write(dict(product))
+
+        # Only PDPs not finished by an earlier run are claimed
+        pending = frontier.claim("pdp")
+        retries = open_retries(output_dir, "pdp", frontier)
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(
+                scrape_pdp_item(idx, product, hybrid, pool, pacer, fingerprints, frontier, sink, retries)
+                for idx, (_, product) in enumerate(pending)))
+            await retry_pdp_items(retries, hybrid, pool, pacer, fingerprints, frontier, sink)
+        finally:
+            if sink is not None:
+                sink.close()
+        elapsed = time.perf_counter() - started
+        pdp_data = list(frontier.results("pdp"))
+        await pool.close()
+        await http.aclose()
+        peak_rss = await rss_monitor.stop()
+
+        rate = len(pending) / elapsed if elapsed else 0.0
+        print(f"⚡ PDP throughput: {len(pending)} pages in {elapsed:.1f}s ({rate:.2f} pages/s), "
+              f"{pool.pages_opened} tabs opened (limit {PDP_PAGE_LIMIT}), "
+              f"peak browser RSS {peak_rss / 1e6:.0f} MB")
+        print(route_stats.summary())
+        print(pacer.summary())
+        print(retries.summary())
+        print(browser_stats.summary())
+        print(readiness_stats.summary())
+        if PDP_FETCH_MODE == "hybrid":
+            print(hybrid.summary())
+            hybrid.save_paths(os.path.join(output_dir, "ajio_fetch_paths.json"))
         # Save PDP JSON
         pdp_path = os.path.join(output_dir, "ajio_pdp_data.json")
-        with open(pdp_path, "w", encoding="utf-8") as jf:
+        with metrics.timer("write"), open(pdp_path, "w", encoding="utf-8") as jf:
             json.dump(pdp_data, jf, indent=4, ensure_ascii=False)
 
         await browser.close()
 
+    final_json_path = os.path.join(output_dir, "ajio_final_data.json")
+    final_csv_path = os.path.join(output_dir, "ajio_final_data.csv")
+    print(frontier.summary("pdp"))
+    for product in frontier.payloads("pdp", "done"):
+        dedup.remember(product)
+    frontier.finish()
+    frontier.close()
+    if cache is not None:
+        print(cache.summary())
+        cache.close()
+    print(fingerprints.summary())
+    fingerprints.close()
+    print(dedup.summary())
+    dedup.close()
+
     # Merge listing and PDP data on Product URL
     pdp_map = {item["Product URL"]: item for item in pdp_data if item}
     merged_data = []
@@ -298,14 +701,25 @@ async def main():
     duplicates_removed = len(final_listing_data) - len(merged_data)
     print(f"\n🧹 Removed {duplicates_removed} duplicate products.")
     
+    if STREAM_OUTPUT:
+        print(sink.summary())
+        # The stream is in completion order; rewritten in listing order, then the JSON / CSV rebuilt from it
+        with JsonlWriter(final_jsonl_path) as final_sink:
+            for merged in merged_data:
+                final_sink.write(merged)
+        rebuild_json(final_jsonl_path, final_json_path)
+        rebuild_csv(final_jsonl_path, final_csv_path)
+        print(f"\n📂 Final JSON saved to: {final_json_path}")
+        print(f"📂 Final CSV saved to: {final_csv_path}")
+        write_run_report(output_dir)
+        return
+
     # Save final merged JSON and CSV
-    final_json_path = os.path.join(output_dir, "ajio_final_data.json")
-    with open(final_json_path, "w", encoding="utf-8") as jf:
+    with metrics.timer("write"), open(final_json_path, "w", encoding="utf-8") as jf:
         json.dump(merged_data, jf, indent=4, ensure_ascii=False)
 
-    final_csv_path = os.path.join(output_dir, "ajio_final_data.csv")
     if merged_data:
-        with open(final_csv_path, "w", newline="", encoding="utf-8") as cf:
+        with metrics.timer("write"), open(final_csv_path, "w", newline="", encoding="utf-8") as cf:
             # Ensure consistent CSV columns by collecting all keys from merged_data dicts
             fieldnames = sorted({key for d in merged_data for key in d.keys()})
             writer = csv.DictWriter(cf, fieldnames=fieldnames)
@@ -316,6 +730,99 @@ async def main():
 
     print(f"\n📂 Final JSON saved to: {final_json_path}")
     print(f"📂 Final CSV saved to: {final_csv_path}")
+    write_run_report(output_dir)
+
+# ----------------------------------------
+# SHARDED RUNS (sharding.py)
+# ----------------------------------------
+async def listing_worker(queue, output_dir, max_products=None):
+    cache = open_cache(output_dir)
+    try:
+        async with async_playwright() as p:
+            browser, context, route_stats = await open_browser(p, cache)
+            done = await scrape_listing_links(queue, context, max_products or 5)
+            print(route_stats.summary())
+            print(browser_stats.summary())
+            await browser.close()
+    finally:
+        if cache is not None:
+            cache.close()
+    return done
+
+async def pdp_worker(queue, output_dir):
+    cache = open_cache(output_dir)
+    fingerprints = open_fingerprints(output_dir)
+    claimed = 0
+    try:
+        async with async_playwright() as p:
+            browser, context, route_stats = await open_browser(p, cache)
+            pool = PagePool(context, PDP_PAGE_LIMIT)
+            pacer = make_pacer("ajio pdp", PDP_PACE_SECONDS, adaptive=ADAPTIVE_PACING, max_concurrency=PDP_PAGE_LIMIT)
+            retries = open_retries(output_dir, "pdp", queue)
+            async with AsyncFetcher(concurrency=PDP_PAGE_LIMIT, per_host=PDP_PAGE_LIMIT, host_delay=0, cache=cache) as http:
+                hybrid = HybridFetcher("ajio", "pdp", http, pdp_markup_complete, pool, pacer)
+                # A batch at a time so other processes can take the rest; each batch's failures are retried before the next
+                while True:
+                    batch = queue.claim("pdp", SHARD_BATCH_SIZE)
+                    if not batch:
+                        break
+                    await asyncio.gather(*(
+                        scrape_pdp_item(claimed + idx, product, hybrid, pool, pacer, fingerprints, queue, retries=retries)
+                        for idx, (_, product) in enumerate(batch)))
+                    await retry_pdp_items(retries, hybrid, pool, pacer, fingerprints, queue)
+                    claimed += len(batch)
+            await pool.close()
+            print(route_stats.summary())
+            print(pacer.summary())
+            print(retries.summary())
+            print(browser_stats.summary())
+            if PDP_FETCH_MODE == "hybrid":
+                print(hybrid.summary())
+            await browser.close()
+    finally:
+        if cache is not None:
+            cache.close()
+        print(fingerprints.summary())
+        fingerprints.close()
+    return claimed
+
+def write_outputs(frontier, output_dir):
+    listing = [product for products in frontier.results("listing") for product in products]
+    with metrics.timer("write"), open(os.path.join(output_dir, "ajio_data.json"), "w", encoding="utf-8") as jf:
+        json.dump(listing, jf, indent=4, ensure_ascii=False)
+    pdp_data = list(frontier.results("pdp"))
+    with metrics.timer("write"), open(os.path.join(output_dir, "ajio_pdp_data.json"), "w", encoding="utf-8") as jf:
+        json.dump(pdp_data, jf, indent=4, ensure_ascii=False)
+
+    # The same merge as scrape_ajio(): every listed product once, in listing order, with its PDP fields if it got them
+    pdp_map = {item["Product URL"]: item for item in pdp_data if item}
+    seen_urls = set()
+    final_jsonl_path = os.path.join(output_dir, "ajio_final_data.jsonl")
+    final_json_path = os.path.join(output_dir, "ajio_final_data.json")
+    final_csv_path = os.path.join(output_dir, "ajio_final_data.csv")
+    with JsonlWriter(final_jsonl_path) as sink:
+        for product in listing:
+            url = product["Product URL"]
+            if url in seen_urls:
+                continue
+            seen_urls.add(url)
+            sink.write({**product, **pdp_map.get(url, {})})
+    rebuild_json(final_jsonl_path, final_json_path)
+    rebuild_csv(final_jsonl_path, final_csv_path)
+    print(f"\n📂 Final JSON saved to: {final_json_path}")
+    print(f"📂 Final CSV saved to: {final_csv_path}")
+
+def write_run_report(output_dir):
+    print(metrics.summary())
+    metrics.write_report(os.path.join(output_dir, "ajio_run_report.json"), PROMETHEUS_TEXTFILE)
+
+async def main():
+    ajio_links, output_dir, max_products = launch_gui()
+    await scrape_ajio(ajio_links, output_dir, max_products)
+
+def run_pipeline(links, output_dir, max_products=5):
+    # Same run as the GUI starts, with the GUI's inputs passed in directly
+    asyncio.run(scrape_ajio(list(links), output_dir, max_products))
 
 # ----------------------------------------
 # Run Everything
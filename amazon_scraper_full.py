@@ -2,17 +2,79 @@ import asyncio
 import os
 import re
 import json
+import time
 import datetime
-import tkinter as tk
-from tkinter import filedialog, messagebox
-from playwright.sync_api import sync_playwright
+from html_parsing import parse_html, select, select_one, inner_text
+from route_filter import RouteStats
+from readiness import wait_until_ready, stats as readiness_stats
+from pacing import make_pacer, paced
+from structured_data import amazon_pdp_fields
+from http_fetch import AsyncFetcher
+from hybrid_fetch import LazyBrowser, HybridFetcher
+from browser_service import ContextPool, stats as browser_stats
+from record_stream import JsonlWriter, rebuild_json
+from frontier import Frontier
+from response_cache import ResponseCache
+from incremental import ProductFingerprints
+from dedup import DedupIndex
+from retry_queue import RetryQueue, DeadLetters
+from sharding import SHARD_BATCH_SIZE
+from metrics import stats as metrics
 
 # Global variables set by GUI
 category_links = []
 PRODUCTS_PER_LINK = 5
 output_dir = ""
 
+# "snapshot" = one page.content() per listing page parsed offline with lxml, "live" = per-element queries
+LISTING_PARSE_MODE = "snapshot"
+# "snapshot" = one page.content() per PDP parsed offline in a single pass, "live" = per-element queries
+PDP_PARSE_MODE = "snapshot"
+
+# PDP worker pool settings
+PDP_WORKERS = 6             # workers pulling PDP jobs off the shared queue
+PDP_CONTEXTS = 2            # browser contexts the workers are spread across
+MAX_PAGES_PER_CONTEXT = 3   # live PDP pages allowed inside one context
+MAX_PAGES_PER_BROWSER = 6   # live PDP pages allowed across the whole browser
+
+# Politeness: minimum gap between listing page loads ...
+PAGE_PACE_SECONDS = 1.0
+# ... and between PDP navigations, shared by every PDP worker
+PDP_PACE_SECONDS = 0.5
+# Let the pacers tune request rate and pages in flight from the responses (starting at the gaps above, PDPs up to
+# MAX_PAGES_PER_BROWSER) and back off on 503s, timeouts and robot checks; False = fixed gaps
+ADAPTIVE_PACING = True
+
+# Append each finished PDP to Amazon_full_data.jsonl as it completes; at the end the JSONL and the pretty JSON
+# are rewritten from the frontier in listing order
+STREAM_OUTPUT = True
+# Keep category links and PDP URLs in Amazon_frontier.sqlite so an interrupted run resumes where it stopped
+RESUME = True
+# Dev aid: serve pages from the on-disk response cache (output folder / http_cache) while entries are fresh, so
+# re-running after a selector change re-parses without hitting the site
+USE_RESPONSE_CACHE = False
+# Products whose listing card (price, rating, ...) is unchanged since the last run reuse that run's PDP fields
+# without opening a page ("skip"), or are always fetched ("off"). PDPs only load in the browser here, so
+# "revalidate" behaves like "skip".
+INCREMENTAL_MODE = "skip"
+# Remember every scraped product ID in an on-disk Bloom filter (Amazon_seen_ids.bloom) and don't
+# queue PDPs for products an earlier run already scraped. Duplicates within a run are always dropped.
+DEDUP_ACROSS_RUNS = False
+# Attach to a running `python browser_service.py serve` (e.g. "http://127.0.0.1:9222") instead of launching Chromium
+BROWSER_ENDPOINT = None
+# Failed listing pages and PDPs are set aside and retried once the main pass is done, with exponential backoff and
+# jitter (retry_queue.py); whatever still fails goes to Amazon_dead_letters.jsonl for `retry_queue.py replay`.
+# False = no retries, failures go straight to the dead-letter file.
+RETRY_FAILED = True
+# Per-stage timings and counters go to Amazon_run_report.json at the end of every run (metrics.py); a path here
+# also writes them in Prometheus text format, e.g. into node_exporter's textfile directory for nightly runs
+PROMETHEUS_TEXTFILE = None
+
 def start_gui():
+    # tkinter is only imported here so headless runs (run_job.py) never load it
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+
     def add_link():
         link = link_entry.get().strip()
         if link:
@@ -61,45 +123,96 @@ def start_gui():
 
     root.mainloop()
 
-def extract_listing_data(page):
+# Keyword mappings for bullet-based extraction
+KEYWORD_MAP = {
+    "Fabric Info": ["fabric", "kurta and bottom fabric"],
+    "Color Info": ["color :-", "color"],
+    "Style Info": ["style"],
+    "Length Info": ["length"],
+    "Sleeve Info": ["sleeves"],
+    "Size Chart": ["size chart"],
+    "Includes Info": ["this set includes"],
+    "Work/Design Info": ["work :-", "work"],
+    "Neck Style": ["neck style:-", "neck style"],
+    "Color Disclaimer": ["colour declaration"],
+    "Occasion / Usage": ["occasion", "ocassion"],
+    "Brand Mention / CTA": ["click on brand name"]
+}
+
+ADDITIONAL_DETAIL_KEYS = frozenset([
+    "Manufacturer", "Item Weight", "Product Dimensions", "Country of Origin",
+    "Packer", "Importer", "Net Quantity", "Included Components"
+])
+
+PRODUCT_AND_SELLER_KEYS = frozenset([
+    "Product Dimensions", "Date First Available", "Manufacturer", "ASIN",
+    "Item model number", "Country of Origin", "Department", "Packer",
+    "Importer", "Item Weight", "Item Dimensions LxWxH", "Net Quantity",
+    "Included Components", "Generic Name"
+])
+
+def compile_keyword_matcher(keyword_map):
+    # One regex alternation, one named group per label, wrapped in a lookahead so a single
+    # finditer() reports every keyword hit in a bullet, overlapping ones included ("neck style" / "style")
+    groups = []
+    for i, keywords in enumerate(keyword_map.values()):
+        alternatives = sorted({kw.lower().rstrip(":") for kw in keywords}, key=len, reverse=True)
+        groups.append(f"(?P<k{i}>{'|'.join(re.escape(kw) for kw in alternatives)})")
+    return re.compile(f"(?=(?:{'|'.join(groups)}))")
+
+KEYWORD_MATCHER = compile_keyword_matcher(KEYWORD_MAP)
+KEYWORD_LABELS = list(KEYWORD_MAP)
+
+def classify_bullets(bullets):
+    # Same answer as checking every label against every bullet: each label gets the first bullet that mentions it
+    found = {}
+    for text in bullets:
+        for match in KEYWORD_MATCHER.finditer(text.lower()):
+            found.setdefault(KEYWORD_LABELS[int(match.lastgroup[1:])], text)
+        if len(found) == len(KEYWORD_LABELS):
+            break
+    return {label: found[label] for label in KEYWORD_LABELS if label in found}
+
+@metrics.timed("extract")
+async def extract_listing_data(page):
     products = []
-    items = page.query_selector_all('div[data-asin]')
+    items = await page.query_selector_all('div[data-asin]')
     for item in items:
         try:
-            data_id = item.get_attribute("data-asin").strip()
+            data_id = (await item.get_attribute("data-asin")).strip()
             if not data_id:
                 continue
 
-            product_url = item.query_selector("a.a-link-normal.s-line-clamp-2.s-link-style.a-text-normal")
-            product_href = product_url.get_attribute("href") if product_url else ""
+            product_url = await item.query_selector("a.a-link-normal.s-line-clamp-2.s-link-style.a-text-normal")
+            product_href = await product_url.get_attribute("href") if product_url else ""
             full_url = f"https://www.amazon.in{product_href}" if product_href else ""
 
-            brand_elem = item.query_selector("span.a-size-base-plus.a-color-base")
-            brand_name = brand_elem.inner_text().strip() if brand_elem else ""
+            brand_elem = await item.query_selector("span.a-size-base-plus.a-color-base")
+            brand_name = (await brand_elem.inner_text()).strip() if brand_elem else ""
 
-            product_name_elem = item.query_selector("a.a-link-normal.s-line-clamp-2.s-link-style.a-text-normal h2 span")
-            product_name = product_name_elem.inner_text().strip() if product_name_elem else ""
+            product_name_elem = await item.query_selector("a.a-link-normal.s-line-clamp-2.s-link-style.a-text-normal h2 span")
+            product_name = (await product_name_elem.inner_text()).strip() if product_name_elem else ""
 
-            rating_elem = item.query_selector("span.a-icon-alt")
-            rating = rating_elem.inner_text().strip() if rating_elem else ""
+            rating_elem = await item.query_selector("span.a-icon-alt")
+            rating = (await rating_elem.inner_text()).strip() if rating_elem else ""
 
-            rating_count_elem = item.query_selector("span.a-size-base.s-underline-text")
-            rating_count = rating_count_elem.inner_text().strip() if rating_count_elem else ""
+            rating_count_elem = await item.query_selector("span.a-size-base.s-underline-text")
+            rating_count = (await rating_count_elem.inner_text()).strip() if rating_count_elem else ""
 
-            price_elems = item.query_selector_all("span.a-price span.a-offscreen")
-            prices = [p.inner_text().strip().replace("₹", "").replace(",", "") for p in price_elems]
+            price_elems = await item.query_selector_all("span.a-price span.a-offscreen")
+            prices = [(await p.inner_text()).strip().replace("₹", "").replace(",", "") for p in price_elems]
             price = float(prices[0]) if prices else None
 
-            original_price_elems = item.query_selector_all("span.a-text-price span.a-offscreen")
-            original_prices = [p.inner_text().strip().replace("₹", "").replace(",", "") for p in original_price_elems]
+            original_price_elems = await item.query_selector_all("span.a-text-price span.a-offscreen")
+            original_prices = [(await p.inner_text()).strip().replace("₹", "").replace(",", "") for p in original_price_elems]
             original_price = float(original_prices[0]) if original_prices else None
 
-            discount_elem = item.query_selector("span.savingsPercentage")
+            discount_elem = await item.query_selector("span.savingsPercentage")
             if not discount_elem:
-                discount_elem = item.query_selector("span.s-price-instructions-style span.a-color-price")
+                discount_elem = await item.query_selector("span.s-price-instructions-style span.a-color-price")
 
             if discount_elem:
-                discount = discount_elem.inner_text().strip()
+                discount = (await discount_elem.inner_text()).strip()
             elif original_price and price:
                 percent = int(round(((original_price - price) / original_price) * 100))
                 discount = f"{percent}% off"
@@ -107,19 +220,19 @@ def extract_listing_data(page):
                 discount = ""
 
             badge_text = ""
-            badge_container = item.query_selector("div.puis-status-badge-container")
+            badge_container = await item.query_selector("div.puis-status-badge-container")
             if badge_container:
-                badge_label_span = badge_container.query_selector("span.a-badge-text")
+                badge_label_span = await badge_container.query_selector("span.a-badge-text")
                 if badge_label_span:
-                    badge_text = badge_label_span.inner_text().strip()
+                    badge_text = (await badge_label_span.inner_text()).strip()
 
             if not badge_text:
-                amazons_choice_span = item.query_selector("span.a-badge[aria-labelledby$='-amazons-choice-label']")
+                amazons_choice_span = await item.query_selector("span.a-badge[aria-labelledby$='-amazons-choice-label']")
                 if amazons_choice_span:
-                    label_elem = amazons_choice_span.query_selector("span.a-badge-label")
-                    supplementary_elem = amazons_choice_span.query_selector("span.a-badge-supplementary-text")
-                    label_text = label_elem.inner_text().strip() if label_elem else ""
-                    supplementary_text = supplementary_elem.inner_text().strip() if supplementary_elem else ""
+                    label_elem = await amazons_choice_span.query_selector("span.a-badge-label")
+                    supplementary_elem = await amazons_choice_span.query_selector("span.a-badge-supplementary-text")
+                    label_text = (await label_elem.inner_text()).strip() if label_elem else ""
+                    supplementary_text = (await supplementary_elem.inner_text()).strip() if supplementary_elem else ""
                     badge_text = f"{label_text} {supplementary_text}".strip()
 
             timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -142,29 +255,100 @@ def extract_listing_data(page):
         except Exception as e:
             print(f"Error extracting product: {e}")
     return products
-def extract_pdp_data(page):
-    def get_all_facts():
+
+@metrics.timed("parse")
+def parse_listing_html(markup):
+    # Offline twin of extract_listing_data(): same selectors, same output, zero browser round trips per card
+    products = []
+    tree = parse_html(markup)
+    for item in select(tree, "div[data-asin]"):
+        try:
+            data_id = item.get("data-asin").strip()
+            if not data_id:
+                continue
+
+            product_url = select_one(item, "a.a-link-normal.s-line-clamp-2.s-link-style.a-text-normal")
+            product_href = product_url.get("href") if product_url is not None else ""
+            full_url = f"https://www.amazon.in{product_href}" if product_href else ""
+
+            brand_name = inner_text(select_one(item, "span.a-size-base-plus.a-color-base"))
+            product_name = inner_text(select_one(item, "a.a-link-normal.s-line-clamp-2.s-link-style.a-text-normal h2 span"))
+            rating = inner_text(select_one(item, "span.a-icon-alt"))
+            rating_count = inner_text(select_one(item, "span.a-size-base.s-underline-text"))
+
+            prices = [inner_text(p).replace("₹", "").replace(",", "") for p in select(item, "span.a-price span.a-offscreen")]
+            price = float(prices[0]) if prices else None
+
+            original_prices = [inner_text(p).replace("₹", "").replace(",", "") for p in select(item, "span.a-text-price span.a-offscreen")]
+            original_price = float(original_prices[0]) if original_prices else None
+
+            discount_elem = select_one(item, "span.savingsPercentage")
+            if discount_elem is None:
+                discount_elem = select_one(item, "span.s-price-instructions-style span.a-color-price")
+
+            if discount_elem is not None:
+                discount = inner_text(discount_elem)
+            elif original_price and price:
+                percent = int(round(((original_price - price) / original_price) * 100))
+                discount = f"{percent}% off"
+            else:
+                discount = ""
+
+            badge_text = ""
+            badge_container = select_one(item, "div.puis-status-badge-container")
+            if badge_container is not None:
+                badge_text = inner_text(select_one(badge_container, "span.a-badge-text"))
+
+            if not badge_text:
+                amazons_choice_span = select_one(item, "span.a-badge[aria-labelledby$='-amazons-choice-label']")
+                if amazons_choice_span is not None:
+                    label_text = inner_text(select_one(amazons_choice_span, "span.a-badge-label"))
+                    supplementary_text = inner_text(select_one(amazons_choice_span, "span.a-badge-supplementary-text"))
+                    badge_text = f"{label_text} {supplementary_text}".strip()
+
+            timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+            products.append({
+                "Data ID": data_id,
+                "Product URL": full_url,
+                "Brand Name": brand_name,
+                "Product Name": product_name,
+                "Rating": rating,
+                "Rating Count": rating_count,
+                "Price (INR)": f"₹{price}" if price else "",
+                "Original Price (INR)": f"₹{original_price}" if original_price else "",
+                "Discount": discount,
+                "Badge": badge_text,
+                "Date of Extraction": timestamp
+            })
+        except Exception as e:
+            print(f"Error extracting product: {e}")
+    return products
+
+@metrics.timed("extract")
+async def extract_pdp_data(page):
+    async def get_all_facts():
         facts = {}
         try:
-            fact_containers = page.query_selector_all("div.a-fixed-left-grid.product-facts-detail")
+            fact_containers = await page.query_selector_all("div.a-fixed-left-grid.product-facts-detail")
             for container in fact_containers:
-                left = container.query_selector("div.a-col-left")
-                right = container.query_selector("div.a-col-right")
+                left = await container.query_selector("div.a-col-left")
+                right = await container.query_selector("div.a-col-right")
                 if left and right:
-                    left_text = left.inner_text().strip().rstrip(":")
-                    right_text = right.inner_text().strip()
+                    left_text = (await left.inner_text()).strip().rstrip(":")
+                    right_text = (await right.inner_text()).strip()
                     if left_text and right_text:
                         facts[left_text] = right_text
         except:
             pass
         return facts
 
-    def get_bullet_points():
-        bullets = page.query_selector_all("div.a-expander-content ul.a-unordered-list li")
-        return [li.inner_text().strip() for li in bullets if li.inner_text().strip()]
+    async def get_bullet_points():
+        bullets = await page.query_selector_all("div.a-expander-content ul.a-unordered-list li")
+        return [(await li.inner_text()).strip() for li in bullets if (await li.inner_text()).strip()]
 
-    def find_bullet_by_keywords(keywords):
-        bullets = get_bullet_points()
+    async def find_bullet_by_keywords(keywords):
+        bullets = await get_bullet_points()
         for text in bullets:
             lower_text = text.lower()
             for kw in keywords:
@@ -172,88 +356,68 @@ def extract_pdp_data(page):
                     return text
         return ""
 
-    # Keyword mappings for bullet-based extraction
-    keyword_map = {
-        "Fabric Info": ["fabric", "kurta and bottom fabric"],
-        "Color Info": ["color :-", "color"],
-        "Style Info": ["style"],
-        "Length Info": ["length"],
-        "Sleeve Info": ["sleeves"],
-        "Size Chart": ["size chart"],
-        "Includes Info": ["this set includes"],
-        "Work/Design Info": ["work :-", "work"],
-        "Neck Style": ["neck style:-", "neck style"],
-        "Color Disclaimer": ["colour declaration"],
-        "Occasion / Usage": ["occasion", "ocassion"],
-        "Brand Mention / CTA": ["click on brand name"]
-    }
-
     # Extract About This Item section (structured)
     about_this_item_dict = {}
-    for label, keywords in keyword_map.items():
-        val = find_bullet_by_keywords(keywords)
+    for label, keywords in KEYWORD_MAP.items():
+        val = await find_bullet_by_keywords(keywords)
         if val:
             about_this_item_dict[label] = val
 
-    full_bullets = get_bullet_points()
+    full_bullets = await get_bullet_points()
 
     # Dynamic Product Details extraction
-    product_details = get_all_facts()
+    product_details = await get_all_facts()
 
     # 🔹 New: Extract Additional Details (already present in your code)
-    def get_additional_details():
-        additional_keys = [
-            "Manufacturer", "Item Weight", "Product Dimensions", "Country of Origin",
-            "Packer", "Importer", "Net Quantity", "Included Components"
-        ]
+    async def get_additional_details():
         details = {}
         try:
-            containers = page.query_selector_all("div.a-fixed-left-grid")
+            containers = await page.query_selector_all("div.a-fixed-left-grid")
             for container in containers:
-                left = container.query_selector("div.a-fixed-left-grid-col.a-col-left span")
-                right = container.query_selector("div.a-fixed-left-grid-col.a-col-right span")
+                left = await container.query_selector("div.a-fixed-left-grid-col.a-col-left span")
+                right = await container.query_selector("div.a-fixed-left-grid-col.a-col-right span")
                 if left and right:
-                    key = left.inner_text().strip().rstrip(":")
-                    value = right.inner_text().strip()
-                    if key in additional_keys and value:
+                    key = (await left.inner_text()).strip().rstrip(":")
+                    value = (await right.inner_text()).strip()
+                    if key in ADDITIONAL_DETAIL_KEYS and value:
                         details[key] = value
         except:
             pass
         return details
 
     # 🔹 New: Extract Brand Snapshot details (already present in your code)
-    def get_brand_snapshot():
+    async def get_brand_snapshot():
         brand_snapshot = {}
         try:
-            brand_container = page.query_selector("div.a-cardui-body.brand-snapshot-card-content")
+            brand_container = await page.query_selector("div.a-cardui-body.brand-snapshot-card-content")
             if brand_container:
-                brand_name_span = brand_container.query_selector("p > span.a-size-medium.a-text-bold")
+                brand_name_span = await brand_container.query_selector("p > span.a-size-medium.a-text-bold")
                 if brand_name_span:
-                    brand_snapshot["Brand Name"] = brand_name_span.inner_text().strip()
+                    brand_snapshot["Brand Name"] = (await brand_name_span.inner_text()).strip()
 
-            title_container = page.query_selector("div.a-section.a-text-center.brand-snapshot-title-container > p")
+            title_container = await page.query_selector("div.a-section.a-text-center.brand-snapshot-title-container > p")
             if title_container:
-                brand_snapshot["Top Brand Heading"] = title_container.inner_text().strip()
+                brand_snapshot["Top Brand Heading"] = (await title_container.inner_text()).strip()
 
-            list_items = page.query_selector_all("div.a-section.a-spacing-base.brand-snapshot-flex-row[role='listitem']")
+            list_items = await page.query_selector_all("div.a-section.a-spacing-base.brand-snapshot-flex-row[role='listitem']")
             if list_items and len(list_items) >= 3:
-                pos_rating = list_items[0].query_selector("p")
+                pos_rating = await list_items[0].query_selector("p")
                 if pos_rating:
-                    brand_snapshot["Positive Ratings"] = pos_rating.inner_text().strip()
+                    brand_snapshot["Positive Ratings"] = (await pos_rating.inner_text()).strip()
 
-                recent_orders = list_items[1].query_selector("p")
+                recent_orders = await list_items[1].query_selector("p")
                 if recent_orders:
-                    brand_snapshot["Recent Orders"] = recent_orders.inner_text().strip()
+                    brand_snapshot["Recent Orders"] = (await recent_orders.inner_text()).strip()
 
-                years_amazon = list_items[2].query_selector("p")
+                years_amazon = await list_items[2].query_selector("p")
                 if years_amazon:
-                    brand_snapshot["Years on Amazon"] = years_amazon.inner_text().strip()
+                    brand_snapshot["Years on Amazon"] = (await years_amazon.inner_text()).strip()
 
                 badge_images = []
                 for item in list_items:
-                    img = item.query_selector("img.brand-snapshot-item-image")
+                    img = await item.query_selector("img.brand-snapshot-item-image")
                     if img:
-                        src = img.get_attribute("src")
+                        src = await img.get_attribute("src")
                         if src:
                             badge_images.append(src)
                 if badge_images:
@@ -264,38 +428,32 @@ def extract_pdp_data(page):
         return brand_snapshot
 
     # 🔹 New: Extract Product Description
-    def get_product_description():
+    async def get_product_description():
         try:
-            desc_div = page.query_selector("#productDescription_feature_div #productDescription.a-section.a-spacing-small p span")
+            desc_div = await page.query_selector("#productDescription_feature_div #productDescription.a-section.a-spacing-small p span")
             if desc_div:
-                return desc_div.inner_text().strip()
+                return (await desc_div.inner_text()).strip()
         except:
             pass
         return ""
 
     # 🔹 New: Extract Product and Seller Details (Product Facts list items with <li><span class="a-text-bold">Key</span></li>)
-    def get_product_and_seller_details():
+    async def get_product_and_seller_details():
         details = {}
         try:
             # Select all <li> where span.a-text-bold contains the keys
-            li_elements = page.query_selector_all("li")
+            li_elements = await page.query_selector_all("li")
             for li in li_elements:
-                key_span = li.query_selector("span.a-text-bold")
+                key_span = await li.query_selector("span.a-text-bold")
                 if key_span:
-                    key = key_span.inner_text().strip().rstrip(":")
+                    key = (await key_span.inner_text()).strip().rstrip(":")
                     # Only add if key is in our required fields
-                    required_keys = [
-                        "Product Dimensions", "Date First Available", "Manufacturer", "ASIN",
-                        "Item model number", "Country of Origin", "Department", "Packer",
-                        "Importer", "Item Weight", "Item Dimensions LxWxH", "Net Quantity",
-                        "Included Components", "Generic Name"
-                    ]
-                    if key in required_keys:
+                    if key in PRODUCT_AND_SELLER_KEYS:
                         # The sibling span (or text node) with the value may be next sibling or inside li
                         # We'll try to get text excluding the key span text itself
                         # One approach: get full li text and remove the key span text
-                        full_text = li.inner_text().strip()
-                        value = full_text.replace(key_span.inner_text().strip(), "").strip(" :\n")
+                        full_text = (await li.inner_text()).strip()
+                        value = full_text.replace((await key_span.inner_text()).strip(), "").strip(" :\n")
                         details[key] = value
         except:
             pass
@@ -306,95 +464,511 @@ def extract_pdp_data(page):
         "Product Details": product_details,
         "About This Item": about_this_item_dict,
         "All Bullet Points": full_bullets,
-        "Additional Details": get_additional_details(),
-        "Brand Snapshot": get_brand_snapshot(),
-        "Product and Seller Details": get_product_and_seller_details(),   # NEW field added
-        "Product Description": get_product_description()                 # NEW field added
+        "Additional Details": await get_additional_details(),
+        "Brand Snapshot": await get_brand_snapshot(),
+        "Product and Seller Details": await get_product_and_seller_details(),   # NEW field added
+        "Product Description": await get_product_description()                 # NEW field added
     }
 
     return pdp_data
 
 
-def scrape_amazon():
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context()
-
-        all_products = []
-        for base_link in category_links:
-            print(f"\nScraping: {base_link}")
-
-            current_link_products = []
-            current_count = 0
-            page_num = 1
-
-            # We assume the base_link is like: https://www.amazon.in/s?k=women+ethnic+wear
-            # Append &page=2, &page=3 etc. for pagination
-            while current_count < PRODUCTS_PER_LINK:
-                # Construct paginated URL
-                if "page=" in base_link:
-                    # Replace existing page number if present
-                    url = re.sub(r"page=\d+", f"page={page_num}", base_link)
-                else:
-                    # Add page param, if URL already has ? then use &, else use ?
-                    url = base_link + ("&" if "?" in base_link else "?") + f"page={page_num}"
-
-                print(f"Visiting page {page_num}: {url}")
-                page = context.new_page()
-                try:
-                    page.goto(url, timeout=60000)
-                    page.wait_for_timeout(3000)
-
-                    products = extract_listing_data(page)
-                    new_products = [p for p in products if p["Data ID"] not in {x["Data ID"] for x in current_link_products}]
-                    if not new_products:
-                        print("No new products found, stopping pagination.")
-                        page.close()
-                        break
-
-                    current_link_products.extend(new_products)
-                    current_count = len(current_link_products)
-                    print(f"Page {page_num}: Collected {current_count} products from current link")
-
-                    page.close()
-                    if current_count >= PRODUCTS_PER_LINK:
-                        break
-
-                    page_num += 1
-                except Exception as e:
-                    print(f"Error loading page {page_num}: {e}")
-                    page.close()
-                    break
-
-            all_products.extend(current_link_products[:PRODUCTS_PER_LINK])
-
-        listing_path = os.path.join(output_dir, "Amazon_All_Listings.json")
-        with open(listing_path, "w", encoding="utf-8") as f:
-            json.dump(all_products, f, ensure_ascii=False, indent=2)
-        print(f"\n✅ Listings saved to: {listing_path}")
-
-        # === PDP SCRAPER SECTION ===
-        final_products = []
-        for product in all_products:
+@metrics.timed("parse")
+def parse_pdp_html(markup):
+    # Offline twin of extract_pdp_data(): the PDP is parsed once and every section is read from the in-memory tree
+    tree = parse_html(markup)
+
+    product_details = {}
+    for container in select(tree, "div.a-fixed-left-grid.product-facts-detail"):
+        left = select_one(container, "div.a-col-left")
+        right = select_one(container, "div.a-col-right")
+        if left is not None and right is not None:
+            left_text = inner_text(left).rstrip(":")
+            right_text = inner_text(right)
+            if left_text and right_text:
+                product_details[left_text] = right_text
+
+    bullets = [inner_text(li) for li in select(tree, "div.a-expander-content ul.a-unordered-list li")]
+    full_bullets = [text for text in bullets if text]
+
+    additional_details = {}
+    for container in select(tree, "div.a-fixed-left-grid"):
+        left = select_one(container, "div.a-fixed-left-grid-col.a-col-left span")
+        right = select_one(container, "div.a-fixed-left-grid-col.a-col-right span")
+        if left is not None and right is not None:
+            key = inner_text(left).rstrip(":")
+            value = inner_text(right)
+            if key in ADDITIONAL_DETAIL_KEYS and value:
+                additional_details[key] = value
+
+    brand_snapshot = {}
+    brand_container = select_one(tree, "div.a-cardui-body.brand-snapshot-card-content")
+    if brand_container is not None:
+        brand_name_span = select_one(brand_container, "p > span.a-size-medium.a-text-bold")
+        if brand_name_span is not None:
+            brand_snapshot["Brand Name"] = inner_text(brand_name_span)
+
+    title_container = select_one(tree, "div.a-section.a-text-center.brand-snapshot-title-container > p")
+    if title_container is not None:
+        brand_snapshot["Top Brand Heading"] = inner_text(title_container)
+
+    list_items = select(tree, "div.a-section.a-spacing-base.brand-snapshot-flex-row[role='listitem']")
+    if len(list_items) >= 3:
+        for label, item in zip(["Positive Ratings", "Recent Orders", "Years on Amazon"], list_items):
+            paragraph = select_one(item, "p")
+            if paragraph is not None:
+                brand_snapshot[label] = inner_text(paragraph)
+
+        badge_images = []
+        for item in list_items:
+            img = select_one(item, "img.brand-snapshot-item-image")
+            if img is not None and img.get("src"):
+                badge_images.append(img.get("src"))
+        if badge_images:
+            brand_snapshot["Brand Badge Image URLs"] = badge_images
+
+    seller_details = {}
+    for li in select(tree, "li"):
+        key_span = select_one(li, "span.a-text-bold")
+        if key_span is None:
+            continue
+        key_text = inner_text(key_span)
+        key = key_text.rstrip(":")
+        if key in PRODUCT_AND_SELLER_KEYS:
+            seller_details[key] = inner_text(li).replace(key_text, "").strip(" :\n")
+
+    description = inner_text(select_one(tree, "#productDescription_feature_div #productDescription.a-section.a-spacing-small p span"))
+    if not description:
+        description = amazon_pdp_fields(markup).get("Product Description", "")
+
+    return {
+        "Product Details": product_details,
+        "About This Item": classify_bullets(full_bullets),
+        "All Bullet Points": full_bullets,
+        "Additional Details": additional_details,
+        "Brand Snapshot": brand_snapshot,
+        "Product and Seller Details": seller_details,
+        "Product Description": description
+    }
+
+
+async def scrape_pdp_pool(browser, products, route_stats=None, pacer=None, sink=None, frontier=None, cache=None,
+                          fingerprints=None, contexts=None, retries=None):
+    # Every worker is pinned to one context slot; the two semaphores cap live pages per context and per browser.
+    # `contexts` is a warm ContextPool the caller keeps across batches; without one a pool lives for this call.
+    # With `retries`, failed PDPs are retried after every product has had its first go.
+    pool = contexts if contexts is not None else await ContextPool(browser, PDP_CONTEXTS, "amazon", route_stats, cache).warm()
+    context_limits = [asyncio.Semaphore(MAX_PAGES_PER_CONTEXT) for _ in range(len(pool))]
+    browser_limit = asyncio.Semaphore(MAX_PAGES_PER_BROWSER)
+
+    queue = asyncio.Queue()
+    for idx, product in enumerate(products):
+        queue.put_nowait((idx, product))
+
+    # Results are slotted by listing index so the merged output keeps the listing order.
+    # With a sink, finished products are streamed out in completion order instead.
+    results = [None] * len(products)
+    scraped = 0
+
+    async def scrape_one(slot, idx, product):
+        # Raises on failure; an exception leaving the pacer slot is reported to it as that error
+        nonlocal scraped
+        url = product.get("Product URL")
+        async with paced(pacer) as ticket, browser_limit, context_limits[slot], pool.page(slot) as pdp_page:
+            with metrics.timer("navigate"):
+                response = await pdp_page.goto(url, timeout=60000)
+            metrics.count("pages")
+            await wait_until_ready(pdp_page, "amazon", "pdp", replaces=3.0)
+            status = response.status if response else None
+            if PDP_PARSE_MODE == "snapshot":
+                with metrics.timer("extract"):
+                    markup = await pdp_page.content()
+                metrics.count("bytes", len(markup))
+                ticket.report(status, markup=markup)
+                pdp_info = parse_pdp_html(markup)
+            else:
+                ticket.report(status)
+                pdp_info = await extract_pdp_data(pdp_page)
+        if fingerprints is not None:
+            fingerprints.record(product, pdp_info)
+        product.update(pdp_info)
+        scraped += 1
+        metrics.count("products")
+        if frontier is not None:
+            frontier.complete("pdp", url, product)
+        if sink is not None:
+            sink.write(product)
+        else:
+            results[idx] = product
+        print(f"✅ PDP scraped for: {product['Product Name'][:40]}")
+
+    async def worker(worker_id):
+        slot = worker_id % len(pool)
+        while True:
+            try:
+                idx, product = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
             url = product.get("Product URL")
             try:
-                pdp_page = context.new_page()
-                pdp_page.goto(url, timeout=60000)
-                pdp_page.wait_for_timeout(3000)
-                pdp_info = extract_pdp_data(pdp_page)
-                pdp_page.close()
-                product.update(pdp_info)
-                final_products.append(product)
-                print(f"✅ PDP scraped for: {product['Product Name'][:40]}")
+                await scrape_one(slot, idx, product)
             except Exception as e:
                 print(f"❌ Error loading PDP for {url}: {e}")
+                if retries is not None:
+                    # The frontier row stays in flight until the retries settle it
+                    retries.push("pdp", url, product, e)
+                elif frontier is not None:
+                    frontier.fail("pdp", url, e)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(max(1, PDP_WORKERS))))
+    if retries is not None and len(retries):
+        positions = {product.get("Product URL"): idx for idx, product in enumerate(products)}
+
+        async def retry_pdp(item):
+            # Each attempt moves on to the next context
+            await scrape_one(item.attempts % len(pool), positions[item.url], item.payload)
+
+        def give_up(item):
+            if frontier is not None:
+                frontier.fail("pdp", item.url, item.errors[-1])
+
+        await retries.drain(retry_pdp, give_up)
+    elapsed = time.perf_counter() - started
+
+    if contexts is None:
+        await pool.close()
+
+    final_products = [product for product in results if product is not None]
+    rate = scraped / elapsed if elapsed else 0.0
+    print(f"\n⚡ PDP throughput: {scraped}/{len(products)} products in {elapsed:.1f}s "
+          f"({rate:.2f} products/s, {PDP_WORKERS} workers, {len(pool)} contexts, {pool.recycled} recycled)")
+    return final_products
+
+
+async def fetch_listing_products(hybrid, browser, url):
+    if LISTING_PARSE_MODE == "snapshot":
+        # Plain HTTP first; Chromium only when the response carries no product cards.
+        # Over HTTP the completeness check has already parsed the cards.
+        markup, products = await hybrid.fetch_checked(url)
+        return products if products is not None else parse_listing_html(markup)
+
+    async with browser.page() as page, paced(hybrid.pacer) as ticket:
+        with metrics.timer("navigate"):
+            response = await page.goto(url, timeout=60000)
+        metrics.count("pages")
+        ticket.report(response.status if response else None)
+        await wait_until_ready(page, "amazon", "listing", replaces=3.0)
+        products = await extract_listing_data(page)
+    hybrid.record(url, "browser")
+    return products
+
+
+async def scrape_amazon_link(hybrid, browser, base_link, retries=None):
+    # Products by page number, so a page recovered by a retry slots back in where it belongs
+    pages = {}
+    seen_ids = set()
+    current_count = 0
+    page_num = 1
+    failed_in_row = 0
+    max_failed_in_row = 2  # Consecutive failed pages before the rest of the link is given up on
+
+    # We assume the base_link is like: https://www.amazon.in/s?k=women+ethnic+wear
+    # Append &page=2, &page=3 etc. for pagination
+    while current_count < PRODUCTS_PER_LINK:
+        # Construct paginated URL
+        if "page=" in base_link:
+            # Replace existing page number if present
+            url = re.sub(r"page=\d+", f"page={page_num}", base_link)
+        else:
+            # Add page param, if URL already has ? then use &, else use ?
+            url = base_link + ("&" if "?" in base_link else "?") + f"page={page_num}"
+
+        print(f"Visiting page {page_num}: {url}")
+        try:
+            products = await fetch_listing_products(hybrid, browser, url)
+        except Exception as e:
+            print(f"Error loading page {page_num}: {e}")
+            if retries is None:
+                break
+            # Pagination carries on; the page is retried once the rest of the link is done.
+            # Given up on for good, the whole link is what gets replayed.
+            retries.push("listing_page", url, {"link": base_link, "page": page_num}, e,
+                         replay={"kind": "listing", "url": base_link, "payload": None, "redo": True})
+            failed_in_row += 1
+            if failed_in_row >= max_failed_in_row:
+                break
+            page_num += 1
+            continue
+        failed_in_row = 0
+
+        new_products = []
+        for p in products:
+            if p["Data ID"] not in seen_ids:
+                seen_ids.add(p["Data ID"])
+                new_products.append(p)
+        if not new_products:
+            print("No new products found, stopping pagination.")
+            break
 
-        full_path = os.path.join(output_dir, "Amazon_full_data.json")
-        with open(full_path, "w", encoding="utf-8") as f:
-            json.dump(final_products, f, ensure_ascii=False, indent=2)
-        print(f"\n🧾 Final full product data saved to: {full_path}")
-        browser.close()
+        pages[page_num] = new_products
+        current_count += len(new_products)
+        print(f"Page {page_num}: Collected {current_count} products from current link")
+
+        if current_count >= PRODUCTS_PER_LINK:
+            break
+
+        page_num += 1
+
+    if retries is not None and len(retries):
+        async def retry_page(item):
+            pages[item.payload["page"]] = await fetch_listing_products(hybrid, browser, item.url)
+
+        await retries.drain(retry_page)
+
+    # Page order, each product where it was first seen
+    current_link_products, seen_ids = [], set()
+    for n in sorted(pages):
+        for p in pages[n]:
+            if p["Data ID"] not in seen_ids:
+                seen_ids.add(p["Data ID"])
+                current_link_products.append(p)
+    return current_link_products[:PRODUCTS_PER_LINK]
+
+
+def open_frontier(out_dir):
+    return Frontier(os.path.join(out_dir, "Amazon_frontier.sqlite"), "amazon")
+
+
+def open_cache(out_dir):
+    return ResponseCache(os.path.join(out_dir, "http_cache")) if USE_RESPONSE_CACHE else None
+
+
+def open_pacer(stage):
+    # Listing pages load one at a time; PDPs get their own pacer so they are not held to the listing pace
+    if stage == "listing":
+        return make_pacer("amazon listing", PAGE_PACE_SECONDS, adaptive=ADAPTIVE_PACING)
+    return make_pacer("amazon pdp", PDP_PACE_SECONDS, adaptive=ADAPTIVE_PACING, max_concurrency=MAX_PAGES_PER_BROWSER)
+
+
+def open_dedup(out_dir):
+    return DedupIndex("amazon", os.path.join(out_dir, "Amazon_seen_ids.bloom") if DEDUP_ACROSS_RUNS else None,
+                      DEDUP_ACROSS_RUNS)
+
+
+def open_retries(out_dir, stage, queue):
+    dead_letters = DeadLetters(os.path.join(out_dir, "Amazon_dead_letters.jsonl"), "amazon", getattr(queue, "path", None))
+    return RetryQueue(f"amazon {stage}", dead_letters, None if RETRY_FAILED else 1)
+
+
+async def scrape_listing_links(queue, hybrid, browser, dedup=None, retries=None):
+    # Claims category links until none are left. With a dedup index each link's PDPs are queued as it finishes;
+    # sharded runs leave that to the parent process so the PDP order does not depend on the shards.
+    done = 0
+    for base_link, _ in queue.claims("listing"):
+        print(f"\nScraping: {base_link}")
+        try:
+            products = await scrape_amazon_link(hybrid, browser, base_link, retries)
+        except Exception as e:
+            print(f"Error scraping {base_link}: {e}")
+            metrics.count("errors")
+            queue.fail("listing", base_link, e)
+            continue
+        queue.complete("listing", base_link, products)
+        metrics.count("listing_products", len(products))
+        done += 1
+        if dedup is not None:
+            # One PDP per ASIN, however many links list it
+            queue.enqueue("pdp", [(p["Product URL"], p) for p in products if p["Product URL"] and dedup.admit(p)])
+    return done
+
+
+async def scrape_pdp_batch(browser, batch, queue, route_stats=None, pacer=None, sink=None, cache=None, fingerprints=None,
+                           retries=None):
+    # batch: claimed (url, listing product) rows; returns how many were settled without a browser
+    pending = []
+    for url, product in batch:
+        # Unchanged listing cards take last run's PDP fields without a page load
+        if fingerprints is not None and fingerprints.plan(product, can_revalidate=False) == "skip":
+            product.update(fingerprints.reuse(product))
+            queue.complete("pdp", url, product)
+            metrics.count("products")
+            metrics.count("products_reused")
+            if sink is not None:
+                sink.write(product)
+        else:
+            pending.append(product)
+    if pending:
+        await scrape_pdp_pool(await browser.get_browser(), pending, route_stats, pacer, sink, queue, cache, fingerprints,
+                              await browser.context_pool(PDP_CONTEXTS), retries)
+    return len(batch) - len(pending)
+
+
+async def scrape_amazon():
+    metrics.reset("amazon")
+    route_stats = RouteStats()
+    cache = open_cache(output_dir)
+    fingerprints = ProductFingerprints(os.path.join(output_dir, "Amazon_fingerprints.sqlite"), "amazon", INCREMENTAL_MODE)
+    dedup = open_dedup(output_dir)
+    browser = LazyBrowser("amazon", headless=True, route_stats=route_stats, cache=cache, endpoint=BROWSER_ENDPOINT)
+    listing_pacer = open_pacer("listing")
+    pdp_pacer = open_pacer("pdp")
+
+    frontier = open_frontier(output_dir).begin(fresh=not RESUME)
+    frontier.enqueue("listing", category_links)
+    dedup.seed(frontier.payloads("pdp"))
+    listing_retries = open_retries(output_dir, "listing", frontier)
+    pdp_retries = open_retries(output_dir, "pdp", frontier)
+
+    async with AsyncFetcher(concurrency=2, per_host=2, host_delay=0, cache=cache) as http:
+        hybrid = HybridFetcher("amazon", "listing", http, parse_listing_html, browser, listing_pacer, replaces=3.0)
+        # Category links already finished by an interrupted run are not claimed again
+        await scrape_listing_links(frontier, hybrid, browser, dedup, listing_retries)
+
+    all_products = [product for products in frontier.results("listing") for product in products]
+    print(hybrid.summary())
+    hybrid.save_paths(os.path.join(output_dir, "Amazon_fetch_paths.json"))
+
+    listing_path = os.path.join(output_dir, "Amazon_All_Listings.json")
+    with metrics.timer("write"), open(listing_path, "w", encoding="utf-8") as f:
+        json.dump(all_products, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ Listings saved to: {listing_path}")
+
+    # === PDP SCRAPER SECTION ===
+    full_path = os.path.join(output_dir, "Amazon_full_data.json")
+    sink = JsonlWriter(os.path.join(output_dir, "Amazon_full_data.jsonl")) if STREAM_OUTPUT else None
+    if sink is not None:
+        # PDPs finished by an interrupted run go back into the fresh stream first
+        for product in frontier.results("pdp"):
+            sink.write(product)
+    try:
+        await scrape_pdp_batch(browser, frontier.claim("pdp"), frontier, route_stats, pdp_pacer, sink, cache,
+                               fingerprints, pdp_retries)
+    finally:
+        if sink is not None:
+            sink.close()
+    print(route_stats.summary())
+    print(listing_pacer.summary())
+    print(pdp_pacer.summary())
+    print(listing_retries.summary())
+    print(pdp_retries.summary())
+    print(readiness_stats.summary())
+    print(browser_stats.summary())
+    print(frontier.summary("listing"))
+    print(frontier.summary("pdp"))
+
+    if sink is not None:
+        print(sink.summary())
+        write_full_data(frontier, output_dir)
+    else:
+        with metrics.timer("write"), open(full_path, "w", encoding="utf-8") as f:
+            json.dump(list(frontier.results("pdp")), f, ensure_ascii=False, indent=2)
+    for product in frontier.payloads("pdp", "done"):
+        dedup.remember(product)
+    frontier.finish()
+    frontier.close()
+    if cache is not None:
+        print(cache.summary())
+        cache.close()
+    print(fingerprints.summary())
+    fingerprints.close()
+    print(dedup.summary())
+    dedup.close()
+    print(f"\n🧾 Final full product data saved to: {full_path}")
+    await browser.close()
+    write_run_report(output_dir)
+
+# ==== SHARDED RUNS (sharding.py) ====
+async def listing_worker(queue, out_dir, limit=None):
+    global PRODUCTS_PER_LINK
+    route_stats = RouteStats()
+    cache = open_cache(out_dir)
+    browser = LazyBrowser("amazon", headless=True, route_stats=route_stats, cache=cache, endpoint=BROWSER_ENDPOINT)
+    retries = open_retries(out_dir, "listing", queue)
+    # Queue workers run job after job in one process, so the limit is put back afterwards
+    default_limit = PRODUCTS_PER_LINK
+    if limit is not None:
+        PRODUCTS_PER_LINK = limit
+    try:
+        async with AsyncFetcher(concurrency=2, per_host=2, host_delay=0, cache=cache) as http:
+            hybrid = HybridFetcher("amazon", "listing", http, parse_listing_html, browser, open_pacer("listing"),
+                                   replaces=3.0)
+            return await scrape_listing_links(queue, hybrid, browser, retries=retries)
+    finally:
+        PRODUCTS_PER_LINK = default_limit
+        await browser.close()
+        if cache is not None:
+            cache.close()
+        print(retries.summary())
+
+
+async def pdp_worker(queue, out_dir):
+    route_stats = RouteStats()
+    cache = open_cache(out_dir)
+    fingerprints = ProductFingerprints(os.path.join(out_dir, "Amazon_fingerprints.sqlite"), "amazon", INCREMENTAL_MODE)
+    browser = LazyBrowser("amazon", headless=True, route_stats=route_stats, cache=cache, endpoint=BROWSER_ENDPOINT)
+    pacer = open_pacer("pdp")
+    retries = open_retries(out_dir, "pdp", queue)
+    claimed = 0
+    try:
+        # One browser for the whole worker; a batch at a time so other processes can take the rest.
+        # Each batch's failures are retried before the next batch is claimed.
+        while True:
+            batch = queue.claim("pdp", SHARD_BATCH_SIZE)
+            if not batch:
+                break
+            claimed += len(batch)
+            await scrape_pdp_batch(browser, batch, queue, route_stats, pacer, None, cache, fingerprints, retries)
+    finally:
+        await browser.close()
+        if cache is not None:
+            cache.close()
+        fingerprints.close()
+    print(route_stats.summary())
+    print(pacer.summary())
+    print(retries.summary())
+    print(browser_stats.summary())
+    return claimed
+
+
+def write_outputs(frontier, out_dir):
+    listing_path = os.path.join(out_dir, "Amazon_All_Listings.json")
+    with metrics.timer("write"), open(listing_path, "w", encoding="utf-8") as f:
+        json.dump([product for products in frontier.results("listing") for product in products], f,
+                  ensure_ascii=False, indent=2)
+    full_path = write_full_data(frontier, out_dir)
+    print(f"\n🧾 Final full product data saved to: {full_path}")
+
+
+def write_full_data(frontier, out_dir):
+    # Listing order, whatever order the PDPs finished in
+    full_path = os.path.join(out_dir, "Amazon_full_data.json")
+    with JsonlWriter(os.path.join(out_dir, "Amazon_full_data.jsonl")) as sink:
+        for product in frontier.results("pdp"):
+            sink.write(product)
+    rebuild_json(sink.path, full_path, indent=2)
+    return full_path
+
+
+def write_run_report(out_dir):
+    print(metrics.summary())
+    metrics.write_report(os.path.join(out_dir, "Amazon_run_report.json"), PROMETHEUS_TEXTFILE)
+
+def run_pipeline(links, out_dir, products_per_link=None):
+    # Same run as the GUI starts, with the GUI's inputs passed in directly
+    global category_links, output_dir, PRODUCTS_PER_LINK
+    category_links = list(links)
+    output_dir = out_dir
+    # The limit is this run's only: a later run without one starts from the module's value again
+    default_limit = PRODUCTS_PER_LINK
+    if products_per_link is not None:
+        PRODUCTS_PER_LINK = products_per_link
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        asyncio.run(scrape_amazon())
+    finally:
+        PRODUCTS_PER_LINK = default_limit
 
 if __name__ == "__main__":
     start_gui()
-    scrape_amazon()
+    asyncio.run(scrape_amazon())
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""Compare Ajio listing throughput: DOM scroll + per-card locator reads vs product-list response capture.
+
+Usage:
+    python benchmarks/bench_ajio_listing.py                        # 180 products, 45 per API page
+    python benchmarks/bench_ajio_listing.py --products 450 --page-size 45 --latency 0.15
+
+Serves a synthetic category grid from 127.0.0.1: the first page of cards is in the
+HTML, and scrolling near the bottom makes the page fetch the next one from
+/api/category/bench?currentPage=N (with --latency seconds of server delay) and render
+it, like the real grid does. Each mode scrapes --products products from a fresh
+page; reports products/s and whether both modes returned the same products in the
+same order.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.async_api import async_playwright
+
+import ajio_scraper_full as ajio
+
+GRID_JS = """
+let next = 1, loading = false;
+window.addEventListener("scroll", async () => {
+    if (loading || window.innerHeight + window.scrollY < document.body.scrollHeight - 1200) return;
+    loading = true;
+    const data = await (await fetch(`/api/category/bench?fields=SITE&currentPage=${next}&pageSize=PAGE_SIZE&format=json`)).json();
+    next += 1;
+    document.getElementById("products").insertAdjacentHTML("beforeend", data.products.map(card).join(""));
+    loading = false;
+});
+function card(p) {
+    return `<div class="item" data-id="${p.code}" style="height:320px"><a href="${p.url}">` +
+        `<div class="brand">${p.fnlColorVariantData.brandName}</div><div class="nameCls">${p.name}</div>` +
+        `<div class="price"><strong>${p.price.displayformattedValue}</strong></div>` +
+        `<span class="orginal-price">${p.wasPriceData.displayformattedValue}</span>` +
+        `<span class="discount">${p.discountPercent}</span></a></div>`;
+}
+"""
+
+
+def product(n):
+    return {
+        "code": f"46{n:06d}_red",
+        "name": f"Women Kurta {n}",
+        "url": f"/bench/p/46{n:06d}_red",
+        "fnlColorVariantData": {"brandName": f"Brand {n % 17}"},
+        "price": {"value": 499 + n, "displayformattedValue": f"₹{499 + n}"},
+        "wasPriceData": {"value": 1299 + n, "displayformattedValue": f"₹{1299 + n}"},
+        "discountPercent": "60% off",
+    }
+
+
+class GridHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        size, total = self.server.page_size, self.server.total
+        if parts.path.startswith("/api/category/"):
+            time.sleep(self.server.latency)
+            page_no = int(parse_qs(parts.query).get("currentPage", ["0"])[0])
+            products = [product(n) for n in range(page_no * size, min(total, (page_no + 1) * size))]
+            body = json.dumps({"products": products, "pagination": {
+                "currentPage": page_no, "pageSize": size, "totalPages": -(-total // size), "totalResults": total,
+            }}).encode("utf-8")
+            content_type = "application/json"
+        else:
+            cards = "".join(
+                f'<div class="item" data-id="{p["code"]}" style="height:320px"><a href="{p["url"]}">'
+                f'<div class="brand">{p["fnlColorVariantData"]["brandName"]}</div><div class="nameCls">{p["name"]}</div>'
+                f'<div class="price"><strong>{p["price"]["displayformattedValue"]}</strong></div>'
+                f'<span class="orginal-price">{p["wasPriceData"]["displayformattedValue"]}</span>'
+                f'<span class="discount">{p["discountPercent"]}</span></a></div>'
+                for p in map(product, range(min(total, size)))
+            )
+            body = (f'<html><body><div id="products">{cards}</div>'
+                    f'<script>{GRID_JS.replace("PAGE_SIZE", str(size))}</script></body></html>').encode("utf-8")
+            content_type = "text/html; charset=utf-8"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+async def run(url, products):
+    results = {}
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        for mode, scrape in (("dom", ajio.scrape_ajio_from_link), ("capture", ajio.scrape_ajio_from_api)):
+            page = await browser.new_page()
+            started = time.perf_counter()
+            items = await scrape(page, url, products)
+            results[mode] = (items, time.perf_counter() - started)
+            await page.close()
+        await browser.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=180)
+    parser.add_argument("--page-size", type=int, default=45)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds the API waits before each page")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GridHandler)
+    server.daemon_threads = True
+    server.page_size, server.total, server.latency = args.page_size, args.products * 2, args.latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    ajio.LISTING_API_PACE_SECONDS = 0
+
+    results = asyncio.run(run(f"http://127.0.0.1:{server.server_address[1]}/c/bench", args.products))
+    server.shutdown()
+
+    print(f"\n{args.products} products, {args.page_size} per API page, {args.latency * 1000:.0f} ms API latency")
+    print(f"{'mode':<10}{'products':>10}{'seconds':>10}{'products/s':>12}")
+    for mode, (items, elapsed) in results.items():
+        print(f"{mode:<10}{len(items):>10}{elapsed:>10.1f}{len(items) / elapsed if elapsed else 0.0:>12.1f}")
+    same = [i["Data ID"] for i in results["dom"][0]] == [i["Data ID"] for i in results["capture"][0]]
+    print(f"same products in the same order: {'yes' if same else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
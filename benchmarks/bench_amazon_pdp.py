@@ -0,0 +1,92 @@
+"""Micro-benchmark for Amazon PDP extraction: live per-element queries vs the single-pass snapshot parser.
+
+Usage:
+    python benchmarks/bench_amazon_pdp.py saved/amazon_pdp_*.html
+
+Each saved PDP is loaded into Chromium with set_content(). Reports per-PDP wall time,
+process CPU time and browser round trips for both paths, plus the CPU cost of bullet
+classification (12 keyword rescans vs one compiled-matcher pass).
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.async_api import async_playwright
+
+import amazon_scraper_full as amazon
+from html_parsing import parse_html, select, inner_text
+from roundtrips import RoundTripCounter
+
+
+def classify_by_rescan(bullets):
+    # The pre-snapshot algorithm: every label walks the full bullet list again
+    found = {}
+    for label, keywords in amazon.KEYWORD_MAP.items():
+        for text in bullets:
+            if any(kw.lower().rstrip(":") in text.lower() for kw in keywords):
+                found[label] = text
+                break
+    return found
+
+
+async def run(paths, repeat):
+    totals = {"live": [0.0, 0.0, 0], "snapshot": [0.0, 0.0, 0]}
+    all_bullets = []
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                markup = f.read()
+            await page.set_content(markup, wait_until="domcontentloaded")
+            all_bullets.append([
+                inner_text(li) for li in select(parse_html(markup), "div.a-expander-content ul.a-unordered-list li")
+            ])
+
+            for _ in range(repeat):
+                for mode in ("live", "snapshot"):
+                    counted = RoundTripCounter(page)
+                    wall, cpu = time.perf_counter(), time.process_time()
+                    if mode == "live":
+                        live = await amazon.extract_pdp_data(counted)
+                    else:
+                        snapshot = amazon.parse_pdp_html(await counted.content())
+                    totals[mode][0] += time.perf_counter() - wall
+                    totals[mode][1] += time.process_time() - cpu
+                    totals[mode][2] += counted.round_trips
+
+            if live["About This Item"] != snapshot["About This Item"]:
+                print(f"⚠️ About This Item differs for {path}")
+        await browser.close()
+
+    runs = len(paths) * repeat
+    print(f"{len(paths)} PDP(s) x {repeat} run(s)")
+    print(f"{'mode':<10}{'wall ms/PDP':>14}{'cpu ms/PDP':>14}{'round trips/PDP':>18}")
+    for mode, (wall, cpu, trips) in totals.items():
+        print(f"{mode:<10}{wall / runs * 1000:>14.1f}{cpu / runs * 1000:>14.1f}{trips / runs:>18.1f}")
+
+    loops = 1000
+    for name, classify in (("rescan", classify_by_rescan), ("matcher", amazon.classify_bullets)):
+        started = time.perf_counter()
+        for _ in range(loops):
+            for bullets in all_bullets:
+                classify(bullets)
+        elapsed = time.perf_counter() - started
+        print(f"bullet classification ({name}): {elapsed / (loops * len(all_bullets)) * 1e6:.1f} µs/PDP")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("pages", nargs="+", help="saved Amazon PDP HTML files")
+    args = parser.parse_args()
+    asyncio.run(run(args.pages, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
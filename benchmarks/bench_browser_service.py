@@ -0,0 +1,133 @@
+"""Measure browser start overhead per job: cold Chromium launches vs attaching to browser_service.py.
+
+Usage:
+    python benchmarks/bench_browser_service.py                    # 5 jobs x 20 pages, 2 contexts
+    python benchmarks/bench_browser_service.py --jobs 10 --pages 60 --batch 20 --contexts 3
+
+Serves a small page from 127.0.0.1 and runs the same "job" --jobs times in each mode:
+  cold    launch Chromium, new contexts for every batch of --batch pages (the old behaviour)
+  service attach over CDP to a `browser_service.py serve` process started once up front, and
+          keep one warm ContextPool for the whole job
+Reports, averaged over the jobs: seconds until the browser was usable, time to the first
+loaded page, and total job time; plus the service process's own one-off start time.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from playwright.async_api import async_playwright
+
+import browser_service
+import route_filter
+
+PAGE = b"<html><body><h1>Product</h1>" + b"<p>lorem ipsum</p>" * 200 + b"</body></html>"
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_service(port):
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "browser_service.py"), "serve", "--port", str(port)],
+                            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    while True:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/json/version", timeout=1).read()
+            return proc, time.perf_counter() - started
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError("browser_service.py exited before its CDP port came up")
+            time.sleep(0.1)
+
+
+async def job(urls, contexts, batch, endpoint=None):
+    browser_service.stats.reset()
+    started = time.perf_counter()
+    async with async_playwright() as p:
+        browser = await browser_service.launch_or_attach(p, True, endpoint)
+        usable = time.perf_counter() - started
+        pool = await browser_service.ContextPool(browser, contexts, "bench").warm() if endpoint else None
+        for i in range(0, len(urls), batch):
+            chunk = urls[i:i + batch]
+            if endpoint:
+                batch_pool = pool
+            else:
+                # What every batch did before: fresh contexts, closed again at the end of the batch
+                batch_pool = await browser_service.ContextPool(browser, contexts, "bench").warm()
+
+            async def load(n, url):
+                async with batch_pool.page(n) as page:
+                    await page.goto(url)
+
+            await asyncio.gather(*(load(n, url) for n, url in enumerate(chunk)))
+            if batch_pool is not pool:
+                await batch_pool.close()
+        if pool is not None:
+            await pool.close()
+        await browser.close()
+    return usable, browser_service.stats.first_page_seconds, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=20, help="pages loaded per job")
+    parser.add_argument("--batch", type=int, default=10, help="pages per batch (fresh contexts per batch when cold)")
+    parser.add_argument("--contexts", type=int, default=2)
+    args = parser.parse_args()
+
+    # The pooled contexts get the usual route filter; this site name lets the local server through it
+    route_filter.SITE_ALLOWLISTS["bench"] = ["127.0.0.1"]
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    urls = [f"http://127.0.0.1:{server.server_address[1]}/p/{n}" for n in range(args.pages)]
+
+    port = free_port()
+    service, service_start = start_service(port)
+    results = {}
+    try:
+        for mode, endpoint in (("cold", None), ("service", f"http://127.0.0.1:{port}")):
+            results[mode] = [asyncio.run(job(urls, args.contexts, args.batch, endpoint)) for _ in range(args.jobs)]
+    finally:
+        service.terminate()
+        service.wait(timeout=30)
+        server.shutdown()
+
+    print(f"\n{args.jobs} jobs x {args.pages} pages, batches of {args.batch}, {args.contexts} contexts; "
+          f"service started once in {service_start:.2f}s")
+    print(f"{'mode':<10}{'browser s':>12}{'first page s':>14}{'job s':>10}{'total start s':>15}")
+    for mode, runs in results.items():
+        usable = sum(r[0] for r in runs) / len(runs)
+        first = sum(r[1] or 0.0 for r in runs) / len(runs)
+        total = sum(r[2] for r in runs) / len(runs)
+        print(f"{mode:<10}{usable:>12.3f}{first:>14.3f}{total:>10.2f}{sum(r[0] for r in runs):>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark the Flipkart PDP extractor on saved PDP fixtures for every parser backend.
+
+Usage:
+    python benchmarks/bench_flipkart_parsers.py saved/flipkart_pdp_*.html
+    python benchmarks/bench_flipkart_parsers.py --backends lxml selectolax --repeat 20 saved/*.html
+
+Each backend runs in a fresh process so its peak RSS is not polluted by the others.
+Reports pages/s, peak RSS, RSS growth over the post-import baseline, and whether the
+output matches the BeautifulSoup backend.
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_backend(backend, paths, repeat, queue):
+    import flipkart_scraper_full as flipkart
+    from html_parsing import get_parser_backend
+
+    pages = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            pages.append((path, f.read()))
+    get_parser_backend(backend).parse("<html></html>")  # pull in the parser module before the baseline
+    baseline = peak_rss_mb()
+
+    outputs = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        outputs = [flipkart.extract_pdp_data(markup, path, backend=backend) for path, markup in pages]
+    elapsed = time.perf_counter() - started
+
+    for data in outputs:
+        if data:
+            data.pop("Date of Extraction", None)
+    queue.put((backend, len(pages) * repeat / elapsed, peak_rss_mb(), peak_rss_mb() - baseline, outputs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["bs4", "lxml", "selectolax"])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("pages", nargs="+", help="saved Flipkart PDP HTML files")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for backend in args.backends:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_backend, args=(backend, args.pages, args.repeat, queue))
+        proc.start()
+        try:
+            results[backend] = queue.get(timeout=3600)
+        except Exception:
+            print(f"⚠️ {backend} failed (is it installed?)")
+        proc.join()
+
+    reference = results.get("bs4", (None,) * 5)[4]
+    print(f"{len(args.pages)} PDP fixture(s) x {args.repeat} run(s)")
+    print(f"{'backend':<12}{'pages/s':>10}{'peak RSS MB':>14}{'parse RSS MB':>14}{'same as bs4':>14}")
+    for backend, (_, rate, peak, growth, outputs) in results.items():
+        same = "-" if reference is None else ("yes" if outputs == reference else "NO")
+        print(f"{backend:<12}{rate:>10.1f}{peak:>14.1f}{growth:>14.1f}{same:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Compare live per-element listing extraction with the single-snapshot / single-evaluate paths.
+
+Usage:
+    python benchmarks/bench_listing_snapshot.py --site amazon saved/amazon_search_*.html
+    python benchmarks/bench_listing_snapshot.py --site flipkart saved/flipkart_listing_*.html
+    python benchmarks/bench_listing_snapshot.py --site ajio saved/ajio_listing_*.html
+    python benchmarks/bench_listing_snapshot.py --site myntra saved/myntra_listing_*.html
+
+Each saved listing page is loaded into Chromium with set_content(), then both paths
+extract the cards from the same DOM: Amazon / Flipkart against the lxml snapshot parser,
+Ajio / Myntra against the card_schema.py batch script. Reports wall time, browser round
+trips and cards found.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.async_api import async_playwright
+
+from card_schema import extract_cards
+from roundtrips import RoundTripCounter
+
+
+def load_site(site):
+    # (name of the fast path, live extraction, fast extraction); both take the page and return the cards
+    if site in ("amazon", "flipkart"):
+        if site == "amazon":
+            import amazon_scraper_full as module
+            live = module.extract_listing_data
+        else:
+            import flipkart_scraper_full as module
+            live = module.extract_listing_cards
+
+        async def snapshot(page):
+            return module.parse_listing_html(await page.content())
+        return "snapshot", live, snapshot
+
+    if site == "ajio":
+        import ajio_scraper_full as module
+
+        async def live(page):
+            cards = await page.locator("#products .item").all()
+            return [c for c in await asyncio.gather(*(module.extract_product_details(card, i)
+                                                      for i, card in enumerate(cards))) if c]
+    else:
+        import myntra_scraper_full as module
+
+        async def live(page):
+            cards = await page.locator("#desktopSearchResults .results-base li").all()
+            return [c for c in await asyncio.gather(*(module.extract_product_data(card) for card in cards)) if c]
+
+    async def batch(page):
+        return [card for card in await extract_cards(page, site) if card]
+    return "batch", live, batch
+
+
+async def run(site, paths, repeat):
+    fast_mode, live_extract, fast_extract = load_site(site)
+    totals = {"live": [0.0, 0, 0], fast_mode: [0.0, 0, 0]}
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                markup = f.read()
+            await page.set_content(markup, wait_until="domcontentloaded")
+
+            for _ in range(repeat):
+                counted = RoundTripCounter(page)
+                started = time.perf_counter()
+                cards = await live_extract(counted)
+                totals["live"][0] += time.perf_counter() - started
+                totals["live"][1] += counted.round_trips
+                totals["live"][2] += len(cards)
+
+                counted = RoundTripCounter(page)
+                started = time.perf_counter()
+                cards = await fast_extract(counted)
+                totals[fast_mode][0] += time.perf_counter() - started
+                totals[fast_mode][1] += counted.round_trips
+                totals[fast_mode][2] += len(cards)
+        await browser.close()
+
+    runs = len(paths) * repeat
+    print(f"{site}: {len(paths)} page(s) x {repeat} run(s)")
+    print(f"{'mode':<10}{'ms/page':>12}{'round trips/page':>20}{'cards/page':>14}")
+    for mode, (elapsed, trips, cards) in totals.items():
+        print(f"{mode:<10}{elapsed / runs * 1000:>12.1f}{trips / runs:>20.1f}{cards / runs:>14.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--site", choices=["amazon", "flipkart", "ajio", "myntra"], required=True)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("pages", nargs="+", help="saved listing page HTML files")
+    args = parser.parse_args()
+    asyncio.run(run(args.site, args.pages, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
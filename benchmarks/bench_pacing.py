@@ -0,0 +1,121 @@
+"""Fixed host pacing vs the adaptive (token bucket + AIMD) pacer against a server that rate-limits.
+
+Usage:
+    python benchmarks/bench_pacing.py                                  # capacity 20 req/s, 6 in flight
+    python benchmarks/bench_pacing.py --pages 600 --capacity 40 --max-inflight 10 --delays 0.5 0.1 0.01
+
+A local server on 127.0.0.1 answers --latency seconds late and with 429 (Retry-After: 1)
+whenever a request would exceed --capacity requests in the last second or
+--max-inflight concurrent requests; the client does not know either number. Every
+page is fetched through http_fetch.AsyncFetcher and retried until it gets a 200. Each
+host_delay in --delays is run once as a fixed gap and once as the adaptive pacer's
+starting pace. Reports pages/s, 429s received and the adaptive pacer's final state.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_fetch import AsyncFetcher
+
+BODY = b"<html><body>" + b"<p>product</p>" * 200 + b"</body></html>"
+
+
+class LimitedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            now = time.monotonic()
+            while server.recent and now - server.recent[0] > 1.0:
+                server.recent.popleft()
+            allowed = len(server.recent) < server.capacity and server.inflight < server.max_inflight
+            if allowed:
+                server.recent.append(now)
+                server.inflight += 1
+            else:
+                server.rejected += 1
+        if not allowed:
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        try:
+            time.sleep(server.latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+        finally:
+            with server.lock:
+                server.inflight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(capacity, max_inflight, latency):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), LimitedHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.recent = deque()
+    server.capacity, server.max_inflight, server.latency = capacity, max_inflight, latency
+    server.inflight = server.rejected = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def run(urls, host_delay, adaptive, per_host):
+    async with AsyncFetcher(concurrency=per_host, per_host=per_host, host_delay=host_delay, adaptive=adaptive) as http:
+
+        async def fetch(url):
+            while (await http.get(url)).status_code != 200:
+                pass
+
+        started = time.perf_counter()
+        await asyncio.gather(*(fetch(url) for url in urls))
+        elapsed = time.perf_counter() - started
+        return elapsed, http.requests, http.pacing_summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--capacity", type=int, default=20, help="requests per second the server accepts")
+    parser.add_argument("--max-inflight", type=int, default=6, help="concurrent requests the server accepts")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--per-host", type=int, default=16, help="client-side ceiling on requests in flight")
+    parser.add_argument("--delays", type=float, nargs="+", default=[0.5, 0.1, 0.0], help="host_delay values to start from")
+    args = parser.parse_args()
+
+    server = serve(args.capacity, args.max_inflight, args.latency)
+    base = f"http://127.0.0.1:{server.server_address[1]}/p"
+    urls = [f"{base}/{n}" for n in range(args.pages)]
+
+    runs = [(f"{'adaptive' if adaptive else 'fixed'} {delay:g}s", delay, adaptive)
+            for delay in args.delays for adaptive in (False, True)]
+    results = []
+    for label, delay, adaptive in runs:
+        rejected_before = server.rejected
+        elapsed, requests, summary = asyncio.run(run(urls, delay, adaptive, args.per_host))
+        results.append((label, elapsed, requests, server.rejected - rejected_before, summary))
+    server.shutdown()
+
+    print(f"\n{args.pages} pages; server takes {args.capacity} req/s, {args.max_inflight} in flight, "
+          f"{args.latency * 1000:.0f} ms latency; client ceiling {args.per_host} in flight")
+    print(f"{'pacing':<22}{'seconds':>10}{'pages/s':>10}{'requests':>10}{'429s':>8}")
+    for label, elapsed, requests, rejected, summary in results:
+        print(f"{label:<22}{elapsed:>10.1f}{args.pages / elapsed:>10.1f}{requests:>10}{rejected:>8}")
+        for line in summary:
+            print(f"    {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Retrying failed fetches in place vs deferring them to retry_queue.RetryQueue and draining after the main pass.
+
+Usage:
+    python benchmarks/bench_retry_queue.py                          # 400 pages, 15% flaky, 2% always failing
+    python benchmarks/bench_retry_queue.py --pages 1000 --flaky 0.3 --dead 0.05 --concurrency 8 --base-delay 0.5
+
+A local server on 127.0.0.1 answers every page after --latency seconds. A --flaky share
+of the pages answer 503 to their first one to three requests, and a --dead share always
+do. Every page goes through http_fetch.AsyncFetcher at --concurrency, in two modes:
+  inline    a failed page is retried on the spot, sleeping out the backoff while it holds
+            its concurrency slot (what a retry loop around the fetch would do)
+  deferred  a failed page is pushed onto a RetryQueue, the main pass moves on, and the
+            queue is drained afterwards with the same backoff and attempt limit
+Both modes back off with retry_queue.backoff_delay() and give up after RETRY_MAX_ATTEMPTS.
+Reports total seconds, when the last healthy page was done, and how many pages were
+recovered and given up on.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import retry_queue
+from http_fetch import AsyncFetcher
+from retry_queue import DeadLetters, RetryQueue, backoff_delay, status_error
+
+BODY = b"<html><body>" + b"<p>product</p>" * 200 + b"</body></html>"
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            seen = server.requests[self.path] = server.requests.get(self.path, 0) + 1
+        time.sleep(server.latency)
+        if seen <= server.failures.get(self.path, 0):
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+async def fetch(http, url):
+    resp = await http.get(url)
+    if resp.status_code != 200:
+        raise status_error(resp.status_code)
+
+
+async def run_inline(urls, concurrency, max_attempts):
+    slots = asyncio.Semaphore(concurrency)
+    healthy_done = recovered = dead = 0
+    started = time.perf_counter()
+    async with AsyncFetcher(concurrency=concurrency, per_host=concurrency, host_delay=0) as http:
+
+        async def one(url):
+            nonlocal healthy_done, recovered, dead
+            async with slots:
+                for attempt in range(1, max_attempts + 1):
+                    try:
+                        await fetch(http, url)
+                    except Exception:
+                        if attempt < max_attempts:
+                            await asyncio.sleep(backoff_delay(attempt))
+                        continue
+                    if attempt == 1:
+                        healthy_done = time.perf_counter() - started
+                    else:
+                        recovered += 1
+                    return
+                dead += 1
+
+        await asyncio.gather(*(one(url) for url in urls))
+    return time.perf_counter() - started, healthy_done, recovered, dead
+
+
+async def run_deferred(urls, concurrency, max_attempts, dead_path):
+    slots = asyncio.Semaphore(concurrency)
+    healthy_done = 0.0
+    retries = RetryQueue("bench", DeadLetters(dead_path, "bench"), max_attempts, concurrency)
+    started = time.perf_counter()
+    async with AsyncFetcher(concurrency=concurrency, per_host=concurrency, host_delay=0) as http:
+
+        async def one(url):
+            nonlocal healthy_done
+            async with slots:
+                try:
+                    await fetch(http, url)
+                except Exception as e:
+                    retries.push("page", url, None, e)
+                    return
+            healthy_done = time.perf_counter() - started
+
+        await asyncio.gather(*(one(url) for url in urls))
+
+        async def retry(item):
+            await fetch(http, item.url)
+
+        await retries.drain(retry)
+    return time.perf_counter() - started, healthy_done, retries.recovered, retries.dead
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--flaky", type=float, default=0.15, help="share of pages failing their first 1-3 requests")
+    parser.add_argument("--dead", type=float, default=0.02, help="share of pages that always fail")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=6)
+    parser.add_argument("--base-delay", type=float, default=1.0, help="RETRY_BASE_DELAY for both modes")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    retry_queue.RETRY_BASE_DELAY = args.base_delay
+    rng = random.Random(args.seed)
+    paths = [f"/p/{n}" for n in range(args.pages)]
+    failures = {}
+    for path in paths:
+        roll = rng.random()
+        if roll < args.dead:
+            failures[path] = 10 ** 9
+        elif roll < args.dead + args.flaky:
+            failures[path] = rng.randint(1, 3)
+
+    results = {}
+    for mode in ("inline", "deferred"):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+        server.daemon_threads = True
+        server.lock = threading.Lock()
+        server.requests, server.failures, server.latency = {}, failures, args.latency
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        urls = [f"http://127.0.0.1:{server.server_address[1]}{path}" for path in paths]
+        max_attempts = retry_queue.RETRY_MAX_ATTEMPTS
+        if mode == "inline":
+            results[mode] = asyncio.run(run_inline(urls, args.concurrency, max_attempts))
+        else:
+            with tempfile.TemporaryDirectory() as tmp:
+                results[mode] = asyncio.run(run_deferred(urls, args.concurrency, max_attempts,
+                                                         os.path.join(tmp, "dead.jsonl")))
+        server.shutdown()
+
+    flaky = sum(1 for count in failures.values() if count < 10 ** 9)
+    print(f"\n{args.pages} pages ({flaky} flaky, {len(failures) - flaky} always failing), concurrency "
+          f"{args.concurrency}, {args.latency * 1000:.0f} ms latency, backoff base {args.base_delay:g}s, "
+          f"{retry_queue.RETRY_MAX_ATTEMPTS} attempts")
+    print(f"{'mode':<10}{'total s':>10}{'healthy done s':>16}{'recovered':>11}{'given up':>10}")
+    for mode, (total, healthy, recovered, dead) in results.items():
+        print(f"{mode:<10}{total:>10.1f}{healthy:>16.1f}{recovered:>11}{dead:>10}")
+
+
+if __name__ == "__main__":
+    main()
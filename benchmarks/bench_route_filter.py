@@ -0,0 +1,131 @@
+"""Measure page load time and bandwidth with and without the shared route filter.
+
+Usage:
+    python benchmarks/bench_route_filter.py                       # synthetic marketplace-like fixture
+    python benchmarks/bench_route_filter.py --dir saved/ --page amazon_pdp.html
+
+Pages are served from a local HTTP server on 127.0.0.1. The synthetic fixture pulls
+images, a font, a video and a "third-party" analytics script from http://localhost,
+which the filter treats as off-allowlist. Reports per-page load time, bytes received,
+blocked requests and bytes saved against the unfiltered run.
+"""
+import argparse
+import asyncio
+import functools
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.async_api import async_playwright
+
+from route_filter import RouteStats, install_route_filter
+
+
+def build_fixture(directory, port):
+    third_party = f"http://localhost:{port}"
+    assets = {
+        "app.js": b"document.body.dataset.ready = '1';" + b" " * 40_000,
+        "site.css": b"body { font-family: sans-serif; }" + b" " * 20_000,
+        "analytics.js": b"/* tracker */" + b" " * 80_000,
+        "font.woff2": os.urandom(120_000),
+        "promo.mp4": os.urandom(600_000),
+    }
+    for i in range(20):
+        assets[f"img{i}.jpg"] = os.urandom(60_000)
+    for name, body in assets.items():
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(body)
+
+    cards = "\n".join(
+        f'<div data-asin="B{i:03d}"><img src="img{i}.jpg"><h2><span>Product {i}</span></h2></div>'
+        for i in range(20)
+    )
+    page = f"""<html><head>
+<link rel="stylesheet" href="site.css">
+<style>@font-face {{ font-family: F; src: url(font.woff2); }} body {{ font-family: F; }}</style>
+<script src="app.js"></script>
+<script src="{third_party}/analytics.js"></script>
+</head><body>{cards}<video src="promo.mp4" autoplay muted></video></body></html>"""
+    with open(os.path.join(directory, "index.html"), "w", encoding="utf-8") as f:
+        f.write(page)
+    return "index.html"
+
+
+def serve(directory):
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=directory)
+    handler.log_message = lambda *args: None
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def measure(browser, url, filtered, repeat):
+    load_times, received, blocked = [], [], []
+    for _ in range(repeat):
+        context = await browser.new_context()
+        stats = RouteStats()
+        if filtered:
+            await install_route_filter(context, "fixture", stats, allow_domains=["127.0.0.1"])
+        counted = {"bytes": 0}
+
+        async def on_finished(request):
+            try:
+                sizes = await request.sizes()
+                counted["bytes"] += sizes["responseBodySize"] + sizes["responseHeadersSize"]
+            except Exception:
+                pass
+        context.on("requestfinished", on_finished)
+
+        page = await context.new_page()
+        started = time.perf_counter()
+        await page.goto(url, wait_until="load")
+        load_times.append(time.perf_counter() - started)
+        await page.wait_for_timeout(200)  # let the last requestfinished sizes() calls land
+        received.append(counted["bytes"])
+        blocked.append(stats.blocked)
+        await context.close()
+    return sum(load_times) / repeat, sum(received) / repeat, sum(blocked) / repeat
+
+
+async def run(directory, page_name, repeat):
+    server = serve(directory)
+    port = server.server_address[1]
+    if page_name is None:
+        page_name = build_fixture(directory, port)
+    url = f"http://127.0.0.1:{port}/{page_name}"
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        baseline = await measure(browser, url, False, repeat)
+        filtered = await measure(browser, url, True, repeat)
+        await browser.close()
+    server.shutdown()
+
+    print(f"{url} x {repeat} load(s)")
+    print(f"{'mode':<12}{'load ms':>10}{'KB received':>14}{'blocked':>10}")
+    for name, (load, received, blocked) in (("unfiltered", baseline), ("filtered", filtered)):
+        print(f"{name:<12}{load * 1000:>10.1f}{received / 1024:>14.1f}{blocked:>10.1f}")
+    print(f"saved per page: {(baseline[0] - filtered[0]) * 1000:.1f} ms, {(baseline[1] - filtered[1]) / 1024:.1f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", help="directory to serve (default: generated fixture)")
+    parser.add_argument("--page", help="page inside --dir to load")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.dir:
+        asyncio.run(run(args.dir, args.page, args.repeat))
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            asyncio.run(run(directory, None, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
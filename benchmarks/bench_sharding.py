@@ -0,0 +1,121 @@
+"""Measure how PDP throughput scales with the number of sharded worker processes.
+
+Usage:
+    python benchmarks/bench_sharding.py                          # 400 PDPs, 1 / 2 / 4 workers
+    python benchmarks/bench_sharding.py --pdps 1000 --workers 1 2 4 8 --latency 0.05
+
+Uses the Flipkart PDP stage, which is plain HTTP + parsing and needs no browser.
+Synthetic PDPs (large spec tables, so parsing costs real CPU) are served from a
+local HTTP server on 127.0.0.1 with an artificial per-response latency. For each
+worker count a fresh frontier is filled and drained by sharding.run_stage();
+reports pages/s, speedup over one worker, and whether the merged output kept the
+enqueue order.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import flipkart_scraper_full as flipkart
+import sharding
+
+SETTINGS = {
+    "USE_RESPONSE_CACHE": False,
+    "INCREMENTAL_MODE": "off",
+    "PDP_HOST_DELAY": 0,
+    "PDP_PER_HOST_LIMIT": 8,
+}
+
+
+def build_pdp(n, spec_rows):
+    specs = "".join(
+        f'<div class="row"><div class="col col-3-12">Spec {i}</div><div class="col col-9-12">Value {n}-{i}</div></div>'
+        for i in range(spec_rows)
+    )
+    cards = "".join(
+        f'<div><div class="_0B07y7"><img src="https://img.example/{n}/{i}.jpg"></div>'
+        f'<div class="_9GQWrZ">Card {i}</div><div class="AoD2-N"><p>Description {n}-{i} ' + "lorem " * 40 + "</p></div></div>"
+        for i in range(spec_rows // 4)
+    )
+    return (f'<html><body><span class="mEh187">Brand {n}</span><span class="VU-ZEz">Product {n}</span>'
+            f'<div class="Nx9bqj">₹{500 + n}</div><div class="yRaY8j">₹{900 + n}</div>'
+            f'<div class="Cnl9Jt"><div class="_5Pmv5S">{specs}</div></div><div class="pqHCzB">{cards}</div>'
+            f'</body></html>').encode("utf-8")
+
+
+class PdpHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        n = int(self.path.rsplit("/", 1)[-1].split("?")[0])
+        body = build_pdp(n, self.server.spec_rows)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(latency, spec_rows):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PdpHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.spec_rows = spec_rows
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(workers, urls):
+    with tempfile.TemporaryDirectory() as out_dir:
+        frontier = flipkart.open_frontier(out_dir).begin(fresh=True)
+        frontier.enqueue("pdp", [(url, {"Data ID": f"P{i}", "Product URL": url}) for i, url in enumerate(urls)])
+        frontier.close()
+
+        done, elapsed = sharding.run_stage("flipkart", "pdp", out_dir, workers, settings=SETTINGS)
+
+        frontier = flipkart.open_frontier(out_dir)
+        flipkart.write_outputs(frontier, out_dir)
+        frontier.close()
+        with open(flipkart.PDP_OUTPUT_JSON, encoding="utf-8") as f:
+            ordered = [record["Product URL"] for record in json.load(f)] == urls
+    return done, elapsed, ordered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdps", type=int, default=400)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds the server waits before each response")
+    parser.add_argument("--spec-rows", type=int, default=400, help="spec table rows per PDP (parse cost)")
+    args = parser.parse_args()
+
+    server = serve(args.latency, args.spec_rows)
+    base = f"http://127.0.0.1:{server.server_address[1]}/p"
+    urls = [f"{base}/{n}" for n in range(args.pdps)]
+    page_kb = len(build_pdp(0, args.spec_rows)) / 1024
+
+    results = []
+    for workers in args.workers:
+        done, elapsed, ordered = run(workers, urls)
+        results.append((workers, done, elapsed, ordered))
+    server.shutdown()
+
+    print(f"\n{args.pdps} PDPs of {page_kb:.0f} KB, {args.latency * 1000:.0f} ms server latency, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8}{'done':>8}{'seconds':>10}{'pages/s':>10}{'speedup':>10}{'in order':>10}")
+    base_rate = None
+    for workers, done, elapsed, ordered in results:
+        rate = done / elapsed if elapsed else 0.0
+        base_rate = base_rate or rate
+        print(f"{workers:>8}{done:>8}{elapsed:>10.1f}{rate:>10.1f}{rate / base_rate:>9.2f}x{'yes' if ordered else 'NO':>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Measure how long the headless runner takes to start, per scraper, in fresh processes.
+
+Usage:
+    python benchmarks/bench_startup.py                 # every site, 5 runs each
+    python benchmarks/bench_startup.py --runs 10 --site amazon
+
+Each run spawns `python run_job.py <job> --check`, which parses the job file and
+imports the scraper module(s) without scraping. Reports the median in-process
+startup the runner prints, the wall-clock time of the whole process (interpreter
+boot included) and whether tkinter got imported along the way.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from run_job import SCRAPER_MODULES
+
+
+def measure(site, runs):
+    job = {"output_dir": tempfile.gettempdir(), "jobs": [{"site": site, "links": ["https://example.com/"]}]}
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(job, f)
+    startups, walls, tkinter_loaded = [], [], False
+    try:
+        for _ in range(runs):
+            started = time.perf_counter()
+            out = subprocess.run([sys.executable, os.path.join(ROOT, "run_job.py"), f.name, "--check"],
+                                 capture_output=True, text=True, encoding="utf-8", cwd=ROOT, check=True).stdout
+            walls.append(time.perf_counter() - started)
+            startups.append(float(re.search(r"Startup: (\d+) ms", out).group(1)) / 1000)
+            tkinter_loaded |= "tkinter loaded: yes" in out
+    finally:
+        os.remove(f.name)
+    return statistics.median(startups), statistics.median(walls), tkinter_loaded
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--site", choices=sorted(SCRAPER_MODULES), action="append")
+    args = parser.parse_args()
+
+    print(f"{'site':<10} {'startup':>10} {'process':>10}  tkinter")
+    for site in args.site or list(SCRAPER_MODULES):
+        startup, wall, tkinter_loaded = measure(site, args.runs)
+        print(f"{site:<10} {startup * 1000:>8.0f}ms {wall * 1000:>8.0f}ms  {'loaded' if tkinter_loaded else 'not loaded'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Run the lease queue end to end on one machine, with a worker killed part-way through.
+
+Usage:
+    python benchmarks/bench_work_queue.py                         # HTTP broker, 3 workers, one killed
+    python benchmarks/bench_work_queue.py --broker file --workers 4 --pdps 600 --kill-after 0
+
+Serves synthetic Flipkart PDPs from 127.0.0.1 (see bench_sharding.py), puts them
+straight on the PDP queue (the listing stage needs a browser), starts the
+workers as separate `work_queue.py work` processes and SIGKILLs one of them
+--kill-after seconds in. Its leases are never renewed, expire after --lease
+seconds and are redelivered to the survivors. Reports pages/s, redeliveries,
+failed rows, heartbeats and whether the merged output has every PDP once, in
+enqueue order.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import flipkart_scraper_full as flipkart
+import work_queue
+from bench_sharding import SETTINGS, serve as serve_pdps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--broker", choices=["http", "file"], default="http")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--pdps", type=int, default=300)
+    parser.add_argument("--lease", type=float, default=4.0, help="lease length in seconds")
+    parser.add_argument("--kill-after", type=float, default=3.0, help="seconds before one worker is killed (0 = never)")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--spec-rows", type=int, default=200)
+    args = parser.parse_args()
+
+    pdp_server = serve_pdps(args.latency, args.spec_rows)
+    urls = [f"http://127.0.0.1:{pdp_server.server_address[1]}/p/{n}" for n in range(args.pdps)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "queue.sqlite")
+        if args.broker == "http":
+            broker_server = work_queue.serve(db_path, "127.0.0.1", 0, args.lease)
+            threading.Thread(target=broker_server.serve_forever, daemon=True).start()
+            address = f"http://127.0.0.1:{broker_server.server_address[1]}"
+        else:
+            work_queue.FileBroker(db_path, args.lease).close()
+            address = db_path
+        broker = work_queue.connect(address)
+        queue = work_queue.SiteQueue(broker, "flipkart", "coordinator")
+        queue.enqueue("pdp", [(url, {"Data ID": f"P{i}", "Product URL": url}) for i, url in enumerate(urls)])
+        broker.set_meta("job:flipkart", {"state": "running", "limit": None, "settings": SETTINGS})
+
+        env = {**os.environ, "PYTHONUNBUFFERED": "1"}
+        started = time.perf_counter()
+        workers = [
+            subprocess.Popen(
+                [sys.executable, os.path.join(ROOT, "work_queue.py"), "work", "--broker", address, "--site", "flipkart",
+                 "--work-dir", os.path.join(tmp, f"worker{n}"), "--heartbeat", str(args.lease / 4), "--poll", "0.5"],
+                cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding="utf-8",
+            )
+            for n in range(args.workers)
+        ]
+        killed = None
+        if args.kill_after and len(workers) > 1:
+            time.sleep(args.kill_after)
+            killed = workers[0]
+            killed.kill()
+            print(f"💥 Killed worker pid {killed.pid} after {args.kill_after:.0f}s")
+
+        counts = work_queue.wait_until_drained(queue, "pdp", poll=1)
+        elapsed = time.perf_counter() - started
+        out_dir = os.path.join(tmp, "out")
+        os.makedirs(out_dir)
+        flipkart.write_outputs(queue, out_dir)
+        broker.set_meta("job:flipkart", {"state": "finished", "limit": None, "settings": SETTINGS})
+        work_queue.shutdown_workers(broker)
+
+        logs = []
+        for proc in workers:
+            output = proc.communicate(timeout=120)[0]
+            logs.append((proc, output.strip().splitlines()[-1:] if output else []))
+        with open(flipkart.PDP_OUTPUT_JSON, encoding="utf-8") as f:
+            merged = [record["Product URL"] for record in json.load(f)]
+        broker.close()
+    pdp_server.shutdown()
+
+    print(f"\n{args.pdps} PDPs, {args.workers} workers over a {args.broker} broker, {args.lease:.0f}s leases")
+    for proc, tail in logs:
+        status = "killed" if proc is killed else f"exit {proc.returncode}"
+        print(f"  pid {proc.pid}: {status}  {tail[0] if tail and proc is not killed else ''}")
+    rate = counts[work_queue.DONE] / elapsed if elapsed else 0.0
+    print(f"done {counts[work_queue.DONE]}, failed {counts[work_queue.FAILED]}, redeliveries {counts['redelivered']}, "
+          f"{elapsed:.1f}s ({rate:.1f} pages/s)")
+    print(f"merged output: {len(merged)} records, every PDP once in enqueue order: {'yes' if merged == urls else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import inspect
+
+
+class RoundTripCounter:
+    # Wraps a Playwright page / handle / locator and counts every awaited call,
+    # i.e. every CDP round trip the extraction code pays for.
+    def __init__(self, target, stats=None):
+        self._target = target
+        self._stats = stats if stats is not None else {"round_trips": 0}
+
+    @property
+    def round_trips(self):
+        return self._stats["round_trips"]
+
+    def _wrap(self, value):
+        if isinstance(value, list):
+            return [self._wrap(v) for v in value]
+        if value is None or isinstance(value, (str, bytes, int, float, bool, dict)):
+            return value
+        return RoundTripCounter(value, self._stats)
+
+    async def _count(self, awaitable):
+        self._stats["round_trips"] += 1
+        return self._wrap(await awaitable)
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return self._wrap(attr)
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if inspect.isawaitable(result):
+                return self._count(result)
+            return self._wrap(result)
+        return call
+
+    def __bool__(self):
+        return bool(self._target)
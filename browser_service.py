@@ -0,0 +1,199 @@
+import argparse
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from route_filter import install_route_filter
+
+# ----------------------------------------
+# Long-lived browser service + warm context reuse.
+# Every run (and every sharded worker) otherwise pays a Chromium cold start.
+#     python browser_service.py serve                 # one Chromium, CDP on 127.0.0.1:9222
+# then set BROWSER_ENDPOINT = "http://127.0.0.1:9222" on a scraper (or in a job
+# file's "settings"): it attaches over CDP instead of launching, and closing the
+# browser only disconnects. If the service is not reachable the scraper logs it
+# and launches its own Chromium as before.
+# Contexts belong to the connection that made them and close when it
+# disconnects, so they cannot outlive a run; ContextPool instead creates a run's
+# contexts up front (route filter installed) and keeps them for the whole run,
+# across batches, replacing each one after CONTEXT_MAX_USES pages.
+# ----------------------------------------
+
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 9222
+ATTACH_TIMEOUT_MS = 5000
+# Pages a pooled context serves before it is closed and replaced by a fresh one (cookies, cache, leaks)
+CONTEXT_MAX_USES = 100
+
+
+class StartStats:
+    # Browser start overhead for the current run: launch vs attach time, and time until the first page loaded
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.launches = 0
+        self.attaches = 0
+        self.fallbacks = 0
+        self.start_seconds = 0.0
+        self.first_page_seconds = None
+        self._started = None
+
+    def begin(self):
+        if self._started is None:
+            self._started = time.perf_counter()
+        return time.perf_counter()
+
+    def record(self, kind, started):
+        self.start_seconds += time.perf_counter() - started
+        if kind == "attach":
+            self.attaches += 1
+        else:
+            self.launches += 1
+
+    def _page_loaded(self, _page):
+        if self.first_page_seconds is None and self._started is not None:
+            self.first_page_seconds = time.perf_counter() - self._started
+
+    def watch(self, context):
+        context.on("page", lambda page: page.once("load", self._page_loaded))
+
+    def summary(self):
+        if not (self.launches or self.attaches):
+            return "🚀 Browser: not started"
+        line = (f"🚀 Browser: {self.launches} launched, {self.attaches} attached, "
+                f"{self.start_seconds:.2f}s start overhead")
+        if self.fallbacks:
+            line += f", {self.fallbacks} service fallback(s)"
+        if self.first_page_seconds is not None:
+            line += f", first page after {self.first_page_seconds:.2f}s"
+        return line
+
+
+stats = StartStats()
+
+
+async def launch_or_attach(playwright, headless=True, endpoint=None):
+    # Attaches to the browser service when an endpoint is given, launches Chromium otherwise (or if that fails)
+    started = stats.begin()
+    if endpoint:
+        try:
+            browser = await playwright.chromium.connect_over_cdp(endpoint, timeout=ATTACH_TIMEOUT_MS)
+            stats.record("attach", started)
+            return browser
+        except Exception as e:
+            stats.fallbacks += 1
+            print(f"⚠️ Browser service at {endpoint} not reachable ({e}); launching Chromium instead")
+    browser = await playwright.chromium.launch(headless=headless)
+    stats.record("launch", started)
+    return browser
+
+
+async def open_context(browser, **options):
+    context = await browser.new_context(**options)
+    stats.watch(context)
+    return context
+
+
+class ContextPool:
+    # `size` contexts created concurrently, each with the site's route filter; pages are opened per slot
+    def __init__(self, browser, size, site, route_stats=None, cache=None, options=None, max_uses=None):
+        self.browser = browser
+        self.size = max(1, size)
+        self.site = site
+        self.route_stats = route_stats
+        self.cache = cache
+        self.options = options or {}
+        self.max_uses = max_uses or CONTEXT_MAX_USES
+        self.contexts = []
+        self.recycled = 0
+        self._uses = {}
+        self._open = {}
+        self._retired = set()
+
+    async def _fresh(self):
+        context = await open_context(self.browser, **self.options)
+        self.route_stats = await install_route_filter(context, self.site, self.route_stats, cache=self.cache)
+        self._open[context] = 0
+        self._uses[context] = 0
+        return context
+
+    async def warm(self):
+        if not self.contexts:
+            self.contexts = list(await asyncio.gather(*(self._fresh() for _ in range(self.size))))
+        return self
+
+    def __len__(self):
+        return self.size
+
+    @asynccontextmanager
+    async def page(self, slot=0):
+        slot %= self.size
+        context = self.contexts[slot]
+        self._open[context] += 1
+        page = None
+        try:
+            page = await context.new_page()
+            yield page
+        finally:
+            if page is not None:
+                await page.close()
+            self._open[context] -= 1
+            self._uses[context] += 1
+            if context is self.contexts[slot] and self._uses[context] >= self.max_uses:
+                # New pages go to a fresh context straight away; the old one closes once its last page has
+                self.contexts[slot] = await self._fresh()
+                self._retired.add(context)
+                self.recycled += 1
+            if context in self._retired and not self._open[context]:
+                self._retired.discard(context)
+                del self._open[context], self._uses[context]
+                await context.close()
+
+    async def close(self):
+        for context in list(self._open):
+            await context.close()
+        self._open.clear()
+        self._uses.clear()
+        self._retired.clear()
+        self.contexts = []
+
+
+async def serve(host=SERVICE_HOST, port=SERVICE_PORT, headless=True):
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
+        started = time.perf_counter()
+        browser = await p.chromium.launch(
+            headless=headless,
+            args=[f"--remote-debugging-address={host}", f"--remote-debugging-port={port}"],
+        )
+        endpoint = f"http://{host}:{port}"
+        print(f"🌐 Chromium {browser.version} up in {time.perf_counter() - started:.2f}s, "
+              f"set BROWSER_ENDPOINT = \"{endpoint}\" (Ctrl+C to stop)")
+        closed = asyncio.Event()
+        browser.on("disconnected", lambda _: closed.set())
+        try:
+            await closed.wait()
+            print("❌ Chromium exited")
+        finally:
+            if browser.is_connected():
+                await browser.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-lived Chromium the scrapers attach to over CDP")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_cmd = sub.add_parser("serve", help="launch Chromium and keep it running")
+    serve_cmd.add_argument("--host", default=SERVICE_HOST)
+    serve_cmd.add_argument("--port", type=int, default=SERVICE_PORT)
+    serve_cmd.add_argument("--headed", action="store_true", help="show the browser window")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, not args.headed))
+    except KeyboardInterrupt:
+        print("👋 Browser service stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import json
+
+from metrics import stats as metrics
+
+# ----------------------------------------
+# Declarative listing-card extraction.
+# Each site's card fields are described once below and compiled into a single
+# page.evaluate() script that reads every card on the page and returns them as
+# one JSON array: one round trip per listing page instead of several locator
+# calls per card (each of which could wait out its full timeout when a field
+# is missing).
+#
+# A field is a spec, or a list of specs tried in order until one gives a value:
+#   selector   CSS selector inside the card (omitted = the card element itself)
+#   source     "text" (innerText, default), "content" (textContent), "attr:<name>",
+#              or "visible" ("Yes" / "No" for whether the element is rendered)
+#   post       string ops applied in order: "digits", "match:<regex>" (group 1 if
+#              any), "prefix:<s>", "join:<origin>" (only for "/..." paths)
+# Fields that come out empty get DEFAULT; a card missing a "required" field is
+# returned as None so the caller can skip it and still count it.
+# ----------------------------------------
+
+DEFAULT = "N/A"
+
+CARD_SCHEMAS = {
+    "ajio": {
+        "cards": "#products .item",
+        "required": [],
+        "fields": {
+            "Data ID": {"source": "attr:data-id"},
+            "Brand Name": {"selector": ".brand", "source": "content"},
+            "Product Name": {"selector": ".nameCls", "source": "content"},
+            "Product URL": {"selector": "a", "source": "attr:href", "post": ["join:https://www.ajio.com"]},
+            "Rating": {"selector": "._1gIWf ._3I65V", "source": "content"},
+            "Rating Count": {"selector": 'p[aria-label*="|"]', "source": "content"},
+            "Price": {"selector": ".price strong", "source": "content"},
+            "Original Price": {"selector": ".orginal-price", "source": "content"},
+            "Discount": {"selector": ".discount", "source": "content"},
+            "Bestseller": {"selector": ".exclusive-new", "source": "visible"},
+        },
+    },
+    "myntra": {
+        "cards": "#desktopSearchResults .results-base li",
+        "required": ["Data ID"],
+        "fields": {
+            "Data ID": [
+                {"source": "attr:id"},
+                {"selector": 'a[data-refreshpage="true"]', "source": "attr:href", "post": [r"match:/(\d+)/buy$"]},
+            ],
+            "Brand Name": {"selector": "h3"},
+            "Product Name": {"selector": "h4.product-product"},
+            "Product URL": {"selector": 'a[data-refreshpage="true"]', "source": "attr:href",
+                            "post": ["prefix:https://www.myntra.com/"]},
+            "Rating": {"selector": ".product-ratingsContainer span"},
+            "Rating Count": {"selector": ".product-ratingsContainer .product-ratingsCount", "post": ["digits"]},
+        },
+    },
+}
+
+_EXTRACT_JS = """
+(start) => {
+    const schema = __SCHEMA__;
+    const apply = (op, value) => {
+        const cut = op.indexOf(":");
+        const name = cut < 0 ? op : op.slice(0, cut);
+        const arg = cut < 0 ? "" : op.slice(cut + 1);
+        if (name === "digits") return value.replace(/\\D/g, "");
+        if (name === "match") {
+            const m = value.match(new RegExp(arg));
+            return m ? (m[1] !== undefined ? m[1] : m[0]) : "";
+        }
+        if (name === "prefix") return arg + value;
+        if (name === "join") return value.startsWith("/") ? arg + value : value;
+        throw new Error("unknown post op " + op);
+    };
+    const read = (card, spec) => {
+        const el = spec.selector ? card.querySelector(spec.selector) : card;
+        const source = spec.source || "text";
+        if (source === "visible") return el && el.getClientRects().length ? "Yes" : "No";
+        if (!el) return "";
+        let value = source === "text" ? el.innerText
+            : source === "content" ? el.textContent
+            : el.getAttribute(source.slice(5));
+        value = (value || "").trim();
+        for (const op of spec.post || []) {
+            if (!value) break;
+            value = apply(op, value).trim();
+        }
+        return value;
+    };
+    return Array.from(document.querySelectorAll(schema.cards)).slice(start).map(card => {
+        const out = {};
+        for (const [key, specs] of schema.fields) {
+            let value = "";
+            for (const spec of specs) {
+                value = read(card, spec);
+                if (value) break;
+            }
+            if (!value && schema.required.includes(key)) return null;
+            out[key] = value || schema.default;
+        }
+        return out;
+    });
+}
+"""
+
+_COMPILED = {}
+
+
+def compile_schema(schema):
+    # Field order is kept (a list of pairs, not a JS object) so records come back with the keys in schema order
+    fields = [[key, spec if isinstance(spec, list) else [spec]] for key, spec in schema["fields"].items()]
+    payload = {"cards": schema["cards"], "required": schema.get("required", []), "fields": fields,
+               "default": schema.get("default", DEFAULT)}
+    return _EXTRACT_JS.replace("__SCHEMA__", json.dumps(payload))
+
+
+def card_script(site):
+    if site not in _COMPILED:
+        _COMPILED[site] = compile_schema(CARD_SCHEMAS[site])
+    return _COMPILED[site]
+
+
+@metrics.timed("extract")
+async def extract_cards(page, site, start=0):
+    # Every card from index `start` on, in page order; None where a required field was missing
+    return await page.evaluate(card_script(site), start)
@@ -0,0 +1,141 @@
+import hashlib
+import math
+import mmap
+import os
+import re
+import struct
+from urllib.parse import parse_qs, urlsplit
+
+# ----------------------------------------
+# Product dedup index keyed on canonical product ID (ASIN, Flipkart pid,
+# Ajio product code, Myntra style ID), consulted before a PDP is queued.
+# Within a run an exact in-memory set catches the same product under several
+# links. An optional on-disk Bloom filter remembers every product scraped in
+# earlier runs at a fixed size however many IDs it holds; a hit there is
+# "probably seen" (false positives at BLOOM_ERROR_RATE, never false negatives).
+# ----------------------------------------
+
+BLOOM_CAPACITY = 5_000_000
+BLOOM_ERROR_RATE = 0.001
+
+_URL_ID_PATTERNS = {
+    "amazon": re.compile(r"/(?:dp|gp/product)/([A-Z0-9]{10})"),
+    "ajio": re.compile(r"/p/([^/?#]+)"),
+    "myntra": re.compile(r"/(\d+)/buy"),
+}
+_BLOOM_MAGIC = b"BLM1"
+_BLOOM_HEADER = struct.Struct("<4sQI")
+
+
+def canonical_product_id(site, item):
+    data_id = str(item.get("Data ID") or "").strip()
+    # Ajio falls back to a positional "AJIO_<n>" when a card has no data-id; that says nothing about the product
+    if data_id and data_id != "N/A" and not data_id.startswith("AJIO_"):
+        return f"{site}:{data_id}"
+
+    url = item.get("Product URL") or ""
+    if site == "flipkart":
+        pid = parse_qs(urlsplit(url).query).get("pid")
+        if pid:
+            return f"{site}:{pid[0]}"
+    elif site in _URL_ID_PATTERNS:
+        match = _URL_ID_PATTERNS[site].search(url)
+        if match:
+            return f"{site}:{match.group(1)}"
+    if url and url != "N/A":
+        parts = urlsplit(url)
+        return f"{site}:{parts.netloc.lower()}{parts.path}"
+    return None
+
+
+class BloomFilter:
+    # Bit array in a memory-mapped file: header (magic, bit count, hash count) then the bits
+    def __init__(self, path, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        self.path = path
+        if os.path.exists(path) and os.path.getsize(path) > _BLOOM_HEADER.size:
+            with open(path, "rb") as f:
+                magic, self.bits, self.hashes = _BLOOM_HEADER.unpack(f.read(_BLOOM_HEADER.size))
+            if magic != _BLOOM_MAGIC:
+                raise ValueError(f"{path} is not a Bloom filter file")
+        else:
+            self.bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+            self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+            with open(path, "wb") as f:
+                f.write(_BLOOM_HEADER.pack(_BLOOM_MAGIC, self.bits, self.hashes))
+                f.truncate(_BLOOM_HEADER.size + (self.bits + 7) // 8)
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+    def _positions(self, key):
+        # Kirsch-Mitzenmacher double hashing: k positions from one 128-bit digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def __contains__(self, key):
+        base = _BLOOM_HEADER.size
+        return all(self._map[base + pos // 8] & (1 << (pos % 8)) for pos in self._positions(key))
+
+    def add(self, key):
+        base = _BLOOM_HEADER.size
+        for pos in self._positions(key):
+            self._map[base + pos // 8] |= 1 << (pos % 8)
+
+    def close(self):
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+
+
+class DedupIndex:
+    def __init__(self, site, bloom_path=None, across_runs=False):
+        # across_runs: also turn away products the Bloom filter says an earlier run already scraped
+        self.site = site
+        self.across_runs = across_runs
+        self.bloom = BloomFilter(bloom_path) if bloom_path else None
+        self._seen = set()
+        self.admitted = 0
+        self.duplicates = 0
+        self.seen_in_earlier_runs = 0
+
+    def key(self, item):
+        return canonical_product_id(self.site, item)
+
+    def seed(self, items):
+        # Products already queued (e.g. by the interrupted run being resumed) count as seen
+        for item in items:
+            key = self.key(item or {})
+            if key:
+                self._seen.add(key)
+
+    def admit(self, item):
+        # True the first time a product turns up; False for repeats within the run (and across runs if asked)
+        key = self.key(item)
+        if key is None:
+            self.admitted += 1
+            return True
+        if key in self._seen:
+            self.duplicates += 1
+            return False
+        self._seen.add(key)
+        if self.across_runs and self.bloom is not None and key in self.bloom:
+            self.seen_in_earlier_runs += 1
+            return False
+        self.admitted += 1
+        return True
+
+    def remember(self, item):
+        # Called once a product's PDP is done, so a crashed run never marks unscraped products as seen
+        key = self.key(item)
+        if key and self.bloom is not None:
+            self.bloom.add(key)
+
+    def summary(self):
+        line = f"🧬 Dedup: {self.admitted} products queued for PDPs, {self.duplicates} duplicates dropped"
+        if self.across_runs:
+            line += f", {self.seen_in_earlier_runs} already scraped in earlier runs"
+        return line
+
+    def close(self):
+        if self.bloom is not None:
+            self.bloom.close()
@@ -1,6 +1,4 @@
 import time
-import tkinter as tk
-from tkinter import messagebox
 import asyncio
 from playwright.async_api import async_playwright
 import json
@@ -8,38 +6,92 @@ import csv
 import random
 import datetime
 import os
-import requests
-from bs4 import BeautifulSoup
 from datetime import datetime as dt
-
-# Output directories
+from html_parsing import parse_html, select, select_one, text_content, get_parser_backend
+from http_fetch import AsyncFetcher
+from route_filter import install_route_filter
+from browser_service import launch_or_attach, open_context, stats as browser_stats
+from readiness import wait_until_ready, stats as readiness_stats
+from pacing import make_pacer, paced
+from structured_data import flipkart_pdp_fields
+from record_stream import JsonlWriter, rebuild_json, rebuild_csv
+from frontier import Frontier
+from response_cache import ResponseCache
+from incremental import ProductFingerprints
+from dedup import DedupIndex
+from retry_queue import RetryQueue, DeadLetters, status_error
+from sharding import SHARD_BATCH_SIZE
+from metrics import stats as metrics
+
+# Output directory; every output path below lives in it. Change with set_save_dir(), it is created when a run starts.
 SAVE_DIR = r"FULL SCAPES\saved_data\Flipkart Data"
-PDP_ERROR_LOG = os.path.join(SAVE_DIR, "flipkart_pdp_errors.log")
-PDP_OUTPUT_JSON = os.path.join(SAVE_DIR, "flipkart_full_Data.json")
-PDP_OUTPUT_CSV = os.path.join(SAVE_DIR, "flipkart_full_Data.csv")
 
-os.makedirs(SAVE_DIR, exist_ok=True)
+def set_save_dir(path):
+    global SAVE_DIR, PDP_ERROR_LOG, PDP_OUTPUT_JSON, PDP_OUTPUT_CSV, PDP_OUTPUT_JSONL
+    global FRONTIER_DB, FINGERPRINT_DB, SEEN_IDS_BLOOM, DEAD_LETTERS_JSONL, RUN_REPORT_JSON
+    SAVE_DIR = path
+    PDP_ERROR_LOG = os.path.join(SAVE_DIR, "flipkart_pdp_errors.log")
+    DEAD_LETTERS_JSONL = os.path.join(SAVE_DIR, "flipkart_dead_letters.jsonl")
+    PDP_OUTPUT_JSON = os.path.join(SAVE_DIR, "flipkart_full_Data.json")
+    PDP_OUTPUT_CSV = os.path.join(SAVE_DIR, "flipkart_full_Data.csv")
+    PDP_OUTPUT_JSONL = os.path.join(SAVE_DIR, "flipkart_full_Data.jsonl")
+    FRONTIER_DB = os.path.join(SAVE_DIR, "flipkart_frontier.sqlite")
+    FINGERPRINT_DB = os.path.join(SAVE_DIR, "flipkart_fingerprints.sqlite")
+    SEEN_IDS_BLOOM = os.path.join(SAVE_DIR, "flipkart_seen_ids.bloom")
+    RUN_REPORT_JSON = os.path.join(SAVE_DIR, "flipkart_run_report.json")
+
+set_save_dir(SAVE_DIR)
+
+# Append each PDP to flipkart_full_Data.jsonl as it is parsed; at the end the JSONL, JSON and CSV are rewritten
+# from the frontier in listing order
+STREAM_OUTPUT = True
+# Listing links and PDP URLs live in a SQLite frontier so an interrupted run resumes where it stopped
+RESUME = True
+# Dev aid: serve pages from the on-disk response cache (SAVE_DIR / http_cache) while entries are fresh, so
+# re-running after a selector change re-parses without hitting the site
+USE_RESPONSE_CACHE = False
+# Re-scrape only what changed since the last run. Listing cards here carry no price or rating, so the default
+# is "revalidate": a conditional GET per PDP, with a 304 reusing last run's fields. "skip" trusts an unchanged
+# card outright, "off" always fetches.
+INCREMENTAL_MODE = "revalidate"
+# Remember every scraped product ID in an on-disk Bloom filter (SAVE_DIR/flipkart_seen_ids.bloom) and don't
+# queue PDPs for products an earlier run already scraped. Duplicates within a run are always dropped.
+DEDUP_ACROSS_RUNS = False
+# Attach to a running `python browser_service.py serve` (e.g. "http://127.0.0.1:9222") instead of launching Chromium
+BROWSER_ENDPOINT = None
+# Failed listing pages and PDPs are set aside and retried once the main pass is done, with exponential backoff and
+# jitter (retry_queue.py); whatever still fails goes to flipkart_dead_letters.jsonl for `retry_queue.py replay`.
+# False = no retries, failures go straight to the dead-letter file. Every failed attempt is still logged to
+# flipkart_pdp_errors.log.
+RETRY_FAILED = True
+# Per-stage timings and counters go to flipkart_run_report.json at the end of every run (metrics.py); a path here
+# also writes them in Prometheus text format, e.g. into node_exporter's textfile directory for nightly runs
+PROMETHEUS_TEXTFILE = None
 
 flipkart_links = []
 
 # ----------------------------- GUI Section -----------------------------
-def submit_link():
-    link = entry.get().strip()
-    if link:
-        if len(flipkart_links) < 3:
-            flipkart_links.append(link)
-            listbox.insert(tk.END, link)
-            entry.delete(0, tk.END)
-            if len(flipkart_links) == 3:
-                messagebox.showinfo("Done", "Collected 3 links!")
-                entry.config(state='disabled')
-                submit_button.config(state='disabled')
-        else:
-            messagebox.showwarning("Limit reached", "Already collected 3 links.")
-
 def run_gui():
+    # tkinter is only imported here so headless runs (run_job.py) never load it
+    import tkinter as tk
+    from tkinter import messagebox
+
     global root, entry, submit_button, listbox
 
+    def submit_link():
+        link = entry.get().strip()
+        if link:
+            if len(flipkart_links) < 3:
+                flipkart_links.append(link)
+                listbox.insert(tk.END, link)
+                entry.delete(0, tk.END)
+                if len(flipkart_links) == 3:
+                    messagebox.showinfo("Done", "Collected 3 links!")
+                    entry.config(state='disabled')
+                    submit_button.config(state='disabled')
+            else:
+                messagebox.showwarning("Limit reached", "Already collected 3 links.")
+
     root = tk.Tk()
     root.title("Flipkart Link Collector")
     root.geometry("720x720")
@@ -63,73 +115,172 @@ def run_gui():
 
 # ----------------------------- Step 1: Listing Scraper -----------------------------
 PAGES_PER_LINK = 1  # You can increase this if needed
+LISTING_SNAPSHOT_MODE = True  # True = parse one page.content() snapshot offline, False = per-card locator reads
+LISTING_PACE_SECONDS = 1.5    # politeness: minimum gap between listing page loads
+LISTING_PACE_JITTER = 1.0     # plus up to this many random seconds
 
-async def scrape_flipkart_link(page, base_url, max_pages=PAGES_PER_LINK):
+@metrics.timed("extract")
+async def extract_listing_cards(page):
     data = []
-    for page_num in range(1, max_pages + 1):
-        url = f"{base_url}&page={page_num}"
+    products = await page.locator("[data-id]").all()
+    for product in products:
         try:
-            await page.goto(url, timeout=60000, wait_until="domcontentloaded")
-            await page.wait_for_selector("[data-id]", timeout=20000)
-            await asyncio.sleep(random.uniform(2.5, 4.5))
+            data_id = await product.get_attribute("data-id") or "N/A"
+            container = product.locator('div._1sdMkc.LFEi7Z')
+            await container.wait_for(timeout=10000)
+            if not await container.is_visible():
+                continue
+
+            brand_name = await container.locator('div.hCKiGj div.syl9yP').text_content() or "N/A"
+            name_element = container.locator('div.hCKiGj a.WKTcLC')
+            product_name = await name_element.text_content() if await name_element.is_visible() else "N/A"
+            product_url = "https://www.flipkart.com" + (await name_element.get_attribute("href") or "#") if product_name != "N/A" else "N/A"
+
+            item = {
+                "Data ID": data_id,
+                "Brand Name": brand_name.strip(),
+                "Product Name": product_name.strip(),
+                "Product URL": product_url,
+            }
+            data.append(item)
+
         except Exception as e:
-            print(f"⚠️ Failed to load page {url}: {e}")
+            # silently skip problematic products
             continue
+    return data
 
-        products = await page.locator("[data-id]").all()
-        for product in products:
-            try:
-                data_id = await product.get_attribute("data-id") or "N/A"
-                container = product.locator('div._1sdMkc.LFEi7Z')
-                await container.wait_for(timeout=10000)
-                if not await container.is_visible():
-                    continue
-
-                brand_name = await container.locator('div.hCKiGj div.syl9yP').text_content() or "N/A"
-                name_element = container.locator('div.hCKiGj a.WKTcLC')
-                product_name = await name_element.text_content() if await name_element.is_visible() else "N/A"
-                product_url = "https://www.flipkart.com" + (await name_element.get_attribute("href") or "#") if product_name != "N/A" else "N/A"
-
-                item = {
-                    "Data ID": data_id,
-                    "Brand Name": brand_name.strip(),
-                    "Product Name": product_name.strip(),
-                    "Product URL": product_url,
-                }
-                data.append(item)
+@metrics.timed("parse")
+def parse_listing_html(markup):
+    # Offline twin of extract_listing_cards(): cards without the product container are skipped
+    # straight away instead of costing a 10 s wait_for each
+    data = []
+    tree = parse_html(markup)
+    for product in select(tree, "[data-id]"):
+        data_id = product.get("data-id") or "N/A"
+        container = select_one(product, 'div._1sdMkc.LFEi7Z')
+        if container is None:
+            continue
 
-            except Exception as e:
-                # silently skip problematic products
-                continue
+        brand_element = select_one(container, 'div.hCKiGj div.syl9yP')
+        if brand_element is None:
+            continue
+        brand_name = text_content(brand_element) or "N/A"
+        name_element = select_one(container, 'div.hCKiGj a.WKTcLC')
+        product_name = text_content(name_element) if name_element is not None else "N/A"
+        product_url = "https://www.flipkart.com" + (name_element.get("href") or "#") if name_element is not None else "N/A"
+
+        data.append({
+            "Data ID": data_id,
+            "Brand Name": brand_name.strip(),
+            "Product Name": product_name.strip(),
+            "Product URL": product_url,
+        })
     return data
 
-async def run_listing_scraper():
+async def scrape_flipkart_link(page, base_url, max_pages=PAGES_PER_LINK, pacer=None, retries=None):
+    # Cards by page number, so a page recovered by a retry slots back in where it belongs
+    pages = {}
+
+    async def load(url):
+        async with paced(pacer) as ticket:
+            with metrics.timer("navigate"):
+                response = await page.goto(url, timeout=60000, wait_until="domcontentloaded")
+            metrics.count("pages")
+            ticket.report(response.status if response else None)
+        await page.wait_for_selector("[data-id]", timeout=20000)
+        await wait_until_ready(page, "flipkart", "listing", replaces=3.5)
+        if LISTING_SNAPSHOT_MODE:
+            with metrics.timer("extract"):
+                markup = await page.content()
+            metrics.count("bytes", len(markup))
+            return parse_listing_html(markup)
+        return await extract_listing_cards(page)
+
+    for page_num in range(1, max_pages + 1):
+        url = f"{base_url}&page={page_num}"
+        try:
+            pages[page_num] = await load(url)
+        except Exception as e:
+            print(f"⚠️ Failed to load page {url}: {e}")
+            if retries is not None:
+                # Given up on for good, the whole link is what gets replayed
+                retries.push("listing_page", url, {"link": base_url, "page": page_num}, e,
+                             replay={"kind": "listing", "url": base_url, "payload": None, "redo": True})
+
+    if retries is not None and len(retries):
+        async def retry_page(item):
+            pages[item.payload["page"]] = await load(item.url)
+
+        # Every load goes through the one tab, so one retry at a time
+        await retries.drain(retry_page, concurrency=1)
+    return [card for page_num in sorted(pages) for card in pages[page_num]]
+
+async def scrape_listing_links(queue, cache=None, dedup=None, pages_per_link=None):
+    # Claims links one at a time until none are left. Links finished by an interrupted run are not claimed
+    # again, so the browser may not be needed at all. With a dedup index each link's PDPs are queued as it
+    # finishes; sharded runs leave that to the parent process.
+    # pages_per_link is this call's only; without it PAGES_PER_LINK applies
+    max_pages = PAGES_PER_LINK if pages_per_link is None else pages_per_link
+    claimed = queue.claim("listing", 1)
+    if not claimed:
+        return 0
+    done = 0
     async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context()
+        browser = await launch_or_attach(p, True, BROWSER_ENDPOINT)
+        context = await open_context(browser)
+        route_stats = await install_route_filter(context, "flipkart", cache=cache)
         page = await context.new_page()
+        pacer = make_pacer("flipkart listing", LISTING_PACE_SECONDS, LISTING_PACE_JITTER, ADAPTIVE_PACING)
+        retries = open_retries("listing", queue)
 
-        all_data = []
-        for link in flipkart_links:
+        while claimed:
+            link = claimed[0][0]
             print(f"🔍 Scraping listings from: {link}")
-            data = await scrape_flipkart_link(page, link, max_pages=PAGES_PER_LINK)
-            all_data.extend(data)
-            print(f"➡️ Found {len(data)} products on this link.")
-
+            try:
+                data = await scrape_flipkart_link(page, link, max_pages=max_pages, pacer=pacer, retries=retries)
+            except Exception as e:
+                print(f"❌ Error scraping {link}: {e}")
+                metrics.count("errors")
+                queue.fail("listing", link, e)
+            else:
+                queue.complete("listing", link, data)
+                metrics.count("listing_products", len(data))
+                done += 1
+                if dedup is not None:
+                    # One PDP per pid, however many links list it
+                    queue.enqueue("pdp", [(item["Product URL"], item) for item in data
+                                          if item.get("Product URL") and item["Product URL"] != "N/A"
+                                          and dedup.admit(item)])
+                print(f"➡️ Found {len(data)} products on this link.")
+            claimed = queue.claim("listing", 1)
+
+        print(route_stats.summary())
+        print(pacer.summary())
+        print(retries.summary())
+        print(browser_stats.summary())
+        print(readiness_stats.summary())
         await browser.close()
-
-        if all_data:
-            json_path = os.path.join(SAVE_DIR, "flipkart_listing_data.json")
-            with open(json_path, "w", encoding="utf-8") as f:
-                json.dump(all_data, f, indent=4)
-
-            csv_path = os.path.join(SAVE_DIR, "flipkart_listing_data.csv")
-            with open(csv_path, "w", newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=all_data[0].keys())
-                writer.writeheader()
-                writer.writerows(all_data)
-
-        return all_data
+    return done
+
+async def run_listing_scraper(frontier, cache=None, dedup=None, pages_per_link=None):
+    await scrape_listing_links(frontier, cache, dedup, pages_per_link)
+    all_data = [item for data in frontier.results("listing") for item in data]
+    print(frontier.summary("listing"))
+    save_listing_data(all_data)
+    return all_data
+
+@metrics.timed("write")
+def save_listing_data(all_data):
+    if all_data:
+        json_path = os.path.join(SAVE_DIR, "flipkart_listing_data.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(all_data, f, indent=4)
+
+        csv_path = os.path.join(SAVE_DIR, "flipkart_listing_data.csv")
+        with open(csv_path, "w", newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=all_data[0].keys())
+            writer.writeheader()
+            writer.writerows(all_data)
 
 # ----------------------------- Step 2: PDP Scraper -----------------------------
 HEADERS_LIST = [
@@ -139,79 +290,92 @@ HEADERS_LIST = [
     {"User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"},
 ]
 
-def extract_pdp_data(soup, url):
+# PDP fetch engine settings
+PDP_CONCURRENCY = 8       # PDP requests in flight at once
+PDP_PER_HOST_LIMIT = 4    # in-flight requests allowed against a single host
+PDP_HOST_DELAY = 0.25     # minimum seconds between request starts on the same host
+# Tune each host's request rate and in-flight PDPs from the responses instead of the fixed values above, which
+# become the starting pace and the ceiling (PDP_PER_HOST_LIMIT); 429/503, timeouts and captcha pages back it off.
+# Listing pages get the same treatment starting from LISTING_PACE_SECONDS.
+ADAPTIVE_PACING = True
+PDP_HTTP2 = False         # needs `pip install httpx[http2]`
+PDP_PARSER_BACKEND = "lxml"  # "bs4", "lxml" or "selectolax" (pip install selectolax)
+
+@metrics.timed("parse")
+def extract_pdp_data(markup, url, backend=None):
     try:
-        brand = soup.select_one("span.mEh187")
-        name = soup.select_one("span.VU-ZEz")
-        price = soup.select_one("div.Nx9bqj")
-        original_price = soup.select_one("div.yRaY8j")
-        discount = soup.select_one("div.UkUFwK span")
-        rating_div = soup.select_one("span.Y1HWO0 div.XQDdHH")
-        rating_text = rating_div.text.strip() if rating_div else None
-        rating_count = soup.select_one("span.Wphh3N span")
+        parser = get_parser_backend(backend or PDP_PARSER_BACKEND)
+        doc = parser.parse(markup)
+
+        def first_text(selector, node=doc):
+            element = parser.select_one(node, selector)
+            return parser.text(element).strip() if element is not None else None
+
+        # ⚡ JSON-LD first; the DOM selector only runs for fields it does not carry
+        structured = flipkart_pdp_fields(markup)
+
+        def field(key, selector):
+            return structured.get(key) or first_text(selector)
 
         sizes = []
-        size_blocks = soup.select("ul.hSEbzK li")
+        size_blocks = parser.select(doc, "ul.hSEbzK li")
         for li in size_blocks:
-            size_text = li.select_one("a")
-            detail = li.select_one("div.V3Zflw")
-            if size_text and detail:
-                sizes.append(f"{size_text.text.strip()}: {detail.text.strip()}")
-
-        seller = soup.select_one("div#sellerName span span")
-        seller_rating = soup.select_one("div.XQDdHH.uuhqql")
-        seller_name = seller.text.strip() if seller else None
-        seller_rating_text = seller_rating.text.strip() if seller_rating else None
+            size_text = first_text("a", li)
+            detail = first_text("div.V3Zflw", li)
+            if size_text is not None and detail is not None:
+                sizes.append(f"{size_text}: {detail}")
 
         specs = {}
-        spec_rows = soup.select("div.Cnl9Jt div._5Pmv5S div.row")
+        spec_rows = parser.select(doc, "div.Cnl9Jt div._5Pmv5S div.row")
         for row in spec_rows:
-            key_div = row.select_one("div.col.col-3-12")
-            val_div = row.select_one("div.col.col-9-12")
-            if key_div and val_div:
-                specs[key_div.text.strip()] = val_div.text.strip()
+            key = first_text("div.col.col-3-12", row)
+            value = first_text("div.col.col-9-12", row)
+            if key is not None and value is not None:
+                specs[key] = value
 
         descriptions = []
-        desc_blocks = soup.select("div.pqHCzB > div")
+        desc_blocks = parser.select(doc, "div.pqHCzB > div")
         for block in desc_blocks:
-            img_div = block.select_one("div._0B07y7 img")
-            img_url = img_div["src"].strip() if img_div and "src" in img_div.attrs else None
-            title_div = block.select_one("div._9GQWrZ")
-            para = block.select_one("div.AoD2-N p")
+            img = parser.select_one(block, "div._0B07y7 img")
+            img_src = parser.attr(img, "src") if img is not None else None
             descriptions.append({
-                "Image URL": img_url,
-                "Title": title_div.text.strip() if title_div else None,
-                "Text": para.text.strip() if para else None
+                "Image URL": img_src.strip() if img_src is not None else None,
+                "Title": first_text("div._9GQWrZ", block),
+                "Text": first_text("div.AoD2-N p", block)
             })
 
-        flat_blocks = soup.select("div._9GQWrZ")
+        flat_blocks = parser.select(doc, "div._9GQWrZ")
         for title_div in flat_blocks:
-            parent = title_div.find_parent()
-            para = parent.select_one("div.AoD2-N p") if parent else None
-            if title_div and para:
+            parent = parser.parent(title_div)
+            para = first_text("div.AoD2-N p", parent) if parent is not None else None
+            if para is not None:
                 descriptions.append({
                     "Image URL": None,
-                    "Title": title_div.text.strip(),
-                    "Text": para.text.strip()
+                    "Title": parser.text(title_div).strip(),
+                    "Text": para
                 })
 
-        reviews_section = soup.select_one("a[href*='/product-reviews/'] div._23J90q.iIbIvC span._6n9Uuq")
-        review_summary = reviews_section.text.strip() if reviews_section else None
-        review_link_tag = soup.select_one("a[href*='/product-reviews/']:has(div._23J90q.iIbIvC)")
-        review_link = f"https://www.flipkart.com{review_link_tag['href'].strip()}" if review_link_tag and 'href' in review_link_tag.attrs else None
+        review_summary = first_text("a[href*='/product-reviews/'] div._23J90q.iIbIvC span._6n9Uuq")
+        # Same as a[href*='/product-reviews/']:has(div._23J90q.iIbIvC), which not every backend supports
+        review_link = None
+        for link in parser.select(doc, "a[href*='/product-reviews/']"):
+            if parser.select_one(link, "div._23J90q.iIbIvC") is not None:
+                href = parser.attr(link, "href")
+                review_link = f"https://www.flipkart.com{href.strip()}" if href is not None else None
+                break
 
         return {
             "Product URL": url,
-            "Brand Name": brand.text.strip() if brand else None,
-            "Product Name": name.text.strip() if name else None,
-            "Price (INR)": price.text.strip() if price else None,
-            "Original Price (INR)": original_price.text.strip() if original_price else None,
-            "Discount": discount.text.strip() if discount else None,
-            "Rating": rating_text,
-            "Rating Count": rating_count.text.strip() if rating_count else None,
+            "Brand Name": field("Brand Name", "span.mEh187"),
+            "Product Name": first_text("span.VU-ZEz"),
+            "Price (INR)": field("Price (INR)", "div.Nx9bqj"),
+            "Original Price (INR)": first_text("div.yRaY8j"),
+            "Discount": first_text("div.UkUFwK span"),
+            "Rating": field("Rating", "span.Y1HWO0 div.XQDdHH"),
+            "Rating Count": first_text("span.Wphh3N span"),
             "Sizes": sizes,
-            "Seller Name": seller_name,
-            "Seller Rating": seller_rating_text,
+            "Seller Name": first_text("div#sellerName span span"),
+            "Seller Rating": first_text("div.XQDdHH.uuhqql"),
             "Specifications": specs,
             "Description Cards": descriptions,
             "All Reviews Summary": review_summary,
@@ -227,36 +391,114 @@ def log_pdp_error(url, error):
     with open(PDP_ERROR_LOG, "a", encoding="utf-8") as f:
         f.write(f"{dt.now()} - {url} - {error}\n")
 
-def scrape_pdp(urls):
-    scraped_data = []
-    for idx, url in enumerate(urls):
-        headers = random.choice(HEADERS_LIST)
-        try:
-            resp = requests.get(url, headers=headers, timeout=20)
-            if resp.status_code != 200:
-                log_pdp_error(url, f"Status code: {resp.status_code}")
-                continue
-
-            soup = BeautifulSoup(resp.text, "lxml")
-            data = extract_pdp_data(soup, url)
-            if data:
-                scraped_data.append(data)
-
-            if (idx + 1) % 10 == 0:
-                print(f"✅ Scraped {idx+1}/{len(urls)} PDPs")
-
-            time.sleep(random.uniform(1.5, 3.0))
-
-        except Exception as e:
-            log_pdp_error(url, str(e))
-            continue
-
+async def scrape_pdp_async(urls, sink=None, frontier=None, cache=None, fingerprints=None, listing_items=None,
+                           retries=None):
+    # Results are slotted by URL index so output order does not depend on which request finished first.
+    # With a sink, each record is streamed out as soon as it is parsed instead.
+    # With `retries`, failed PDPs are retried after every URL has had its first go.
+    results = [None] * len(urls)
+    finished = 0
+    scraped = 0
+
+    async with AsyncFetcher(concurrency=PDP_CONCURRENCY, per_host=PDP_PER_HOST_LIMIT,
+                            host_delay=PDP_HOST_DELAY, http2=PDP_HTTP2, cache=cache, adaptive=ADAPTIVE_PACING) as fetcher:
+
+        async def attempt(idx, url, item, action):
+            # Raises on failure: non-200 statuses (404 / 410 as permanent) and pages that would not parse
+            nonlocal scraped
+            headers = random.choice(HEADERS_LIST)
+            if action == "skip":
+                data = fingerprints.reuse(item)
+                metrics.count("products_reused")
+            else:
+                if action == "revalidate":
+                    headers = {**headers, **fingerprints.conditional_headers(item)}
+                resp = await fetcher.get(url, headers=headers)
+                if resp.status_code == 304 and action == "revalidate":
+                    data = fingerprints.reuse(item, not_modified=True)
+                    metrics.count("products_reused")
+                elif resp.status_code != 200:
+                    raise status_error(resp.status_code)
+                else:
+                    data = extract_pdp_data(resp.text, url)
+                    if data:
+                        fetcher.store(url, resp)
+                    if data and fingerprints is not None:
+                        fingerprints.record(item, data, resp.headers)
+            if not data:
+                raise RuntimeError("Parsing error")
+
+            scraped += 1
+            metrics.count("products")
+            if frontier is not None:
+                frontier.complete("pdp", url, data)
+            if sink is not None:
+                sink.write(data)
+            else:
+                results[idx] = data
+
+        async def fetch_one(idx, url):
+            nonlocal finished
+            # listing_items maps URL -> listing card, which is what the incremental fingerprints are keyed on
+            item = (listing_items or {}).get(url) or {}
+            # Planned once here; the retries carry the decision rather than planning (and counting) again
+            action = fingerprints.plan(item) if fingerprints is not None else "fetch"
+            try:
+                await attempt(idx, url, item, action)
+            except Exception as e:
+                log_pdp_error(url, str(e))
+                if retries is not None:
+                    # The frontier row stays in flight until the retries settle it
+                    retries.push("pdp", url, (item, action), e,
+                                 replay={"kind": "pdp", "url": url, "payload": item or None, "redo": False})
+                elif frontier is not None:
+                    frontier.fail("pdp", url, e)
+            finally:
+                finished += 1
+                if finished % 10 == 0:
+                    print(f"✅ Scraped {finished}/{len(urls)} PDPs")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(fetch_one(idx, url) for idx, url in enumerate(urls)))
+        if retries is not None and len(retries):
+            positions = {url: idx for idx, url in enumerate(urls)}
+
+            async def retry_pdp(item):
+                await attempt(positions[item.url], item.url, *item.payload)
+
+            def give_up(item):
+                log_pdp_error(item.url, f"Gave up after {item.attempts} attempt(s): {item.errors[-1]}")
+                if frontier is not None:
+                    frontier.fail("pdp", item.url, item.errors[-1])
+
+            await retries.drain(retry_pdp, give_up)
+        elapsed = time.perf_counter() - started
+
+    scraped_data = [data for data in results if data]
+    rate = scraped / elapsed if elapsed else 0.0
+    print(f"⚡ PDP throughput: {scraped}/{len(urls)} pages in {elapsed:.1f}s "
+          f"({rate:.2f} pages/s at concurrency {PDP_CONCURRENCY}, {fetcher.bytes_received / 1e6:.1f} MB)")
+    for line in fetcher.pacing_summary():
+        print(line)
     return scraped_data
 
+def scrape_pdp(urls, sink=None, frontier=None, cache=None, fingerprints=None, listing_items=None, retries=None):
+    return asyncio.run(scrape_pdp_async(urls, sink, frontier, cache, fingerprints, listing_items, retries))
+
+@metrics.timed("write")
 def save_json(data, filepath):
     with open(filepath, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=4)
 
+def save_pdp_outputs(frontier):
+    # Frontier (listing) order, one record at a time; escaped like save_json()
+    with JsonlWriter(PDP_OUTPUT_JSONL) as sink:
+        for data in frontier.results("pdp"):
+            sink.write(data)
+    rebuild_json(PDP_OUTPUT_JSONL, PDP_OUTPUT_JSON, ensure_ascii=True)
+    rebuild_csv(PDP_OUTPUT_JSONL, PDP_OUTPUT_CSV)
+
+@metrics.timed("write")
 def save_csv(data, filepath):
     if not data:
         print("No data to save to CSV.")
@@ -268,39 +510,150 @@ def save_csv(data, filepath):
         writer.writerows(data)
 
 # ----------------------------- Main Program -----------------------------
-def main():
-    # Run GUI first to collect links
-    run_gui()
-
-    if not flipkart_links:
+def run_pipeline(links, save_dir=None, pages_per_link=None):
+    # Listing + PDP run without any window; the GUI's 3-link cap does not apply here
+    if save_dir:
+        set_save_dir(save_dir)
+    os.makedirs(SAVE_DIR, exist_ok=True)
+    metrics.reset("flipkart")
+
+    if not links:
         print("No Flipkart links provided. Exiting.")
         return
 
+    frontier = Frontier(FRONTIER_DB, "flipkart").begin(fresh=not RESUME)
+    frontier.enqueue("listing", links)
+    cache = open_cache()
+    fingerprints = ProductFingerprints(FINGERPRINT_DB, "flipkart", INCREMENTAL_MODE)
+    dedup = DedupIndex("flipkart", SEEN_IDS_BLOOM if DEDUP_ACROSS_RUNS else None, DEDUP_ACROSS_RUNS)
+    dedup.seed(frontier.payloads("pdp"))
+
     # Run Playwright listing scraper
-    print(f"Starting Playwright listing scraping for {len(flipkart_links)} links...")
-    listing_data = asyncio.run(run_listing_scraper())
+    print(f"Starting Playwright listing scraping for {len(links)} links...")
+    listing_data = asyncio.run(run_listing_scraper(frontier, cache, dedup, pages_per_link))
 
     if not listing_data:
         print("No listing data scraped. Exiting.")
+        frontier.close()
+        if cache is not None:
+            cache.close()
+        fingerprints.close()
+        dedup.close()
+        write_run_report(SAVE_DIR)
         return
 
     print(f"Total listing products scraped: {len(listing_data)}")
 
-    # Extract all product URLs for PDP scraping
-    product_urls = [item["Product URL"] for item in listing_data if item.get("Product URL") and item["Product URL"] != "N/A"]
-    product_urls = list(set(product_urls))  # Unique URLs
+    # Unique product URLs were enqueued per link; only those not finished yet are claimed
+    listing_items = dict(frontier.claim("pdp"))
+    product_urls = list(listing_items)
+    retries = open_retries("pdp", frontier)
 
     print(f"Starting PDP scraping for {len(product_urls)} unique product URLs...")
 
-    pdp_results = scrape_pdp(product_urls)
+    if STREAM_OUTPUT:
+        with JsonlWriter(PDP_OUTPUT_JSONL) as sink:
+            # PDPs finished by an interrupted run go back into the fresh stream first
+            for data in frontier.results("pdp"):
+                sink.write(data)
+            scrape_pdp(product_urls, sink, frontier, cache, fingerprints, listing_items, retries)
+        print(sink.summary())
+        print(f"PDP scraping done. Total products scraped: {sink.written}")
+
+        # The stream is in completion order; the usual outputs follow the listing
+        save_pdp_outputs(frontier)
+    else:
+        scrape_pdp(product_urls, frontier=frontier, cache=cache, fingerprints=fingerprints, listing_items=listing_items,
+                   retries=retries)
+        pdp_results = list(frontier.results("pdp"))
+
+        print(f"PDP scraping done. Total products scraped: {len(pdp_results)}")
+
+        # Save PDP results
+        save_json(pdp_results, PDP_OUTPUT_JSON)
+        save_csv(pdp_results, PDP_OUTPUT_CSV)
+
+    print(retries.summary())
+    print(frontier.summary("pdp"))
+    for item in frontier.payloads("pdp", "done"):
+        dedup.remember(item)
+    frontier.finish()
+    frontier.close()
+    if cache is not None:
+        print(cache.summary())
+        cache.close()
+    print(fingerprints.summary())
+    fingerprints.close()
+    print(dedup.summary())
+    dedup.close()
+
+    print(f"Data saved to:\n  JSON: {PDP_OUTPUT_JSON}\n  CSV: {PDP_OUTPUT_CSV}")
+    write_run_report(SAVE_DIR)
+
+def write_run_report(save_dir):
+    set_save_dir(save_dir)
+    print(metrics.summary())
+    metrics.write_report(RUN_REPORT_JSON, PROMETHEUS_TEXTFILE)
+
+def open_cache():
+    return ResponseCache(os.path.join(SAVE_DIR, "http_cache")) if USE_RESPONSE_CACHE else None
 
-    print(f"PDP scraping done. Total products scraped: {len(pdp_results)}")
+def open_retries(stage, queue):
+    dead_letters = DeadLetters(DEAD_LETTERS_JSONL, "flipkart", getattr(queue, "path", None))
+    return RetryQueue(f"flipkart {stage}", dead_letters, None if RETRY_FAILED else 1)
 
-    # Save PDP results
-    save_json(pdp_results, PDP_OUTPUT_JSON)
-    save_csv(pdp_results, PDP_OUTPUT_CSV)
+# ----------------------------- Sharded runs (sharding.py) -----------------------------
+def open_frontier(save_dir):
+    # Also points every output path at save_dir, which is what a freshly spawned worker process needs first
+    set_save_dir(save_dir)
+    return Frontier(FRONTIER_DB, "flipkart")
 
+def open_dedup(save_dir):
+    set_save_dir(save_dir)
+    return DedupIndex("flipkart", SEEN_IDS_BLOOM if DEDUP_ACROSS_RUNS else None, DEDUP_ACROSS_RUNS)
+
+async def listing_worker(queue, save_dir, pages_per_link=None):
+    set_save_dir(save_dir)
+    cache = open_cache()
+    try:
+        return await scrape_listing_links(queue, cache, pages_per_link=pages_per_link)
+    finally:
+        if cache is not None:
+            cache.close()
+
+async def pdp_worker(queue, save_dir):
+    set_save_dir(save_dir)
+    cache = open_cache()
+    fingerprints = ProductFingerprints(FINGERPRINT_DB, "flipkart", INCREMENTAL_MODE)
+    retries = open_retries("pdp", queue)
+    claimed = 0
+    try:
+        # A batch at a time so other processes can take the rest; each batch's failures are retried before the next
+        while True:
+            batch = queue.claim("pdp", SHARD_BATCH_SIZE)
+            if not batch:
+                break
+            claimed += len(batch)
+            listing_items = dict(batch)
+            await scrape_pdp_async(list(listing_items), None, queue, cache, fingerprints, listing_items, retries)
+    finally:
+        if cache is not None:
+            cache.close()
+        print(retries.summary())
+        print(fingerprints.summary())
+        fingerprints.close()
+    return claimed
+
+def write_outputs(frontier, save_dir):
+    set_save_dir(save_dir)
+    save_listing_data([item for data in frontier.results("listing") for item in data])
+    save_pdp_outputs(frontier)
     print(f"Data saved to:\n  JSON: {PDP_OUTPUT_JSON}\n  CSV: {PDP_OUTPUT_CSV}")
 
+def main():
+    # Run GUI first to collect links
+    run_gui()
+    run_pipeline(flipkart_links)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,201 @@
+import json
+import sqlite3
+import time
+
+# ----------------------------------------
+# Persistent crawl frontier (SQLite, WAL mode).
+# Category links and product URLs are enqueued per (site, kind) and claimed
+# from here; every row carries its state, attempt count and timestamps, and
+# finished rows keep their scraped result. If a run dies, the next run with
+# the same frontier file skips everything already done and picks up the rest:
+#   pending -> in_flight -> done
+#                        -> failed (re-queued on resume while attempts < FRONTIER_MAX_ATTEMPTS)
+# A run that reached finish() starts over from an empty frontier next time,
+# unless rows were re-queued into it since (retry_queue.py replay).
+# ----------------------------------------
+
+FRONTIER_MAX_ATTEMPTS = 3
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS frontier (
+    site TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    url TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    payload TEXT,
+    result TEXT,
+    error TEXT,
+    enqueued_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (site, kind, url)
+);
+CREATE INDEX IF NOT EXISTS frontier_state ON frontier (site, kind, state);
+CREATE TABLE IF NOT EXISTS runs (
+    site TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class Frontier:
+    def __init__(self, path, site, max_attempts=FRONTIER_MAX_ATTEMPTS):
+        self.path = path
+        self.site = site
+        self.max_attempts = max_attempts
+        self.resumed = False
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA busy_timeout=5000")
+        self.db.executescript(_SCHEMA)
+
+    def begin(self, fresh=False):
+        # Resume an unfinished run, or clear this site's rows when asked to / when the last run completed
+        now = time.time()
+        row = self.db.execute("SELECT state FROM runs WHERE site = ?", (self.site,)).fetchone()
+        if fresh or row is None or row[0] == "finished":
+            self.db.execute("DELETE FROM frontier WHERE site = ?", (self.site,))
+        else:
+            self.resumed = True
+            # in_flight rows belonged to the process that died; failed rows get another go while attempts remain
+            self.db.execute(
+                "UPDATE frontier SET state = ?, updated_at = ? WHERE site = ? AND (state = ? OR (state = ? AND attempts < ?))",
+                (PENDING, now, self.site, IN_FLIGHT, FAILED, self.max_attempts),
+            )
+        self.db.execute(
+            "INSERT OR REPLACE INTO runs (site, state, started_at, updated_at) VALUES (?, 'running', ?, ?)",
+            (self.site, now, now),
+        )
+        return self
+
+    def finish(self):
+        # Only a run with nothing left to retry counts as finished; otherwise the next run resumes it
+        left = self.db.execute(
+            "SELECT COUNT(*) FROM frontier WHERE site = ? AND (state IN (?, ?) OR (state = ? AND attempts < ?))",
+            (self.site, PENDING, IN_FLIGHT, FAILED, self.max_attempts),
+        ).fetchone()[0]
+        if left:
+            return False
+        self.db.execute("UPDATE runs SET state = 'finished', updated_at = ? WHERE site = ?", (time.time(), self.site))
+        return True
+
+    def enqueue(self, kind, items):
+        # items: URLs, or (url, payload) pairs; URLs already in the frontier (in any state) are left alone
+        now = time.time()
+        rows = []
+        for item in items:
+            url, payload = item if isinstance(item, tuple) else (item, None)
+            rows.append((self.site, kind, url, None if payload is None else json.dumps(payload, ensure_ascii=False), now, now))
+        before = self.db.total_changes
+        with self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO frontier (site, kind, url, payload, enqueued_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return self.db.total_changes - before
+
+    def claim(self, kind, limit=None):
+        # Atomically moves up to `limit` pending rows (all of them if None) to in_flight, oldest first
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self.db.execute(
+                "SELECT url, payload FROM frontier WHERE site = ? AND kind = ? AND state = ? ORDER BY rowid LIMIT ?",
+                (self.site, kind, PENDING, -1 if limit is None else limit),
+            ).fetchall()
+            self.db.executemany(
+                "UPDATE frontier SET state = ?, attempts = attempts + 1, updated_at = ? WHERE site = ? AND kind = ? AND url = ?",
+                [(IN_FLIGHT, now, self.site, kind, url) for url, _ in rows],
+            )
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        return [(url, None if payload is None else json.loads(payload)) for url, payload in rows]
+
+    def claims(self, kind):
+        # One claim at a time, for sequential loops (category links)
+        while True:
+            batch = self.claim(kind, 1)
+            if not batch:
+                return
+            yield batch[0]
+
+    def complete(self, kind, url, result=None):
+        self.db.execute(
+            "UPDATE frontier SET state = ?, result = ?, error = NULL, updated_at = ? WHERE site = ? AND kind = ? AND url = ?",
+            (DONE, None if result is None else json.dumps(result, ensure_ascii=False), time.time(), self.site, kind, url),
+        )
+
+    def fail(self, kind, url, error):
+        self.db.execute(
+            "UPDATE frontier SET state = ?, error = ?, updated_at = ? WHERE site = ? AND kind = ? AND url = ?",
+            (FAILED, str(error)[:500], time.time(), self.site, kind, url),
+        )
+
+    def requeue(self, kind, items, redo=False):
+        # items: URLs or (url, payload) pairs put back as pending with a fresh attempt count, inserted if missing.
+        # Done rows are left alone unless redo. The run is marked unfinished so the next begin() resumes it.
+        now = time.time()
+        rows = []
+        for item in items:
+            url, payload = item if isinstance(item, tuple) else (item, None)
+            rows.append((self.site, kind, url, None if payload is None else json.dumps(payload, ensure_ascii=False), now, now))
+        before = self.db.total_changes
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO frontier (site, kind, url, payload, enqueued_at, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (site, kind, url) DO UPDATE SET state = ?, attempts = 0, error = NULL, "
+                "payload = COALESCE(excluded.payload, payload), updated_at = excluded.updated_at"
+                + ("" if redo else " WHERE state != ?"),
+                [row + ((PENDING,) if redo else (PENDING, DONE)) for row in rows],
+            )
+        requeued = self.db.total_changes - before
+        self.db.execute(
+            "INSERT INTO runs (site, state, started_at, updated_at) VALUES (?, 'running', ?, ?) "
+            "ON CONFLICT (site) DO UPDATE SET state = 'running', updated_at = excluded.updated_at",
+            (self.site, now, now),
+        )
+        return requeued
+
+    def results(self, kind):
+        # Finished results in enqueue order, including those from earlier (interrupted) runs
+        rows = self.db.execute(
+            "SELECT result FROM frontier WHERE site = ? AND kind = ? AND state = ? AND result IS NOT NULL ORDER BY rowid",
+            (self.site, kind, DONE),
+        )
+        for (result,) in rows:
+            yield json.loads(result)
+
+    def payloads(self, kind, state=None):
+        # Enqueued payloads (optionally only those in one state), in enqueue order
+        query = "SELECT payload FROM frontier WHERE site = ? AND kind = ? AND payload IS NOT NULL"
+        params = (self.site, kind)
+        if state is not None:
+            query += " AND state = ?"
+            params += (state,)
+        for (payload,) in self.db.execute(query + " ORDER BY rowid", params).fetchall():
+            yield json.loads(payload)
+
+    def counts(self, kind):
+        rows = self.db.execute(
+            "SELECT state, COUNT(*) FROM frontier WHERE site = ? AND kind = ? GROUP BY state",
+            (self.site, kind),
+        ).fetchall()
+        return {PENDING: 0, IN_FLIGHT: 0, DONE: 0, FAILED: 0, **dict(rows)}
+
+    def summary(self, kind):
+        c = self.counts(kind)
+        return (f"📌 Frontier [{self.site}/{kind}]: {c[DONE]} done, {c[FAILED]} failed, "
+                f"{c[PENDING] + c[IN_FLIGHT]} left" + (" (resumed run)" if self.resumed else ""))
+
+    def close(self):
+        self.db.close()
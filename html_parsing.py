@@ -0,0 +1,170 @@
+import re
+from functools import lru_cache
+
+from lxml import html as lxml_html
+from lxml.cssselect import CSSSelector
+
+# ----------------------------------------
+# Offline HTML helpers shared by the scrapers.
+# One page.content() snapshot is parsed here with lxml instead of
+# paying a browser round trip for every query_selector / inner_text.
+# ----------------------------------------
+
+_WHITESPACE = re.compile(r"\s+")
+# Elements that start on a new line in inner_text(), as they render as blocks in the browser
+_BLOCK_TAGS = frozenset((
+    "address", "article", "aside", "blockquote", "dd", "div", "dl", "dt", "fieldset", "figcaption", "figure",
+    "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p", "pre",
+    "section", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "ul",
+))
+_HIDDEN_TAGS = frozenset(("script", "style", "noscript", "template"))
+
+
+def parse_html(markup):
+    if not markup or not markup.strip():
+        return lxml_html.document_fromstring("<html></html>")
+    return lxml_html.document_fromstring(markup)
+
+
+@lru_cache(maxsize=None)
+def css(selector):
+    # Selectors are compiled to XPath once and reused for every card / page
+    return CSSSelector(selector, translator="html")
+
+
+def select(node, selector):
+    return css(selector)(node)
+
+
+def select_one(node, selector):
+    matches = css(selector)(node)
+    return matches[0] if matches else None
+
+
+def text_content(node):
+    # Same as Playwright's text_content(): every descendant text node, untouched
+    return node.text_content() if node is not None else ""
+
+
+def _rendered_parts(node, parts):
+    # Comments and processing instructions have a non-string tag and no text of their own
+    if not isinstance(node.tag, str):
+        return
+    tag = node.tag.lower()
+    if tag == "br":
+        parts.append("\n")
+        return
+    if tag in _HIDDEN_TAGS:
+        return
+    block = tag in _BLOCK_TAGS
+    if block:
+        parts.append("\n")
+    # Line breaks in the source are just whitespace; only <br> and block edges break lines
+    if node.text:
+        parts.append(_WHITESPACE.sub(" ", node.text))
+    for child in node:
+        _rendered_parts(child, parts)
+        if child.tail:
+            parts.append(_WHITESPACE.sub(" ", child.tail))
+    if block:
+        parts.append("\n")
+
+
+def inner_text(node):
+    # Close to Playwright's inner_text(): block elements and <br> break lines, whitespace runs within a line
+    # collapse to one space, blank lines are dropped. Single-line fields come out as one trimmed line.
+    if node is None:
+        return ""
+    parts = []
+    _rendered_parts(node, parts)
+    lines = (_WHITESPACE.sub(" ", line).strip() for line in "".join(parts).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+# ----------------------------------------
+# Parser backends: the same small node API over BeautifulSoup, lxml and selectolax,
+# so one extractor can run on whichever parser is fastest for the job.
+# ----------------------------------------
+class SoupBackend:
+    name = "bs4"
+
+    @staticmethod
+    def parse(markup):
+        from bs4 import BeautifulSoup
+        return BeautifulSoup(markup, "lxml")
+
+    @staticmethod
+    def select(node, selector):
+        return node.select(selector)
+
+    @staticmethod
+    def select_one(node, selector):
+        return node.select_one(selector)
+
+    @staticmethod
+    def text(node):
+        return node.text
+
+    @staticmethod
+    def attr(node, name):
+        return node.get(name)
+
+    @staticmethod
+    def parent(node):
+        return node.find_parent()
+
+
+class LxmlBackend:
+    name = "lxml"
+    parse = staticmethod(parse_html)
+    select = staticmethod(select)
+    select_one = staticmethod(select_one)
+    text = staticmethod(text_content)
+
+    @staticmethod
+    def attr(node, name):
+        return node.get(name)
+
+    @staticmethod
+    def parent(node):
+        return node.getparent()
+
+
+class SelectolaxBackend:
+    name = "selectolax"
+
+    @staticmethod
+    def parse(markup):
+        # Optional dependency: pip install selectolax
+        from selectolax.lexbor import LexborHTMLParser
+        return LexborHTMLParser(markup)
+
+    @staticmethod
+    def select(node, selector):
+        return node.css(selector)
+
+    @staticmethod
+    def select_one(node, selector):
+        return node.css_first(selector)
+
+    @staticmethod
+    def text(node):
+        return node.text(deep=True)
+
+    @staticmethod
+    def attr(node, name):
+        return node.attributes.get(name)
+
+    @staticmethod
+    def parent(node):
+        return node.parent
+
+
+PARSER_BACKENDS = {backend.name: backend for backend in (SoupBackend, LxmlBackend, SelectolaxBackend)}
+
+
+def get_parser_backend(name):
+    try:
+        return PARSER_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown parser backend {name!r}, expected one of {sorted(PARSER_BACKENDS)}") from None
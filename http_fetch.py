@@ -0,0 +1,122 @@
+import asyncio
+from urllib.parse import urlsplit
+
+import httpx
+
+from metrics import stats as metrics
+from pacing import AdaptivePacer, Pacer
+
+# ----------------------------------------
+# Async HTTP fetch engine shared by the scrapers.
+# One pooled httpx client (keep-alive, optional HTTP/2), a global cap on
+# in-flight requests and a per-host cap + minimum spacing for politeness.
+# With adaptive=True each host gets an AdaptivePacer instead: per_host and
+# host_delay become its ceiling and starting pace, and it tunes both from the
+# responses (see pacing.py).
+# With a ResponseCache, fresh cached responses are returned without touching
+# the network (and without waiting on the host pacer). Conditional GETs always
+# go to the network, and a response is only stored once the caller has accepted
+# its body (store()): a bot wall or an empty JS shell is a 200 too.
+# Every network GET is timed as the "fetch" stage of the run metrics.
+# ----------------------------------------
+
+
+# Request headers that ask the server to revalidate; a fresh cache hit would skip exactly that
+CONDITIONAL_HEADERS = {"if-none-match", "if-modified-since"}
+
+
+class NotModified(Exception):
+    # A conditional GET came back 304: the caller's stored copy is still current
+    pass
+
+
+def from_cache(resp):
+    return resp.extensions.get("from_cache", False)
+
+
+def http2_available():
+    try:
+        import h2  # noqa: F401  (installed by `pip install httpx[http2]`)
+        return True
+    except ImportError:
+        return False
+
+
+class AsyncFetcher:
+    def __init__(self, concurrency=8, per_host=4, host_delay=0.25, http2=False, timeout=20, cache=None, adaptive=False):
+        if http2 and not http2_available():
+            print("⚠️ HTTP/2 requested but the 'h2' package is missing (pip install httpx[http2]), using HTTP/1.1")
+            http2 = False
+
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.host_delay = host_delay
+        self.cache = cache
+        self.adaptive = adaptive
+        self.client = httpx.AsyncClient(
+            http2=http2,
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+        self._slots = asyncio.Semaphore(concurrency)
+        self._host_slots = {}
+        self._host_pacers = {}
+
+        self.requests = 0
+        self.bytes_received = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def get(self, url, headers=None):
+        if self.cache is not None and not CONDITIONAL_HEADERS & {k.lower() for k in headers or {}}:
+            cached = self.cache.get(url)
+            if cached is not None:
+                return httpx.Response(cached.status, headers=cached.headers, content=cached.body,
+                                      request=httpx.Request("GET", url), extensions={"from_cache": True})
+
+        host = urlsplit(url).netloc
+        if self.adaptive:
+            pacer = self._host_pacers.get(host)
+            if pacer is None:
+                pacer = self._host_pacers[host] = AdaptivePacer(host, self.host_delay, self.per_host)
+            async with self._slots, pacer.slot() as ticket:
+                resp = await self._timed_get(url, headers)
+                ticket.report(resp.status_code, markup=resp.text if resp.status_code == 200 else None,
+                              retry_after=resp.headers.get("retry-after"))
+            return self._received(url, resp)
+
+        host_slot = self._host_slots.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with self._slots, host_slot:
+            # Request starts on one host are spaced at least host_delay seconds apart
+            await self._host_pacers.setdefault(host, Pacer(self.host_delay)).wait()
+            resp = await self._timed_get(url, headers)
+        return self._received(url, resp)
+
+    async def _timed_get(self, url, headers):
+        # Only the request itself: time spent queueing for a slot or the pacer is not fetch latency
+        with metrics.timer("fetch"):
+            return await self.client.get(url, headers=headers)
+
+    def _received(self, url, resp):
+        self.requests += 1
+        self.bytes_received += len(resp.content)
+        metrics.count("bytes", len(resp.content))
+        if resp.status_code == 200:
+            metrics.count("pages")
+        return resp
+
+    def store(self, url, resp):
+        # For the caller to call once the body has passed its checks
+        if self.cache is not None and not from_cache(resp):
+            self.cache.put(url, resp.status_code, resp.headers, resp.content)
+
+    def pacing_summary(self):
+        return [pacer.summary() for pacer in self._host_pacers.values() if isinstance(pacer, AdaptivePacer)]
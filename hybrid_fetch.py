@@ -0,0 +1,195 @@
+import json
+import random
+import re
+from collections import Counter
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright
+
+from browser_service import ContextPool, launch_or_attach, open_context
+from html_parsing import parse_html, inner_text
+from http_fetch import NotModified, from_cache
+from metrics import stats as metrics
+from pacing import AdaptivePacer, paced, split_pacer
+from readiness import wait_until_ready
+from route_filter import install_route_filter
+
+# ----------------------------------------
+# Hybrid fetch: plain HTTP GET first, headless Chromium only as a fallback.
+# A response is accepted when it is a 200, does not look like a JS-only shell
+# or bot wall, and the site's completeness check finds the fields it needs.
+# Every URL's path ("http" / "browser") is recorded.
+# ----------------------------------------
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+]
+
+# Body text shorter than this is treated as an empty client-side shell
+MIN_BODY_TEXT = 200
+_SHELL_MARKERS = re.compile(
+    r"enable javascript|javascript is disabled|robot check|captcha|access denied",
+    re.IGNORECASE,
+)
+
+
+def looks_like_js_shell(markup):
+    if not markup:
+        return True
+    body = inner_text(parse_html(markup).find("body"))
+    return len(body) < MIN_BODY_TEXT or bool(_SHELL_MARKERS.search(body[:5000]))
+
+
+class LazyBrowser:
+    # Starts Playwright + Chromium on the first page request rather than up front.
+    # With an endpoint it attaches to browser_service.py instead of launching.
+    def __init__(self, site, headless=True, context_options=None, route_stats=None, cache=None, endpoint=None):
+        self.site = site
+        self.headless = headless
+        self.context_options = context_options or {}
+        self.route_stats = route_stats
+        self.cache = cache
+        self.endpoint = endpoint
+        self.launches = 0
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._pool = None
+
+    async def get_browser(self):
+        if self._browser is None:
+            self._playwright = await async_playwright().start()
+            self._browser = await launch_or_attach(self._playwright, self.headless, self.endpoint)
+            self.launches += 1
+        return self._browser
+
+    async def get_context(self):
+        if self._context is None:
+            browser = await self.get_browser()
+            self._context = await open_context(browser, **self.context_options)
+            self.route_stats = await install_route_filter(self._context, self.site, self.route_stats, cache=self.cache)
+        return self._context
+
+    async def context_pool(self, size):
+        # Warmed once and kept until close(), so batch after batch reuses the same contexts
+        if self._pool is None:
+            self._pool = await ContextPool(await self.get_browser(), size, self.site, self.route_stats, self.cache,
+                                           self.context_options).warm()
+            self.route_stats = self._pool.route_stats
+        return self._pool
+
+    @asynccontextmanager
+    async def page(self):
+        page = await (await self.get_context()).new_page()
+        try:
+            yield page
+        finally:
+            await page.close()
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._browser = self._context = self._playwright = self._pool = None
+
+
+class HybridFetcher:
+    def __init__(self, site, kind, http, is_complete, pages=None, pacer=None, replaces=0.0):
+        # is_complete(markup): falsy sends the URL to the browser; a truthy result (the parsed cards, say) is
+        #   handed back by fetch_checked() so the caller need not parse the page again
+        # pages: anything with an async `page()` context manager (LazyBrowser, PagePool)
+        # pacer: Pacer / AdaptivePacer for the browser path; HTTP GETs get a twin of it (http_pacer), since
+        #   their latencies would make every page load look slow
+        # replaces: the fixed sleep (seconds) the fallback's readiness wait stands in for, as in wait_until_ready()
+        self.site = site
+        self.kind = kind
+        self.http = http
+        self.is_complete = is_complete
+        self.pages = pages
+        self.pacer = pacer
+        self.http_pacer = split_pacer(pacer, "http")
+        self.replaces = replaces
+        self.paths = {}
+        self.fallback_reasons = Counter()
+        # ETag / Last-Modified of every page accepted over HTTP, for conditional re-fetches next run
+        self.validators = {}
+
+    def record(self, url, path):
+        self.paths[url] = path
+
+    async def fetch_http(self, url, headers=None):
+        # Returns the HTML if plain HTTP was enough, None if the caller needs a browser.
+        # Raises NotModified when conditional headers were sent and the server answered 304.
+        markup, _ = await self.fetch_http_checked(url, headers)
+        return markup
+
+    async def fetch_http_checked(self, url, headers=None):
+        # fetch_http(), plus what is_complete() returned for the accepted page: (markup, check) or (None, None)
+        try:
+            async with paced(self.http_pacer) as ticket:
+                resp = await self.http.get(url, headers={"User-Agent": random.choice(USER_AGENTS), **(headers or {})})
+                ticket.report(resp.status_code, markup=resp.text if resp.status_code == 200 else None,
+                              retry_after=resp.headers.get("retry-after"), cached=from_cache(resp))
+        except Exception:
+            self.fallback_reasons["http error"] += 1
+            return None, None
+        if resp.status_code == 304:
+            self.record(url, "not-modified")
+            raise NotModified(url)
+        if resp.status_code != 200:
+            self.fallback_reasons[f"status {resp.status_code}"] += 1
+            return None, None
+        markup = resp.text
+        if looks_like_js_shell(markup):
+            self.fallback_reasons["js shell"] += 1
+            return None, None
+        check = self.is_complete(markup)
+        if not check:
+            self.fallback_reasons["missing fields"] += 1
+            return None, None
+        self.validators[url] = {k: resp.headers[k] for k in ("etag", "last-modified") if k in resp.headers}
+        self.http.store(url, resp)
+        return markup, check
+
+    async def fetch(self, url, headers=None):
+        markup, _ = await self.fetch_checked(url, headers)
+        return markup
+
+    async def fetch_checked(self, url, headers=None):
+        # (markup, is_complete() result) over HTTP, (markup, None) when the page came from the browser
+        markup, check = await self.fetch_http_checked(url, headers)
+        if markup is not None:
+            self.record(url, "http")
+            return markup, check
+
+        async with self.pages.page() as page, paced(self.pacer) as ticket:
+            with metrics.timer("navigate"):
+                response = await page.goto(url, timeout=60000, wait_until="domcontentloaded")
+            metrics.count("pages")
+            await wait_until_ready(page, self.site, self.kind, replaces=self.replaces)
+            with metrics.timer("extract"):
+                markup = await page.content()
+            metrics.count("bytes", len(markup))
+            ticket.report(response.status if response else None, markup=markup)
+        self.record(url, "browser")
+        return markup, None
+
+    def summary(self):
+        counts = Counter(self.paths.values())
+        line = f"🔀 {self.site} {self.kind}: {counts['http']} via HTTP, {counts['browser']} via browser"
+        if counts["not-modified"]:
+            line += f", {counts['not-modified']} not modified"
+        if self.fallback_reasons:
+            line += " (fallbacks: " + ", ".join(f"{k}={v}" for k, v in self.fallback_reasons.most_common()) + ")"
+        if isinstance(self.http_pacer, AdaptivePacer):
+            line += "\n" + self.http_pacer.summary()
+        return line
+
+    def save_paths(self, filepath):
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump(self.paths, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+# ----------------------------------------
+# Incremental re-scrape.
+# Keeps, per site and Data ID, a fingerprint of the listing-card fields that
+# move when a product changes (price, rating, rating count ...), a hash of the
+# PDP fields last scraped, the PDP fields themselves and the HTTP validators
+# (ETag / Last-Modified) from the last fetch. On the next run:
+#   "skip"       - listing unchanged: reuse yesterday's PDP fields, no request at all
+#   "revalidate" - listing unchanged: conditional GET (If-None-Match / If-Modified-Since),
+#                  a 304 reuses the stored fields; browser-only paths fall back to skipping
+#   "off"        - always fetch
+# Anything new, changed, or last fetched more than INCREMENTAL_MAX_AGE_DAYS ago is fetched in full.
+# ----------------------------------------
+
+INCREMENTAL_MODE = "skip"
+INCREMENTAL_MAX_AGE_DAYS = 7
+
+# Listing-card fields whose change means the PDP is worth fetching again
+LISTING_FINGERPRINT_FIELDS = {
+    "amazon": ("Price (INR)", "Original Price (INR)", "Discount", "Rating", "Rating Count"),
+    # Flipkart cards carry no price or rating, so Flipkart runs rely on revalidation. No Product URL: its
+    # per-session tracking params (iid, ssid, srno, ...) would make every card look changed
+    "flipkart": ("Brand Name", "Product Name"),
+    "ajio": ("Price", "Original Price", "Discount", "Rating", "Rating Count", "Bestseller"),
+    "myntra": ("Brand Name", "Product Name", "Rating", "Rating Count"),
+}
+# Per-run values left out of the PDP content hash
+PDP_HASH_IGNORED_FIELDS = {"Date of Extraction"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    site TEXT NOT NULL,
+    data_id TEXT NOT NULL,
+    listing_hash TEXT NOT NULL,
+    pdp_hash TEXT NOT NULL,
+    pdp TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (site, data_id)
+);
+"""
+
+
+def _digest(values):
+    return hashlib.sha256(json.dumps(values, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def listing_fingerprint(site, item):
+    return _digest([item.get(field) for field in LISTING_FINGERPRINT_FIELDS[site]])
+
+
+def pdp_hash(pdp):
+    return _digest({k: v for k, v in pdp.items() if k not in PDP_HASH_IGNORED_FIELDS})
+
+
+class IncrementalStats:
+    def __init__(self):
+        self.new = 0
+        self.listing_changed = 0
+        self.expired = 0
+        self.skipped = 0
+        self.not_modified = 0
+        self.revalidated = 0
+        self.pdp_changed = 0
+        self.pdp_unchanged = 0
+
+    @property
+    def avoided(self):
+        return self.skipped + self.not_modified
+
+    def summary(self):
+        fetched = self.new + self.listing_changed + self.expired + self.revalidated - self.not_modified
+        return (f"♻️ Incremental: {self.avoided} PDP fetches avoided "
+                f"({self.skipped} skipped, {self.not_modified} not modified), {fetched} fetched "
+                f"({self.new} new, {self.listing_changed} listing changed, {self.expired} expired, "
+                f"{self.revalidated - self.not_modified} changed on revalidation); "
+                f"{self.pdp_unchanged} refetched PDPs came back identical, {self.pdp_changed} changed")
+
+
+class ProductFingerprints:
+    def __init__(self, path, site, mode=INCREMENTAL_MODE, max_age_days=INCREMENTAL_MAX_AGE_DAYS):
+        self.path = path
+        self.site = site
+        self.mode = mode
+        self.max_age = max_age_days * 86400
+        self.stats = IncrementalStats()
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA busy_timeout=5000")
+        self.db.executescript(_SCHEMA)
+
+    def _row(self, item):
+        data_id = item.get("Data ID")
+        if not data_id or data_id == "N/A":
+            return None
+        return self.db.execute(
+            "SELECT listing_hash, pdp_hash, pdp, etag, last_modified, fetched_at FROM fingerprints WHERE site = ? AND data_id = ?",
+            (self.site, str(data_id)),
+        ).fetchone()
+
+    def plan(self, item, can_revalidate=True):
+        # "fetch", "skip" or "revalidate" for one listing item
+        if self.mode == "off":
+            return "fetch"
+        row = self._row(item)
+        if row is None:
+            self.stats.new += 1
+            return "fetch"
+        if row[0] != listing_fingerprint(self.site, item):
+            self.stats.listing_changed += 1
+            return "fetch"
+        if time.time() - row[5] > self.max_age:
+            self.stats.expired += 1
+            return "fetch"
+        if self.mode == "revalidate" and can_revalidate:
+            self.stats.revalidated += 1
+            return "revalidate"
+        self.stats.skipped += 1
+        return "skip"
+
+    def conditional_headers(self, item):
+        row = self._row(item)
+        headers = {}
+        if row is not None and row[3]:
+            headers["If-None-Match"] = row[3]
+        if row is not None and row[4]:
+            headers["If-Modified-Since"] = row[4]
+        return headers
+
+    def reuse(self, item, not_modified=False):
+        # The PDP fields stored last time; a 304 also counts as a fresh fetch for the max-age clock
+        row = self._row(item)
+        if not_modified:
+            self.stats.not_modified += 1
+            self.db.execute(
+                "UPDATE fingerprints SET fetched_at = ? WHERE site = ? AND data_id = ?",
+                (time.time(), self.site, str(item["Data ID"])),
+            )
+        return json.loads(row[2])
+
+    def record(self, item, pdp, validators=None):
+        data_id = item.get("Data ID")
+        if not data_id or data_id == "N/A" or not pdp:
+            return
+        row = self._row(item)
+        new_hash = pdp_hash(pdp)
+        if row is not None:
+            if row[1] == new_hash:
+                self.stats.pdp_unchanged += 1
+            else:
+                self.stats.pdp_changed += 1
+        validators = {k.lower(): v for k, v in (validators or {}).items()}
+        self.db.execute(
+            "INSERT OR REPLACE INTO fingerprints (site, data_id, listing_hash, pdp_hash, pdp, etag, last_modified, fetched_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.site, str(data_id), listing_fingerprint(self.site, item), new_hash, json.dumps(pdp, ensure_ascii=False),
+             validators.get("etag"), validators.get("last-modified"), time.time()),
+        )
+
+    def summary(self):
+        return self.stats.summary()
+
+    def close(self):
+        self.db.close()
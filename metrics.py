@@ -0,0 +1,226 @@
+import datetime
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# ----------------------------------------
+# Per-stage timing and the machine-readable run report.
+# Every scraper times the same stages into latency histograms:
+#   navigate  page.goto() in the browser
+#   fetch     plain HTTP GETs (http_fetch.AsyncFetcher records these itself)
+#   ready     readiness waits (readiness.py records these itself)
+#   extract   reading a live page: page.content(), evaluate, locator reads
+#   parse     turning saved HTML / JSON into records
+#   write     JSONL batch flushes and the final JSON / CSV files
+# and counts pages, products, bytes and errors as it goes:
+#     with metrics.timer("navigate"):
+#         await page.goto(url)
+#     metrics.count("pages")
+# write_report() saves p50 / p95 / p99 / max per stage, every counter and the
+# run's throughput as <site>_run_report.json next to the outputs. Given a
+# path it also writes the same numbers in Prometheus text format, for
+# node_exporter's textfile collector, so nightly runs can be graphed and a
+# drop in throughput alerted on.
+# ----------------------------------------
+
+PERCENTILES = (50, 95, 99)
+SAMPLE_LIMIT = 10000    # latencies kept per stage; past this a uniform sample of the run is kept
+
+
+class Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = []
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if len(self.samples) < SAMPLE_LIMIT:
+            self.samples.append(seconds)
+        else:
+            # Reservoir sampling: every observation so far has the same chance of being kept
+            slot = random.randrange(self.count)
+            if slot < SAMPLE_LIMIT:
+                self.samples[slot] = seconds
+
+    def merge(self, snapshot):
+        self.count += snapshot["count"]
+        self.total += snapshot["total"]
+        self.max = max(self.max, snapshot["max"])
+        self.samples.extend(snapshot["samples"])
+        if len(self.samples) > SAMPLE_LIMIT:
+            self.samples = random.sample(self.samples, SAMPLE_LIMIT)
+
+    def percentile(self, p):
+        # Nearest rank over the kept samples
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        rank = max(1, -(-len(ordered) * p // 100))
+        return ordered[int(rank) - 1]
+
+    def report(self):
+        out = {"count": self.count, "total_seconds": round(self.total, 3),
+               "mean": round(self.total / self.count, 4) if self.count else 0.0}
+        for p in PERCENTILES:
+            out[f"p{p}"] = round(self.percentile(p), 4)
+        out["max"] = round(self.max, 4)
+        return out
+
+
+class RunMetrics:
+    def __init__(self):
+        # The JSONL writer thread records flushes too
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, site=None):
+        self.site = site
+        self.started_at = datetime.datetime.now()
+        self._started = time.perf_counter()
+        self.histograms = {}
+        self.counters = {}
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def timer(self, stage):
+        # Failed attempts are timed too: a slow timeout is exactly what the tail percentiles should show
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def timed(self, stage):
+        # Decorator form of timer(), for sync and async functions alike
+        def decorate(func):
+            if inspect.iscoroutinefunction(func):
+                @wraps(func)
+                async def timed_async(*args, **kwargs):
+                    with self.timer(stage):
+                        return await func(*args, **kwargs)
+                return timed_async
+
+            @wraps(func)
+            def timed_sync(*args, **kwargs):
+                with self.timer(stage):
+                    return func(*args, **kwargs)
+            return timed_sync
+        return decorate
+
+    def snapshot(self):
+        # Picklable state, for a worker process to hand back to the parent
+        with self._lock:
+            return {
+                "histograms": {stage: {"count": h.count, "total": h.total, "max": h.max, "samples": list(h.samples)}
+                               for stage, h in self.histograms.items()},
+                "counters": dict(self.counters),
+            }
+
+    def merge(self, snapshot):
+        with self._lock:
+            for stage, data in snapshot["histograms"].items():
+                self.histograms.setdefault(stage, Histogram()).merge(data)
+            for name, n in snapshot["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self):
+        seconds = time.perf_counter() - self._started
+        with self._lock:
+            counters = dict(sorted(self.counters.items()))
+            stages = {stage: h.report() for stage, h in sorted(self.histograms.items())}
+        return {
+            "site": self.site,
+            "started_at": self.started_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "finished_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "seconds": round(seconds, 3),
+            "throughput": {
+                "pages_per_second": round(counters.get("pages", 0) / seconds, 4) if seconds else 0.0,
+                "products_per_second": round(counters.get("products", 0) / seconds, 4) if seconds else 0.0,
+            },
+            "counters": counters,
+            "stages": stages,
+        }
+
+    def write_report(self, path, prometheus_path=None):
+        report = self.report()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📊 Run report: {path}")
+        if prometheus_path:
+            write_atomic(prometheus_path, prometheus_text(report))
+            print(f"📈 Prometheus metrics: {prometheus_path}")
+        return report
+
+    def summary(self):
+        if not self.histograms:
+            return "📊 Metrics: nothing recorded"
+        stages = ", ".join(f"{stage} p50 {h.percentile(50):.3f}s / p95 {h.percentile(95):.3f}s"
+                           for stage, h in sorted(self.histograms.items()))
+        counters = ", ".join(f"{name}={n}" for name, n in sorted(self.counters.items()))
+        return f"📊 Metrics: {stages}; {counters or 'no counters'}"
+
+
+def write_atomic(path, text):
+    # The textfile collector may read at any moment, so it must never see a half-written file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _labels(**labels):
+    # Site and stage names are plain identifiers, nothing to escape
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+def prometheus_text(report):
+    site = report["site"] or "unknown"
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{_labels(**labels)} {value}")
+
+    metric("scraper_run_seconds", "gauge", "Wall time of the last run.", [({"site": site}, report["seconds"])])
+    metric("scraper_run_finished_timestamp_seconds", "gauge", "When the last run finished.",
+           [({"site": site}, round(time.time(), 3))])
+    for unit, value in report["throughput"].items():
+        metric(f"scraper_{unit}", "gauge", f"Average {unit.replace('_', ' ')} over the last run.",
+               [({"site": site}, value)])
+    for name, value in report["counters"].items():
+        # Gauges, not counters: each run's file replaces the last one, so the values start from zero every run
+        metric(f"scraper_run_{name}", "gauge", f"{name.replace('_', ' ').capitalize()} in the last run.",
+               [({"site": site}, value)])
+
+    lines.append("# HELP scraper_stage_seconds Per-stage latency in the last run.")
+    lines.append("# TYPE scraper_stage_seconds summary")
+    for stage, data in report["stages"].items():
+        for p in PERCENTILES:
+            lines.append(f"scraper_stage_seconds{_labels(site=site, stage=stage, quantile=p / 100)} {data[f'p{p}']}")
+        lines.append(f"scraper_stage_seconds_sum{_labels(site=site, stage=stage)} {data['total_seconds']}")
+        lines.append(f"scraper_stage_seconds_count{_labels(site=site, stage=stage)} {data['count']}")
+    return "\n".join(lines) + "\n"
+
+
+stats = RunMetrics()
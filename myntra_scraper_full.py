@@ -3,20 +3,87 @@ import os
 import re
 import csv
 import json
-import random
+import time
 import datetime
-import tkinter as tk
-from tkinter import filedialog, messagebox
 from playwright.async_api import async_playwright
 from bs4 import BeautifulSoup
 import html
+from page_pool import PagePool
+from route_filter import install_route_filter
+from browser_service import launch_or_attach, open_context, stats as browser_stats
+from readiness import wait_until_ready, wait_for_count_above, stats as readiness_stats
+from pacing import make_pacer, paced, is_timeout
+from structured_data import myntra_listing_items, myntra_pdp_fields
+from card_schema import extract_cards
+from http_fetch import AsyncFetcher, NotModified
+from hybrid_fetch import HybridFetcher
+from record_stream import JsonlWriter, rebuild_json
+from frontier import Frontier
+from response_cache import ResponseCache
+from incremental import ProductFingerprints
+from dedup import DedupIndex
+from retry_queue import RetryQueue, DeadLetters, status_error
+from sharding import SHARD_BATCH_SIZE
+from metrics import stats as metrics
 
 # ==== GUI ====
 category_links = []
 PRODUCTS_PER_LINK = 5
 output_dir = ""
 
+# PDP enrichment settings
+PDP_CONTEXTS = 2            # browser contexts PDP pages are spread across
+PDP_PAGES_PER_CONTEXT = 3   # live PDP pages per context
+
+# Show the browser window; batch runs (run_job.py) switch this off
+HEADLESS = False
+
+# Politeness: minimum gap between navigations (listing pages / PDPs across all pages)
+LISTING_PACE_SECONDS = 2.0
+PDP_PACE_SECONDS = 0.5
+# Let the pacers tune request rate (and PDP pages in flight, up to PDP_CONTEXTS * PDP_PAGES_PER_CONTEXT) from the
+# responses, starting at the gaps above, and back off on 429/503, timeouts and captcha pages; False = fixed gaps
+ADAPTIVE_PACING = True
+
+# Read listings / PDPs from the window.__myx hydration payload before touching the rendered DOM
+STRUCTURED_DATA_FAST_PATH = True
+# When the payload has no listing, how cards are read from the DOM: "batch" = the whole page in one
+# page.evaluate (card_schema.py), "live" = 8+ locator round trips per card
+LISTING_EXTRACT_MODE = "batch"
+# PDP fields the payload must carry for the DOM path to be skipped entirely
+STRUCTURED_REQUIRED_PDP_FIELDS = ("Product Name (PDP)", "Price (INR)", "Original Price (INR)")
+# Try a plain HTTP GET for each PDP first and only open a browser tab when its payload is incomplete
+PDP_HTTP_FIRST = True
+# Append each enriched product to myntra_enriched.jsonl as it completes; at the end the JSONL and the final
+# JSON are rewritten in listing order
+STREAM_OUTPUT = True
+# Category links and PDP URLs are tracked in myntra_frontier.sqlite so an interrupted run resumes where it stopped
+RESUME = True
+# Dev aid: serve pages from the on-disk response cache (output folder / http_cache) while entries are fresh, so
+# re-running after a selector change re-parses without hitting the site
+USE_RESPONSE_CACHE = False
+# Products whose listing card (rating, rating count, ...) is unchanged since the last run reuse that run's PDP
+# fields. The card fingerprint has no price, so the default is "revalidate": a conditional GET on the HTTP path,
+# with a 304 reusing last run's fields. "skip" = no request at all, "off" = always fetch
+INCREMENTAL_MODE = "revalidate"
+# Remember every scraped product ID in an on-disk Bloom filter (myntra_seen_ids.bloom) and don't
+# queue PDPs for products an earlier run already scraped. Duplicates within a run are always dropped.
+DEDUP_ACROSS_RUNS = False
+# Attach to a running `python browser_service.py serve` (e.g. "http://127.0.0.1:9222") instead of launching Chromium
+BROWSER_ENDPOINT = None
+# Failed listing pages and PDPs are set aside and retried once the main pass is done, with exponential backoff and
+# jitter (retry_queue.py); whatever still fails goes to myntra_dead_letters.jsonl for `retry_queue.py replay`.
+# False = no retries, failures go straight to the dead-letter file.
+RETRY_FAILED = True
+# Per-stage timings and counters go to myntra_run_report.json at the end of every run (metrics.py); a path here
+# also writes them in Prometheus text format, e.g. into node_exporter's textfile directory for nightly runs
+PROMETHEUS_TEXTFILE = None
+
 def start_gui():
+    # tkinter is only imported here so headless runs (run_job.py) never load it
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+
     def add_link():
         link = link_entry.get().strip()
         if link:
@@ -66,6 +133,7 @@ def start_gui():
     root.mainloop()
 
 # ==== LISTING SCRAPER ====
+@metrics.timed("extract")
 async def extract_product_data(product):
     try:
         import datetime, re
@@ -126,36 +194,85 @@ async def extract_product_data(product):
         print(f"❌ Error extracting product: {e}")
         return None
 
-async def scrape_myntra_link(page, base_url, product_limit):
-    all_data, seen_ids = [], set()
+async def scrape_myntra_link(page, base_url, product_limit, pacer=None, retries=None):
+    # Cards by page number, so a page recovered by a retry slots back in where it belongs
+    pages = {}
+    seen_ids = set()
     page_num, extracted = 1, 0
     prev_ids = set()
+    failed_in_row = 0
+    max_failed_in_row = 2  # Consecutive failed pages before the rest of the link is given up on
+
+    async def open_page(url):
+        # Raises when the page did not load or the site pushed back (429 / 5xx)
+        async with paced(pacer) as ticket:
+            with metrics.timer("navigate"):
+                response = await page.goto(url, timeout=60000, wait_until="domcontentloaded")
+            metrics.count("pages")
+            status = response.status if response else None
+            ticket.report(status)
+        if status is not None and (status == 429 or status >= 500):
+            raise status_error(status)
+
+    async def read_cards():
+        # ⚡ Fast path: search results straight from the hydration payload, no render wait
+        if STRUCTURED_DATA_FAST_PATH:
+            timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            with metrics.timer("extract"):
+                markup = await page.content()
+            metrics.count("bytes", len(markup))
+            with metrics.timer("parse"):
+                results = myntra_listing_items(markup, timestamp)
+            if results:
+                return results
+
+        await page.wait_for_selector("#desktopSearchResults .results-base li", timeout=15000)
+        await wait_until_ready(page, "myntra", "listing", replaces=3.25)
+        if LISTING_EXTRACT_MODE == "batch":
+            cards = await extract_cards(page, "myntra")
+            timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            return [dict(card, **{"Date of Extraction": timestamp}) for card in cards if card]
+        products = await page.locator("#desktopSearchResults .results-base li").all()
+        return await asyncio.gather(*(extract_product_data(p) for p in products))
 
     while extracted < product_limit:
         url = f"{base_url}{'&' if '?' in base_url else '?'}p={page_num}"
         print(f"\n📄 Scraping: {url} (Page {page_num})")
 
         try:
-            await page.goto(url, timeout=60000, wait_until="domcontentloaded")
-            await page.wait_for_selector("#desktopSearchResults .results-base li", timeout=15000)
-            await asyncio.sleep(random.uniform(2.5, 4))
+            await open_page(url)
         except Exception as e:
             print(f"❌ Page load failed: {e}")
-            break
+            if retries is None:
+                break
+            # Pagination carries on; the page is retried once the rest of the link is done.
+            # Given up on for good, the whole link is what gets replayed.
+            retries.push("listing_page", url, {"link": base_url, "page": page_num}, e,
+                         replay={"kind": "listing", "url": base_url, "payload": None, "redo": True})
+            failed_in_row += 1
+            if failed_in_row >= max_failed_in_row:
+                break
+            page_num += 1
+            continue
+        failed_in_row = 0
 
-        products = await page.locator("#desktopSearchResults .results-base li").all()
-        if not products:
+        try:
+            results = await read_cards()
+        except Exception as e:
+            # Past the last page there is no result grid to wait for, so this ends the link rather than being retried
+            print(f"❌ Page load failed: {e}")
+            break
+        if not results:
             print("⚠️ No more products.")
             break
 
-        results = await asyncio.gather(*(extract_product_data(p) for p in products))
+        pages[page_num] = results
         current_ids = set()
 
         for item in results:
             if item and item["Data ID"] not in seen_ids and extracted < product_limit:
                 seen_ids.add(item["Data ID"])
                 current_ids.add(item["Data ID"])
-                all_data.append(item)
                 extracted += 1
 
         if not current_ids or current_ids == prev_ids:
@@ -165,15 +282,71 @@ async def scrape_myntra_link(page, base_url, product_limit):
         prev_ids = current_ids
         page_num += 1
 
-    return all_data
+    if retries is not None and len(retries):
+        async def retry_page(item):
+            await open_page(item.url)
+            pages[item.payload["page"]] = await read_cards()
 
+        # Every load goes through the one tab, so one retry at a time
+        await retries.drain(retry_page, concurrency=1)
+
+    # Page order, each product where it was first seen
+    all_data, seen_ids = [], set()
+    for n in sorted(pages):
+        for item in pages[n]:
+            if item and item["Data ID"] not in seen_ids and len(all_data) < product_limit:
+                seen_ids.add(item["Data ID"])
+                all_data.append(item)
+    return all_data
 
 # ==== PDP SCRAPER ====
-async def extract_pdp_data(page, url):
+def build_pdp_record(url, fields):
+    return {
+        "Product URL": url,
+        "Product Name (PDP)": fields.get("Product Name (PDP)", ""),
+        "Product Details": fields.get("Product Details", []),
+        "Size & Fit": fields.get("Size & Fit", ""),
+        "Material & Care": fields.get("Material & Care", ""),
+        "Offer Details": fields.get("Offer Details", ""),
+        "Price (INR)": fields.get("Price (INR)", "N/A"),
+        "Original Price (INR)": fields.get("Original Price (INR)", "N/A"),
+        "Discount": fields.get("Discount", "N/A"),
+        **fields.get("Specifications", {})  # Flatten the specifications into the top-level dictionary
+    }
+
+@metrics.timed("parse")
+def pdp_payload_complete(markup):
+    # The payload's fields when every required one is there, so the HTTP path does not parse the page twice
+    fields = myntra_pdp_fields(markup)
+    return fields if all(fields.get(key) for key in STRUCTURED_REQUIRED_PDP_FIELDS) else None
+
+
+async def extract_pdp_data(page, url, ticket):
+    # ticket: the pacer slot's, told the navigation's status so a 429 / 5xx counts as the site pushing back
+    with metrics.timer("navigate"):
+        response = await page.goto(url, timeout=60000, wait_until="domcontentloaded")
+    metrics.count("pages")
+    status = response.status if response else None
+    ticket.report(status)
+    if status is not None and (status == 429 or status >= 500):
+        raise status_error(status)
+
     try:
-        await page.goto(url, timeout=60000, wait_until="domcontentloaded")
+        # ⚡ Fast path: the hydration payload ships with the HTML, so no client-side render wait is needed
+        structured = {}
+        if STRUCTURED_DATA_FAST_PATH:
+            with metrics.timer("extract"):
+                markup = await page.content()
+            metrics.count("bytes", len(markup))
+            with metrics.timer("parse"):
+                structured = myntra_pdp_fields(markup)
+        if structured and all(structured.get(key) for key in STRUCTURED_REQUIRED_PDP_FIELDS):
+            return build_pdp_record(url, structured)
+
         await page.wait_for_selector("#mountRoot", timeout=20000)
-        await asyncio.sleep(2)
+        await wait_until_ready(page, "myntra", "pdp", replaces=2.0)
+        # Everything from here to the record is live DOM reads
+        extract_started = time.perf_counter()
 
         async def safe_html(selector):
             try:
@@ -214,8 +387,9 @@ async def extract_pdp_data(page, url):
         try:
             see_more_button = page.locator("div.index-showMoreText")
             if await see_more_button.count() > 0:
+                rows_before = await page.locator("div.index-tableContainer > div.index-row").count()
                 await see_more_button.click()
-                await asyncio.sleep(1)
+                await wait_for_count_above(page, "div.index-tableContainer > div.index-row", rows_before, replaces=1.0, timeout_ms=2000)
         except Exception as e:
             print(f"⚠️ Could not click See More: {e}")
 
@@ -256,8 +430,7 @@ async def extract_pdp_data(page, url):
         except Exception:
             price = original_price = discount = "N/A"
 
-        return {
-            "Product URL": url,
+        dom_fields = {
             "Product Name (PDP)": product_name,
             "Product Details": parsed_details,
             "Size & Fit": size_fit,
@@ -266,52 +439,248 @@ async def extract_pdp_data(page, url):
             "Price (INR)": price,
             "Original Price (INR)": original_price,
             "Discount": discount,
-            **specs  # Flatten the specifications into the top-level dictionary
+            "Specifications": specs
         }
+        metrics.observe("extract", time.perf_counter() - extract_started)
+        # Payload values win; the DOM only fills the fields the payload was missing
+        return build_pdp_record(url, {**dom_fields, **{k: v for k, v in structured.items() if v}})
 
     except Exception as e:
+        if is_timeout(e):
+            # Left to the pacer slot, which counts a timeout as throttling rather than a broken page
+            raise
         print(f"❌ PDP error for {url}: {e}")
         return {}
 
 
 
 # ==== RUNNER ====
+def open_frontier(out_dir):
+    return Frontier(os.path.join(out_dir, "myntra_frontier.sqlite"), "myntra")
+
+def open_cache(out_dir):
+    return ResponseCache(os.path.join(out_dir, "http_cache")) if USE_RESPONSE_CACHE else None
+
+def open_fingerprints(out_dir):
+    return ProductFingerprints(os.path.join(out_dir, "myntra_fingerprints.sqlite"), "myntra", INCREMENTAL_MODE)
+
+def open_pacer(stage):
+    if stage == "listing":
+        return make_pacer("myntra listing", LISTING_PACE_SECONDS, adaptive=ADAPTIVE_PACING)
+    return make_pacer("myntra pdp", PDP_PACE_SECONDS, adaptive=ADAPTIVE_PACING,
+                      max_concurrency=PDP_CONTEXTS * PDP_PAGES_PER_CONTEXT)
+
+def open_dedup(out_dir):
+    return DedupIndex("myntra", os.path.join(out_dir, "myntra_seen_ids.bloom") if DEDUP_ACROSS_RUNS else None, DEDUP_ACROSS_RUNS)
+
+def open_retries(out_dir, stage, queue):
+    dead_letters = DeadLetters(os.path.join(out_dir, "myntra_dead_letters.jsonl"), "myntra", getattr(queue, "path", None))
+    return RetryQueue(f"myntra {stage}", dead_letters, None if RETRY_FAILED else 1)
+
+async def open_pdp_pool(browser, context, route_stats, cache):
+    # PDP pages are spread over `context` plus PDP_CONTEXTS - 1 more, each with the route filter
+    pdp_contexts = [context] + list(await asyncio.gather(*(
+        open_context(browser, viewport={"width": 1280, "height": 800}) for _ in range(PDP_CONTEXTS - 1)
+    )))
+    for pdp_context in pdp_contexts[1:]:
+        await install_route_filter(pdp_context, "myntra", route_stats, cache=cache)
+    return PagePool(pdp_contexts, PDP_CONTEXTS * PDP_PAGES_PER_CONTEXT)
+
+async def scrape_listing_links(queue, page, pacer, dedup=None, retries=None):
+    # Claims links until none are left. With a dedup index each link's PDPs are queued as it finishes;
+    # sharded runs leave that to the parent process.
+    done = 0
+    for link, _ in queue.claims("listing"):
+        print(f"🔗 Scraping: {link}")
+        try:
+            data = await scrape_myntra_link(page, link, PRODUCTS_PER_LINK, pacer, retries)
+        except Exception as e:
+            print(f"❌ Error scraping {link}: {e}")
+            metrics.count("errors")
+            queue.fail("listing", link, e)
+            continue
+        queue.complete("listing", link, data)
+        metrics.count("listing_products", len(data))
+        done += 1
+        if dedup is not None:
+            # One PDP per style ID, however many links list it
+            queue.enqueue("pdp", [(item["Product URL"], item) for item in data
+                                  if item["Product URL"] != "N/A" and dedup.admit(item)])
+    return done
+
+def plan_pdp(item, fingerprints):
+    # Decided once per product, before its first attempt; retries reuse the decision
+    return fingerprints.plan(item, can_revalidate=PDP_HTTP_FIRST)
+
+async def fetch_pdp(item, action, hybrid, pool, pacer, fingerprints):
+    # One attempt at a product's PDP fields, as plan_pdp() decided; raises if the page could not be loaded or read
+    url = item["Product URL"]
+    if action == "skip":
+        metrics.count("products_reused")
+        return fingerprints.reuse(item)
+    if PDP_HTTP_FIRST:
+        headers = fingerprints.conditional_headers(item) if action == "revalidate" else None
+        try:
+            markup, fields = await hybrid.fetch_http_checked(url, headers)
+        except NotModified:
+            metrics.count("products_reused")
+            return fingerprints.reuse(item, not_modified=True)
+        if markup is not None:
+            pdp = build_pdp_record(url, fields)
+            hybrid.record(url, "http")
+            fingerprints.record(item, pdp, hybrid.validators.get(url))
+            return pdp
+    async with pool.page() as pdp_page, pacer.slot() as ticket:
+        pdp = await extract_pdp_data(pdp_page, url, ticket)
+        if not pdp:
+            # Raised inside the slot so the pacer counts it as a failed request
+            raise RuntimeError("PDP extraction failed")
+    hybrid.record(url, "browser")
+    fingerprints.record(item, pdp)
+    return pdp
+
+def save_pdp(item, pdp, queue, sink=None):
+    # Each task owns its listing item, so out-of-order completion still lands on the right row
+    item.update(pdp)
+    queue.complete("pdp", item["Product URL"], item)
+    metrics.count("products")
+    if sink is not None:
+        sink.write(item)
+
+def drop_pdp(item, error, queue, sink=None):
+    # Given up on: the URL stays open for the next run, and the output keeps just the listing fields
+    queue.fail("pdp", item["Product URL"], error)
+    if sink is not None:
+        sink.write(item)
+
+async def enrich_item(item, hybrid, pool, pacer, fingerprints, queue, sink=None, retries=None):
+    action = plan_pdp(item, fingerprints)
+    try:
+        pdp = await fetch_pdp(item, action, hybrid, pool, pacer, fingerprints)
+    except Exception as e:
+        if retries is not None:
+            # Retried by retry_pdp_items() once every product has had its first go, with the same plan;
+            # a dead-lettered product goes back on the frontier as just the listing item
+            url = item["Product URL"]
+            retries.push("pdp", url, (item, action), e,
+                         replay={"kind": "pdp", "url": url, "payload": item, "redo": False})
+        else:
+            drop_pdp(item, e, queue, sink)
+        return item
+    save_pdp(item, pdp, queue, sink)
+    return item
+
+async def retry_pdp_items(retries, hybrid, pool, pacer, fingerprints, queue, sink=None):
+    async def retry(entry):
+        item, action = entry.payload
+        save_pdp(item, await fetch_pdp(item, action, hybrid, pool, pacer, fingerprints), queue, sink)
+
+    await retries.drain(retry, lambda entry: drop_pdp(entry.payload[0], entry.errors[-1], queue, sink))
+
 async def run_all():
-    start_gui()
-        
     os.makedirs(output_dir, exist_ok=True)
-    total_listing_data = []
+    metrics.reset("myntra")
+    frontier = open_frontier(output_dir).begin(fresh=not RESUME)
+    frontier.enqueue("listing", category_links)
+    cache = open_cache(output_dir)
+    fingerprints = open_fingerprints(output_dir)
+    dedup = open_dedup(output_dir)
+    dedup.seed(frontier.payloads("pdp"))
 
     async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=False)
-        context = await browser.new_context(viewport={"width": 1280, "height": 800})
+        browser = await launch_or_attach(p, HEADLESS, BROWSER_ENDPOINT)
+        context = await open_context(browser, viewport={"width": 1280, "height": 800})
+        route_stats = await install_route_filter(context, "myntra", cache=cache)
         page = await context.new_page()
+        listing_pacer = open_pacer("listing")
+        listing_retries = open_retries(output_dir, "listing", frontier)
 
-        for link in category_links:
-            print(f"🔗 Scraping: {link}")
-            data = await scrape_myntra_link(page, link, PRODUCTS_PER_LINK)
-            total_listing_data.extend(data)
+        # Links finished by an interrupted run are not claimed again
+        await scrape_listing_links(frontier, page, listing_pacer, dedup, listing_retries)
+        total_listing_data = [item for data in frontier.results("listing") for item in data]
+        print(frontier.summary("listing"))
 
         if not total_listing_data:
             print("❌ No listing data found.")
+            # Left unfinished, so the next run resumes the links that failed
+            frontier.close()
+            if cache is not None:
+                cache.close()
+            fingerprints.close()
+            dedup.close()
+            await browser.close()
+            write_run_report(output_dir)
             return
 
         # Save listing
 # Save listing as JSON
         listing_path = os.path.join(output_dir, "myntra_listing.json")
-        with open(listing_path, "w", encoding="utf-8") as f:
+        with metrics.timer("write"), open(listing_path, "w", encoding="utf-8") as f:
             json.dump(total_listing_data, f, indent=4, ensure_ascii=False)
             print(f"💾 Saved listing data: {listing_path}")
 
-        # PDP enrichment
-        enriched_data = []
-        for i, item in enumerate(total_listing_data):
-            pdp = await extract_pdp_data(page, item["Product URL"])
-            item.update(pdp)
-            enriched_data.append(item)
-            if i % 10 == 0 or i == len(total_listing_data) - 1:
-                print(f"🔄 PDP processed: {i + 1}/{len(total_listing_data)}")
-            await asyncio.sleep(1)  # prevent overloading
+        # PDP enrichment: PDPs run concurrently on a pool of pages spread over several contexts
+        pool = await open_pdp_pool(browser, context, route_stats, cache)
+        pdp_pacer = open_pacer("pdp")
+        http = AsyncFetcher(concurrency=pool.max_pages, per_host=pool.max_pages, host_delay=0, cache=cache)
+        hybrid = HybridFetcher("myntra", "pdp", http, pdp_payload_complete, pool, pdp_pacer, replaces=2.0)
+        final_jsonl_path = os.path.join(output_dir, "myntra_enriched.jsonl")
+        sink = JsonlWriter(final_jsonl_path) if STREAM_OUTPUT else None
+        if sink is not None:
+            # PDPs finished by an interrupted run go back into the fresh stream first; those it gave up on
+            # (attempts used up, so not claimed again) keep just their listing fields, as drop_pdp() writes them
+            for item in frontier.results("pdp"):
+                sink.write(item)
+            for item in frontier.payloads("pdp", "failed"):
+                sink.write(item)
+        # Only PDPs not finished by an earlier run are claimed
+        pending = [item for _, item in frontier.claim("pdp")]
+        pdp_retries = open_retries(output_dir, "pdp", frontier)
+        completed = 0
+
+        async def enrich(item):
+            nonlocal completed
+            await enrich_item(item, hybrid, pool, pdp_pacer, fingerprints, frontier, sink, pdp_retries)
+            completed += 1
+            if completed % 10 == 1 or completed == len(pending):
+                print(f"🔄 PDP processed: {completed}/{len(pending)}")
+
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(enrich(item) for item in pending))
+            await retry_pdp_items(pdp_retries, hybrid, pool, pdp_pacer, fingerprints, frontier, sink)
+        finally:
+            if sink is not None:
+                sink.close()
+        elapsed = time.perf_counter() - started
+        await pool.close()
+        await http.aclose()
+        print(f"⚡ Enriched {len(pending)} products in {elapsed:.1f}s "
+              f"({len(pending) / elapsed if elapsed else 0.0:.2f} products/s, {pool.max_pages} pages)")
+        # Listing order, with each product replaced by its enriched record from this or an earlier run
+        enriched_by_url = {item["Product URL"]: item for item in frontier.results("pdp")}
+        enriched_data = [dict(enriched_by_url.get(item["Product URL"], item)) for item in total_listing_data]
+        print(frontier.summary("pdp"))
+        for product in frontier.payloads("pdp", "done"):
+            dedup.remember(product)
+        frontier.finish()
+        frontier.close()
+        if cache is not None:
+            print(cache.summary())
+            cache.close()
+        print(fingerprints.summary())
+        fingerprints.close()
+        print(dedup.summary())
+        dedup.close()
+        print(route_stats.summary())
+        print(browser_stats.summary())
+        print(readiness_stats.summary())
+        print(hybrid.summary())
+        print(listing_pacer.summary())
+        print(pdp_pacer.summary())
+        print(listing_retries.summary())
+        print(pdp_retries.summary())
+        hybrid.save_paths(os.path.join(output_dir, "myntra_fetch_paths.json"))
 
         # Dynamic fieldnames
         all_fieldnames = set()
@@ -326,11 +695,120 @@ async def run_all():
         # Final save
         # Final save as JSON
     final_path = os.path.join(output_dir, "myntra_enriched.json")
-    with open(final_path, "w", encoding="utf-8") as f:
+    if sink is not None:
+        print(sink.summary())
+        # The stream is in completion order; rewritten in listing order, then the JSON rebuilt from it
+        with JsonlWriter(sink.path) as final_sink:
+            for row in enriched_data:
+                final_sink.write(row)
+        rebuild_json(final_sink.path, final_path)
+        print(f"✅ Final enriched data saved: {final_path}")
+        write_run_report(output_dir)
+        return
+    with metrics.timer("write"), open(final_path, "w", encoding="utf-8") as f:
         json.dump(enriched_data, f, indent=4, ensure_ascii=False)
         print(f"✅ Final enriched data saved: {final_path}")
+    write_run_report(output_dir)
+
+
+# ==== SHARDED RUNS (sharding.py) ====
+async def listing_worker(queue, out_dir, products_per_link=None):
+    global PRODUCTS_PER_LINK
+    cache = open_cache(out_dir)
+    # Queue workers run job after job in one process, so the limit is put back afterwards
+    default_limit = PRODUCTS_PER_LINK
+    if products_per_link is not None:
+        PRODUCTS_PER_LINK = products_per_link
+    try:
+        async with async_playwright() as p:
+            browser = await launch_or_attach(p, HEADLESS, BROWSER_ENDPOINT)
+            context = await open_context(browser, viewport={"width": 1280, "height": 800})
+            route_stats = await install_route_filter(context, "myntra", cache=cache)
+            retries = open_retries(out_dir, "listing", queue)
+            done = await scrape_listing_links(queue, await context.new_page(), open_pacer("listing"), retries=retries)
+            print(route_stats.summary())
+            print(retries.summary())
+            print(browser_stats.summary())
+            await browser.close()
+    finally:
+        PRODUCTS_PER_LINK = default_limit
+        if cache is not None:
+            cache.close()
+    return done
+
+async def pdp_worker(queue, out_dir):
+    cache = open_cache(out_dir)
+    fingerprints = open_fingerprints(out_dir)
+    claimed = 0
+    try:
+        async with async_playwright() as p:
+            browser = await launch_or_attach(p, HEADLESS, BROWSER_ENDPOINT)
+            context = await open_context(browser, viewport={"width": 1280, "height": 800})
+            route_stats = await install_route_filter(context, "myntra", cache=cache)
+            pool = await open_pdp_pool(browser, context, route_stats, cache)
+            pacer = open_pacer("pdp")
+            retries = open_retries(out_dir, "pdp", queue)
+            async with AsyncFetcher(concurrency=pool.max_pages, per_host=pool.max_pages, host_delay=0, cache=cache) as http:
+                hybrid = HybridFetcher("myntra", "pdp", http, pdp_payload_complete, pool, pacer, replaces=2.0)
+                # A batch at a time so other processes can take the rest; each batch's failures are retried before the next
+                while True:
+                    batch = queue.claim("pdp", SHARD_BATCH_SIZE)
+                    if not batch:
+                        break
+                    await asyncio.gather(*(enrich_item(item, hybrid, pool, pacer, fingerprints, queue, retries=retries)
+                                           for _, item in batch))
+                    await retry_pdp_items(retries, hybrid, pool, pacer, fingerprints, queue)
+                    claimed += len(batch)
+            await pool.close()
+            print(route_stats.summary())
+            print(browser_stats.summary())
+            print(hybrid.summary())
+            print(pacer.summary())
+            print(retries.summary())
+            await browser.close()
+    finally:
+        if cache is not None:
+            cache.close()
+        print(fingerprints.summary())
+        fingerprints.close()
+    return claimed
+
+def write_outputs(frontier, out_dir):
+    listing = [item for data in frontier.results("listing") for item in data]
+    listing_path = os.path.join(out_dir, "myntra_listing.json")
+    with metrics.timer("write"), open(listing_path, "w", encoding="utf-8") as f:
+        json.dump(listing, f, indent=4, ensure_ascii=False)
+    # As in run_all(): listing order, each product replaced by its enriched record if it has one,
+    # so products whose PDP failed or was given up on keep their listing fields
+    enriched_by_url = {item["Product URL"]: item for item in frontier.results("pdp")}
+    final_path = os.path.join(out_dir, "myntra_enriched.json")
+    with JsonlWriter(os.path.join(out_dir, "myntra_enriched.jsonl")) as sink:
+        for item in listing:
+            sink.write(enriched_by_url.get(item["Product URL"], item))
+    rebuild_json(sink.path, final_path, pad_keys=True)
+    print(f"✅ Final enriched data saved: {final_path}")
+
+def write_run_report(out_dir):
+    print(metrics.summary())
+    metrics.write_report(os.path.join(out_dir, "myntra_run_report.json"), PROMETHEUS_TEXTFILE)
+
+
+def run_pipeline(links, out_dir, products_per_link=None):
+    # Same run as the GUI starts, with the GUI's inputs passed in directly
+    global category_links, output_dir, PRODUCTS_PER_LINK
+    category_links = list(links)
+    output_dir = out_dir
+    # The limit is this run's only: a later run without one starts from the module's value again
+    default_limit = PRODUCTS_PER_LINK
+    if products_per_link is not None:
+        PRODUCTS_PER_LINK = products_per_link
+    try:
+        asyncio.run(run_all())
+    finally:
+        PRODUCTS_PER_LINK = default_limit
 
 
 # ==== ENTRY POINT ====
 if __name__ == "__main__":
+    start_gui()
     asyncio.run(run_all())
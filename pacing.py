@@ -0,0 +1,257 @@
+import asyncio
+import random
+import re
+import time
+from contextlib import asynccontextmanager
+
+# ----------------------------------------
+# Politeness pacing, kept apart from readiness waits.
+# A Pacer spaces request starts at least `interval` (+ random jitter) seconds
+# apart, no matter how many workers share it.
+# An AdaptivePacer does the same job without hand-tuning: a token bucket sets
+# the request rate and an AIMD window caps requests in flight. Both climb
+# additively while responses come back healthy and are cut multiplicatively
+# when the site pushes back (429 / 503, timeouts, captcha pages).
+#
+# Both share one interface:
+#     async with pacer.slot() as ticket:
+#         resp = await fetch(url)
+#         ticket.report(resp.status_code, markup=resp.text)
+# An exception escaping the slot is reported as that error; a slot that
+# reports nothing counts as healthy. wait() alone only takes a start time.
+# A response served from a local cache is reported with cached=True: it says
+# nothing about the site, so it neither counts as healthy nor feeds the
+# latency baseline. Latencies are only comparable within one request type, so
+# HTTP GETs and browser loads of a stage each get their own pacer (split_pacer()).
+# ----------------------------------------
+
+THROTTLE_STATUSES = {429, 503}
+# Bot walls the sites serve with a 200
+_CAPTCHA_MARKERS = re.compile(
+    r"validateCaptcha|robot check|unusual traffic|verify you are a human|captcha-delivery|px-captcha",
+    re.IGNORECASE,
+)
+
+ADAPTIVE_START_CONCURRENCY = 2    # requests in flight before the first healthy window
+ADAPTIVE_RATE_STEP = 0.25         # req/s added after every healthy window
+ADAPTIVE_MAX_RATE_FACTOR = 4.0    # the rate never climbs past this multiple of the configured pace
+ADAPTIVE_MIN_RATE_FACTOR = 0.125  # ... nor drops below this multiple of it
+ADAPTIVE_BACKOFF = 0.5            # rate and window are multiplied by this when the site pushes back
+ADAPTIVE_PAUSE_SECONDS = 5.0      # no new requests this long after a push-back (or Retry-After, if longer)
+SLOW_LATENCY_FACTOR = 3.0         # a response this many times slower than the recent average is not "healthy"
+LATENCY_SMOOTHING = 0.2           # weight of each new latency in that moving average (EWMA)
+
+
+def is_timeout(error):
+    # asyncio / httpx / Playwright timeouts all carry "Timeout" in their class name
+    return isinstance(error, (asyncio.TimeoutError, TimeoutError)) or "Timeout" in type(error).__name__
+
+
+def classify(status=None, error=None, markup=None):
+    # "throttled" = the site is pushing back, "error" = failed some other way, "ok" otherwise
+    if error is not None:
+        return "throttled" if is_timeout(error) else "error"
+    if status in THROTTLE_STATUSES:
+        return "throttled"
+    if markup and _CAPTCHA_MARKERS.search(markup[:50000]):
+        return "throttled"
+    if status is not None and status >= 400:
+        return "error"
+    return "ok"
+
+
+def retry_after_seconds(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None  # HTTP-date form; the default pause applies
+
+
+class Pacer:
+    def __init__(self, interval, jitter=0.0):
+        self.interval = interval
+        self.jitter = jitter
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_start)
+            self._next_start = start_at + self.interval + random.uniform(0, self.jitter)
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.wait()
+        yield self
+
+    def report(self, status=None, error=None, markup=None, retry_after=None, cached=False):
+        pass  # fixed pacing does not react to responses
+
+    def summary(self):
+        jitter = f" + up to {self.jitter:.2f}s" if self.jitter else ""
+        return f"🚦 Pacing: fixed {self.interval:.2f}s{jitter} between requests"
+
+
+_UNPACED = Pacer(0)
+
+
+def paced(pacer):
+    # pacer.slot(), or a slot that never waits when there is no pacer
+    return (pacer or _UNPACED).slot()
+
+
+class TokenBucket:
+    # `rate` tokens per second, at most `burst` saved up; take() waits for one. rate can change at any time.
+    def __init__(self, rate, burst=1.0):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    async def take(self):
+        # Waiters queue on the lock, so tokens go out first come, first served
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    self._updated = time.monotonic()
+                    continue
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+
+class _Ticket:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.outcome = None
+        self.retry_after = None
+
+    def report(self, status=None, error=None, markup=None, retry_after=None, cached=False):
+        # The first report wins: a parse error after a clean 200 is not the site pushing back
+        if self.outcome is None:
+            self.outcome = "cached" if cached else classify(status, error, markup)
+            self.retry_after = retry_after_seconds(retry_after)
+
+
+class AdaptivePacer:
+    def __init__(self, name, interval, max_concurrency=1, jitter=0.0):
+        self.name = name
+        self.interval = interval
+        self.jitter = jitter
+        self.max_concurrency = max(1, max_concurrency)
+        base_rate = 1.0 / interval if interval > 0 else 10.0
+        self.initial_rate = base_rate
+        self.min_rate = base_rate * ADAPTIVE_MIN_RATE_FACTOR
+        self.max_rate = base_rate * ADAPTIVE_MAX_RATE_FACTOR
+        self.bucket = TokenBucket(base_rate)
+        self.limit = float(min(ADAPTIVE_START_CONCURRENCY, self.max_concurrency))
+        self.peak_rate = base_rate
+        self.peak_limit = self.limit
+        self.outcomes = {"ok": 0, "slow": 0, "throttled": 0, "error": 0, "cached": 0}
+        self.backoffs = 0
+        self._inflight = 0
+        self._streak = 0
+        self._latency = None
+        self._last_backoff = 0.0
+        self._cond = asyncio.Condition()
+
+    async def wait(self):
+        await self.bucket.take()
+        if self.jitter:
+            await asyncio.sleep(random.uniform(0, self.jitter))
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._inflight < int(self.limit))
+            self._inflight += 1
+        ticket = _Ticket()
+        try:
+            await self.wait()
+            ticket.started = time.monotonic()
+            yield ticket
+        except Exception as e:
+            ticket.report(error=e)
+            raise
+        finally:
+            self._record(ticket.outcome or "ok", ticket.started, ticket.retry_after)
+            async with self._cond:
+                self._inflight -= 1
+                self._cond.notify_all()
+
+    def report(self, status=None, error=None, markup=None, retry_after=None, cached=False):
+        # For requests paced with wait() rather than slot(): no latency, just the outcome
+        outcome = "cached" if cached else classify(status, error, markup)
+        self._record(outcome, None, retry_after_seconds(retry_after))
+
+    def _record(self, outcome, started, retry_after=None):
+        now = time.monotonic()
+        if outcome == "ok" and started is not None:
+            # Judged against a moving average rather than the fastest ever seen, so one freak-fast response
+            # can't mark every normal one after it as slow for the rest of the run
+            latency = now - started
+            baseline = self._latency
+            self._latency = latency if baseline is None else (
+                LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * baseline)
+            if baseline is not None and latency > SLOW_LATENCY_FACTOR * baseline:
+                outcome = "slow"
+        self.outcomes[outcome] += 1
+        if outcome == "cached":
+            return
+
+        if outcome == "throttled":
+            self._streak = 0
+            # Requests already in flight when we backed off don't cut again for the same episode
+            if started is None or started >= self._last_backoff:
+                self._last_backoff = now
+                self.backoffs += 1
+                self.limit = max(1.0, self.limit * ADAPTIVE_BACKOFF)
+                self.bucket.rate = max(self.min_rate, self.bucket.rate * ADAPTIVE_BACKOFF)
+                self.bucket.pause(max(ADAPTIVE_PAUSE_SECONDS, retry_after or 0.0))
+        elif outcome == "ok":
+            # One step up per window's worth of healthy responses (roughly once per round trip)
+            self._streak += 1
+            if self._streak >= int(self.limit):
+                self._streak = 0
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0)
+                self.bucket.rate = min(self.max_rate, self.bucket.rate + ADAPTIVE_RATE_STEP)
+                self.peak_limit = max(self.peak_limit, self.limit)
+                self.peak_rate = max(self.peak_rate, self.bucket.rate)
+        else:
+            self._streak = 0
+
+    def summary(self):
+        counts = ", ".join(f"{k}={v}" for k, v in self.outcomes.items() if v) or "no requests"
+        return (f"🚦 Adaptive pacing ({self.name}): {counts}; rate {self.initial_rate:.2f} -> "
+                f"{self.bucket.rate:.2f} req/s (peak {self.peak_rate:.2f}), concurrency {int(self.limit)}"
+                f"/{self.max_concurrency} (peak {int(self.peak_limit)}), {self.backoffs} backoff(s)")
+
+
+def split_pacer(pacer, kind):
+    # A fresh pacer with the same settings, for another request type of the same stage
+    if pacer is None:
+        return None
+    if isinstance(pacer, AdaptivePacer):
+        return AdaptivePacer(f"{pacer.name} {kind}", pacer.interval, pacer.max_concurrency, pacer.jitter)
+    return Pacer(pacer.interval, pacer.jitter)
+
+
+def make_pacer(name, interval, jitter=0.0, adaptive=False, max_concurrency=1):
+    # The configured interval is the fixed gap, or the adaptive pacer's starting point
+    if adaptive:
+        return AdaptivePacer(name, interval, max_concurrency, jitter)
+    return Pacer(interval, jitter)
@@ -0,0 +1,136 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+# ----------------------------------------
+# Bounded Playwright page pool + browser memory sampling.
+# Pages are opened lazily up to max_pages, handed back out for the next URL
+# instead of opening a new tab, and all closed together at the end.
+# ----------------------------------------
+
+
+class PagePool:
+    def __init__(self, contexts, max_pages):
+        self._contexts = contexts if isinstance(contexts, (list, tuple)) else [contexts]
+        self.max_pages = max(1, max_pages)
+        self._slots = asyncio.Semaphore(self.max_pages)
+        self._idle = asyncio.Queue()
+        self._pages = []
+        self.pages_opened = 0
+        self.reuses = 0
+
+    async def acquire(self):
+        await self._slots.acquire()
+        try:
+            while True:
+                try:
+                    page = self._idle.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if not page.is_closed():
+                    self.reuses += 1
+                    return page
+                self._pages.remove(page)
+
+            # Spread new pages round-robin over the contexts
+            context = self._contexts[self.pages_opened % len(self._contexts)]
+            page = await context.new_page()
+            self._pages.append(page)
+            self.pages_opened += 1
+            return page
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, page):
+        self._idle.put_nowait(page)
+        self._slots.release()
+
+    @asynccontextmanager
+    async def page(self):
+        page = await self.acquire()
+        try:
+            yield page
+        finally:
+            self.release(page)
+
+    async def close(self):
+        for page in self._pages:
+            if not page.is_closed():
+                await page.close()
+        self._pages.clear()
+
+
+def browser_rss_bytes():
+    # RSS of every process started under this one (Playwright driver + Chromium), None if unknown
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+
+    if psutil is not None:
+        total = 0
+        for child in psutil.Process().children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return total
+
+    if not os.path.isdir("/proc"):
+        return None
+
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Field 4 is the parent pid; split after the ")" that closes the command name
+                parents[int(entry)] = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+
+    descendants, frontier = set(), {os.getpid()}
+    while frontier:
+        frontier = {pid for pid, ppid in parents.items() if ppid in frontier} - descendants
+        descendants |= frontier
+
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    for pid in descendants:
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
+
+
+class RssMonitor:
+    # Samples browser_rss_bytes() in the background and keeps the peak
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._task = None
+
+    async def _run(self):
+        while True:
+            rss = await asyncio.to_thread(browser_rss_bytes)
+            if rss is None:
+                return
+            self.peak_bytes = max(self.peak_bytes, rss)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        return self.peak_bytes
@@ -0,0 +1,126 @@
+import time
+
+from metrics import stats as metrics
+
+# ----------------------------------------
+# Adaptive readiness detection.
+# Instead of sleeping a fixed number of seconds after every navigation, wait
+# until the selectors extraction needs are attached and the DOM has stopped
+# changing (or the network is idle), bounded by READY_TIMEOUT_MS.
+# Politeness pacing lives in pacing.py and is configured separately.
+# ----------------------------------------
+
+READY_STRATEGY = "dom"      # "dom" = MutationObserver quiescence, "network" = Playwright networkidle
+READY_QUIET_MS = 500        # DOM must be mutation-free this long to count as settled
+READY_TIMEOUT_MS = 8000     # upper bound on any single readiness wait
+
+# Selectors that must be present before each page type can be extracted
+READY_SELECTORS = {
+    ("amazon", "listing"): ["div[data-asin]"],
+    ("amazon", "pdp"): ["#productTitle"],
+    ("flipkart", "listing"): ["[data-id]"],
+    ("ajio", "listing"): ["#products .item"],
+    ("ajio", "pdp"): [".prod-container"],
+    ("myntra", "listing"): ["#desktopSearchResults .results-base li"],
+    ("myntra", "pdp"): ["h1.pdp-name"],
+}
+
+_DOM_QUIET_JS = """
+([quietMs, timeoutMs]) => new Promise(resolve => {
+    let quietTimer;
+    const finish = reason => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(capTimer);
+        resolve(reason);
+    };
+    const observer = new MutationObserver(() => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => finish("quiet"), quietMs);
+    });
+    observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+    quietTimer = setTimeout(() => finish("quiet"), quietMs);
+    const capTimer = setTimeout(() => finish("timeout"), timeoutMs);
+})
+"""
+
+
+class ReadinessStats:
+    def __init__(self):
+        self.waits = 0
+        self.timeouts = 0
+        self.seconds_waited = 0.0
+        self.seconds_replaced = 0.0
+
+    def record(self, elapsed, replaces, timed_out):
+        self.waits += 1
+        self.timeouts += int(timed_out)
+        self.seconds_waited += elapsed
+        self.seconds_replaced += replaces
+        metrics.observe("ready", elapsed)
+
+    def summary(self):
+        if not self.waits:
+            return "⏱️ Readiness: no waits recorded"
+        saved = self.seconds_replaced - self.seconds_waited
+        return (f"⏱️ Readiness: {self.waits} waits, avg {self.seconds_waited / self.waits:.2f}s "
+                f"vs {self.seconds_replaced / self.waits:.2f}s fixed, saved {saved / self.waits:.2f}s/page "
+                f"({saved:.0f}s total, {self.timeouts} hit the upper bound)")
+
+
+stats = ReadinessStats()
+
+
+async def wait_for_settled(page, timeout_ms=READY_TIMEOUT_MS, quiet_ms=READY_QUIET_MS):
+    # True if the page settled before the bound, False if it was still busy at timeout_ms
+    if timeout_ms <= 0:
+        return False
+    try:
+        if READY_STRATEGY == "network":
+            await page.wait_for_load_state("networkidle", timeout=timeout_ms)
+            return True
+        return await page.evaluate(_DOM_QUIET_JS, [quiet_ms, timeout_ms]) == "quiet"
+    except Exception:
+        return False
+
+
+async def wait_until_ready(page, site, kind, replaces=0.0, timeout_ms=READY_TIMEOUT_MS):
+    # `replaces` is the fixed sleep (seconds) this wait stands in for, used for the time-saved report
+    started = time.perf_counter()
+    timed_out = False
+    try:
+        for selector in READY_SELECTORS[(site, kind)]:
+            remaining = timeout_ms - (time.perf_counter() - started) * 1000
+            await page.wait_for_selector(selector, state="attached", timeout=max(remaining, 1))
+    except Exception:
+        timed_out = True
+
+    if not timed_out:
+        remaining = timeout_ms - (time.perf_counter() - started) * 1000
+        timed_out = not await wait_for_settled(page, remaining)
+
+    elapsed = time.perf_counter() - started
+    stats.record(elapsed, replaces, timed_out)
+    return elapsed
+
+
+async def wait_for_count_above(page, selector, previous_count, replaces=0.0, timeout_ms=READY_TIMEOUT_MS):
+    # For infinite scroll / "show more": wait until more than previous_count matches exist, then settle.
+    # Returns False when nothing new appeared within the bound.
+    started = time.perf_counter()
+    try:
+        await page.wait_for_function(
+            "([sel, n]) => document.querySelectorAll(sel).length > n",
+            arg=[selector, previous_count],
+            timeout=timeout_ms,
+        )
+        grew = True
+    except Exception:
+        grew = False
+
+    if grew:
+        remaining = timeout_ms - (time.perf_counter() - started) * 1000
+        await wait_for_settled(page, remaining)
+
+    stats.record(time.perf_counter() - started, replaces, not grew)
+    return grew
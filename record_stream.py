@@ -0,0 +1,159 @@
+import argparse
+import csv
+import json
+import os
+import queue
+import threading
+import time
+
+from metrics import stats as metrics
+
+# ----------------------------------------
+# Streaming JSON Lines output.
+# Each finished record is appended as one line by a background writer thread,
+# with flush + fsync batched every STREAM_BATCH_SIZE records or
+# STREAM_FLUSH_SECONDS, whichever comes first. A crash loses at most the last
+# unsynced batch. The pretty JSON / CSV files are rebuilt from the stream
+# afterwards without loading the whole run into memory:
+#     python record_stream.py Amazon_full_data.jsonl --json Amazon_full_data.json --indent 2
+# ----------------------------------------
+
+STREAM_BATCH_SIZE = 25
+STREAM_FLUSH_SECONDS = 2.0
+
+_CLOSE = object()
+
+
+class JsonlWriter:
+    def __init__(self, path, batch_size=STREAM_BATCH_SIZE, flush_interval=STREAM_FLUSH_SECONDS, append=False):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.fsyncs = 0
+        self._error = None
+        self._queue = queue.Queue()
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, name=f"jsonl-writer:{os.path.basename(path)}", daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        # Serialised on the caller's side so later mutation of `record` can't change what lands on disk
+        if self._error is not None:
+            raise self._error
+        self._queue.put(json.dumps(record, ensure_ascii=False))
+
+    def _sync(self):
+        with metrics.timer("write"):
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self.fsyncs += 1
+
+    def _run(self):
+        pending = 0
+        last_sync = time.monotonic()
+        try:
+            while True:
+                try:
+                    line = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    line = None
+                if line is _CLOSE:
+                    break
+                if line is not None:
+                    self._file.write(line + "\n")
+                    self.written += 1
+                    pending += 1
+                if pending and (pending >= self.batch_size or time.monotonic() - last_sync >= self.flush_interval):
+                    self._sync()
+                    pending = 0
+                    last_sync = time.monotonic()
+            if pending:
+                self._sync()
+        except Exception as e:
+            self._error = e
+        finally:
+            self._file.close()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_CLOSE)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def summary(self):
+        return f"📝 Streamed {self.written} records to {self.path} ({self.fsyncs} fsyncs)"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_jsonl(path):
+    # A line cut short by a crash mid-write is skipped rather than failing the whole rebuild
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"⚠️ Skipping unreadable line in {path}")
+
+
+def jsonl_fieldnames(path):
+    return sorted({key for record in read_jsonl(path) for key in record})
+
+
+@metrics.timed("write")
+def rebuild_json(jsonl_path, json_path, indent=4, pad_keys=False, ensure_ascii=False):
+    # Writes the same layout as json.dump(records, f, indent=indent, ensure_ascii=ensure_ascii), one record at a time
+    fieldnames = jsonl_fieldnames(jsonl_path) if pad_keys else []
+    count = 0
+    with open(json_path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for record in read_jsonl(jsonl_path):
+            for key in fieldnames:
+                record.setdefault(key, "")
+            body = json.dumps(record, indent=indent, ensure_ascii=ensure_ascii)
+            # Not splitlines(): it would also cut at U+2028 / U+2029 / U+0085, which stay raw inside strings
+            f.write(("," if count else "") + "\n" + "\n".join(" " * indent + line for line in body.split("\n")))
+            count += 1
+        f.write("\n]" if count else "]")
+    return count
+
+
+@metrics.timed("write")
+def rebuild_csv(jsonl_path, csv_path):
+    fieldnames = jsonl_fieldnames(jsonl_path)
+    if not fieldnames:
+        print("No data to save to CSV.")
+        return 0
+    count = 0
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for record in read_jsonl(jsonl_path):
+            writer.writerow({k: record.get(k, "") for k in fieldnames})
+            count += 1
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild pretty JSON / CSV output from a .jsonl stream")
+    parser.add_argument("jsonl")
+    parser.add_argument("--json", dest="json_path")
+    parser.add_argument("--csv", dest="csv_path")
+    parser.add_argument("--indent", type=int, default=4)
+    parser.add_argument("--pad-keys", action="store_true", help="give every record every column, as the Myntra output does")
+    parser.add_argument("--ascii", action="store_true", help="escape non-ASCII characters, as the Flipkart output does")
+    args = parser.parse_args()
+
+    if args.json_path:
+        print(f"✅ {rebuild_json(args.jsonl, args.json_path, args.indent, args.pad_keys, args.ascii)} records -> {args.json_path}")
+    if args.csv_path:
+        print(f"✅ {rebuild_csv(args.jsonl, args.csv_path)} records -> {args.csv_path}")
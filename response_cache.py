@@ -0,0 +1,259 @@
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+try:
+    import zstandard  # optional: pip install zstandard
+except ImportError:
+    zstandard = None
+
+# ----------------------------------------
+# On-disk HTTP response cache shared by the httpx fetcher and Playwright
+# (through route fulfilment). Pages themselves are only stored from the HTTP
+# path, once a scraper has accepted them (AsyncFetcher.store()); the browser
+# side caches the scripts, styles and API calls a page pulls in.
+# Entries are keyed by normalised URL; bodies are stored content-addressed
+# (sha256 of the body) and compressed with zstd when available, else gzip, so
+# identical bodies behind different URLs are kept once. Entries expire after
+# CACHE_TTL_SECONDS and the least recently used ones are evicted once the
+# compressed bodies exceed CACHE_MAX_BYTES.
+# ----------------------------------------
+
+CACHE_TTL_SECONDS = 6 * 3600
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+# Only successful responses are worth replaying
+CACHE_STATUSES = {200}
+# Query parameters that only track the click / session and never change the page
+CACHE_IGNORED_PARAMS = {
+    "qid", "sr", "crid", "sprefix", "ref", "ref_", "th", "psc",           # Amazon
+    "otracker", "otracker1", "fm", "iid", "ssid", "ppt", "ppn", "srno",  # Flipkart
+}
+# Playwright resource types served from / stored into the cache. No "document": nothing checks a page the browser
+# loads before the route would store it, so a bot wall or captcha page would be replayed for the whole TTL
+CACHE_BROWSER_RESOURCE_TYPES = {"script", "stylesheet", "xhr", "fetch"}
+# The stored body is already decoded, so these would describe the wrong bytes on replay
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "set-cookie"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    url_key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body_hash TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_lru ON entries (accessed_at);
+CREATE TABLE IF NOT EXISTS objects (
+    body_hash TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+"""
+
+
+def normalize_url(url):
+    parts = urlsplit(url)
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k not in CACHE_IGNORED_PARAMS and not k.startswith("utm_")
+    )
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", urlencode(query), ""))
+
+
+def replay_headers(headers):
+    return {k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS}
+
+
+class CachedResponse:
+    def __init__(self, url, status, headers, body, stored_at):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.stored_at = stored_at
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_served = 0
+        self.bytes_stored = 0
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        ratio = self.hits / lookups * 100 if lookups else 0.0
+        return (f"🗄️ Response cache: {self.hits}/{lookups} hits ({ratio:.0f}%), "
+                f"{self.expired} expired, {self.stores} stored, {self.evictions} evicted, "
+                f"{self.bytes_served / 1e6:.1f} MB served from disk, {self.bytes_stored / 1e6:.1f} MB written")
+
+
+class ResponseCache:
+    def __init__(self, directory, ttl=CACHE_TTL_SECONDS, max_bytes=CACHE_MAX_BYTES, codec=None):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.codec = codec or ("zstd" if zstandard is not None else "gzip")
+        if self.codec == "zstd" and zstandard is None:
+            print("⚠️ zstd requested but the 'zstandard' package is missing, using gzip")
+            self.codec = "gzip"
+        self.stats = CacheStats()
+
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(directory, "index.sqlite"), isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        # Sharded runs share one cache between processes
+        self.db.execute("PRAGMA busy_timeout=5000")
+        self.db.executescript(_SCHEMA)
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    def _object_path(self, body_hash, codec):
+        return os.path.join(self.directory, "objects", body_hash[:2], f"{body_hash}.{'zst' if codec == 'zstd' else 'gz'}")
+
+    def _compress(self, body):
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=6).compress(body)
+        return gzip.compress(body, compresslevel=6)
+
+    @staticmethod
+    def _decompress(data, codec):
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("cache entry is zstd-compressed but 'zstandard' is not installed")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def get(self, url, allow_stale=False):
+        # None on a miss or an expired entry; allow_stale hands back expired entries (for revalidation)
+        row = self.db.execute(
+            "SELECT e.url, e.status, e.headers, e.body_hash, e.stored_at, o.codec FROM entries e "
+            "JOIN objects o ON o.body_hash = e.body_hash WHERE e.url_key = ?",
+            (normalize_url(url),),
+        ).fetchone()
+        if row is None:
+            self.stats.misses += 1
+            return None
+        stored_url, status, headers, body_hash, stored_at, codec = row
+        if self.ttl is not None and time.time() - stored_at > self.ttl and not allow_stale:
+            self.stats.misses += 1
+            self.stats.expired += 1
+            return None
+        try:
+            with open(self._object_path(body_hash, codec), "rb") as f:
+                body = self._decompress(f.read(), codec)
+        except (OSError, ValueError, RuntimeError):
+            self.stats.misses += 1
+            return None
+
+        self.db.execute("UPDATE entries SET accessed_at = ? WHERE url_key = ?", (time.time(), normalize_url(url)))
+        self.stats.hits += 1
+        self.stats.bytes_served += len(body)
+        return CachedResponse(stored_url, status, json.loads(headers), body, stored_at)
+
+    def put(self, url, status, headers, body):
+        if status not in CACHE_STATUSES:
+            return False
+        body_hash = hashlib.sha256(body).hexdigest()
+        now = time.time()
+
+        if self.db.execute("SELECT 1 FROM objects WHERE body_hash = ?", (body_hash,)).fetchone() is None:
+            data = self._compress(body)
+            path = self._object_path(body_hash, self.codec)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            # Another process may have stored the same body in the meantime
+            inserted = self.db.execute(
+                "INSERT OR IGNORE INTO objects (body_hash, codec, size) VALUES (?, ?, ?)", (body_hash, self.codec, len(data))
+            ).rowcount
+            if inserted:
+                self.total_bytes += len(data)
+                self.stats.bytes_stored += len(data)
+
+        previous = self.db.execute("SELECT body_hash FROM entries WHERE url_key = ?", (normalize_url(url),)).fetchone()
+        self.db.execute(
+            "INSERT OR REPLACE INTO entries (url_key, url, status, headers, body_hash, stored_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (normalize_url(url), url, status, json.dumps(replay_headers(dict(headers))), body_hash, now, now),
+        )
+        if previous is not None and previous[0] != body_hash:
+            self._drop_object_if_unused(previous[0])
+        self.stats.stores += 1
+        self._evict()
+        return True
+
+    def touch(self, url):
+        # Marks an entry fresh again without rewriting the body (e.g. after a 304 Not Modified)
+        now = time.time()
+        self.db.execute("UPDATE entries SET stored_at = ?, accessed_at = ? WHERE url_key = ?", (now, now, normalize_url(url)))
+
+    def _drop_object_if_unused(self, body_hash):
+        if self.db.execute("SELECT 1 FROM entries WHERE body_hash = ? LIMIT 1", (body_hash,)).fetchone():
+            return
+        row = self.db.execute("SELECT codec, size FROM objects WHERE body_hash = ?", (body_hash,)).fetchone()
+        if row is None:
+            return
+        self.db.execute("DELETE FROM objects WHERE body_hash = ?", (body_hash,))
+        self.total_bytes -= row[1]
+        try:
+            os.remove(self._object_path(body_hash, row[0]))
+        except OSError:
+            pass
+
+    def _evict(self):
+        # Least recently read entries go first, down to 90% of the budget so eviction is not paid on every put
+        if self.total_bytes <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        for url_key, body_hash in self.db.execute("SELECT url_key, body_hash FROM entries ORDER BY accessed_at").fetchall():
+            if self.total_bytes <= target:
+                break
+            self.db.execute("DELETE FROM entries WHERE url_key = ?", (url_key,))
+            self._drop_object_if_unused(body_hash)
+            self.stats.evictions += 1
+
+    def summary(self):
+        return self.stats.summary() + f", {self.total_bytes / 1e6:.1f} MB on disk"
+
+    def close(self):
+        self.db.close()
+
+
+async def install_response_cache(context, cache, resource_types=None):
+    # Registered before the route filter: the filter's route.fallback() hands allowed requests on to this
+    # handler, which fulfils them from disk or fetches, stores and fulfils them on a miss.
+    resource_types = CACHE_BROWSER_RESOURCE_TYPES if resource_types is None else resource_types
+
+    async def handle(route):
+        request = route.request
+        if request.method != "GET" or request.resource_type not in resource_types:
+            await route.fallback()
+            return
+
+        cached = cache.get(request.url)
+        if cached is not None:
+            await route.fulfill(status=cached.status, headers=cached.headers, body=cached.body)
+            return
+
+        try:
+            response = await route.fetch()
+            body = await response.body()
+        except Exception:
+            await route.fallback()
+            return
+        cache.put(request.url, response.status, response.headers, body)
+        await route.fulfill(response=response, body=body)
+
+    await context.route("**/*", handle)
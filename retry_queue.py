@@ -0,0 +1,214 @@
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import time
+
+from frontier import Frontier
+from metrics import stats as metrics
+from record_stream import read_jsonl
+
+# ----------------------------------------
+# Deferred retries and the dead-letter file.
+# A fetch that fails on the main pass is pushed onto a RetryQueue instead of
+# being retried in place, dropped, or written out as an error placeholder, and
+# the main pass moves straight on. drain() then works through the failures
+# RETRY_CONCURRENCY at a time, each item waiting out an exponential backoff
+# with full jitter, counted from when it last failed, before its next attempt:
+#     delay = uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempts - 1)))
+# An item that has failed RETRY_MAX_ATTEMPTS times in all, or once with a
+# PermanentError (a 404, say), is appended to the site's dead-letter JSONL file
+# with every error it hit and what to put back on the frontier to try it again:
+#     python retry_queue.py show out/Amazon_dead_letters.jsonl
+#     python retry_queue.py replay out/Amazon_dead_letters.jsonl
+# Replay re-queues the items as pending and marks the run unfinished, so the
+# next run with the same output folder resumes and picks up just those.
+# ----------------------------------------
+
+RETRY_MAX_ATTEMPTS = 4    # attempts per item, counting the one that failed on the main pass
+RETRY_BASE_DELAY = 2.0    # seconds; doubles with every failed attempt ...
+RETRY_MAX_DELAY = 60.0    # ... up to this
+RETRY_CONCURRENCY = 3     # retries in flight at once while draining
+
+
+class PermanentError(Exception):
+    # A failure another attempt can't fix; the item goes to the dead-letter file straight away
+    pass
+
+
+def status_error(status):
+    # Exception for an unusable response status: 4xx other than 408 / 425 / 429 will not get better on a retry
+    message = f"Status code: {status}"
+    if 400 <= status < 500 and status not in (408, 425, 429):
+        return PermanentError(message)
+    return RuntimeError(message)
+
+
+def backoff_delay(attempts):
+    # Full jitter, so items that failed together don't all come back at the same moment
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempts - 1)))
+
+
+class RetryItem:
+    def __init__(self, kind, url, payload, replay):
+        self.kind = kind
+        self.url = url
+        self.payload = payload
+        self.replay = replay
+        self.attempts = 0
+        self.errors = []
+        self.permanent = False
+        self.failed_at = 0.0
+
+    def failed(self, error):
+        self.attempts += 1
+        self.errors.append(f"{type(error).__name__}: {error}"[:500])
+        self.permanent = isinstance(error, PermanentError)
+        self.failed_at = time.monotonic()
+
+
+class DeadLetters:
+    # One JSON line per item given up on; appends are single writes, so several worker processes can share the file
+    def __init__(self, path, site, frontier_path=None):
+        self.path = path
+        self.site = site
+        self.frontier_path = os.path.abspath(frontier_path) if frontier_path else None
+        self.written = 0
+
+    def write(self, item):
+        record = {
+            "site": self.site,
+            "kind": item.kind,
+            "url": item.url,
+            "attempts": item.attempts,
+            "errors": item.errors,
+            "dead_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "frontier": self.frontier_path,
+            "replay": item.replay,
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.written += 1
+
+
+class RetryQueue:
+    def __init__(self, name, dead_letters=None, max_attempts=None, concurrency=None):
+        self.name = name
+        self.dead_letters = dead_letters
+        self.max_attempts = max_attempts or RETRY_MAX_ATTEMPTS
+        self.concurrency = concurrency or RETRY_CONCURRENCY
+        self.deferred = 0
+        self.retried = 0
+        self.recovered = 0
+        self.dead = 0
+        self._items = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def push(self, kind, url, payload, error, replay=None):
+        # Called where the fetch failed; never waits. `replay` is what goes back on the frontier if the item
+        # ends up dead-lettered (default: this same url and payload, as a `kind` row).
+        item = RetryItem(kind, url, payload, replay or {"kind": kind, "url": url, "payload": payload, "redo": False})
+        item.failed(error)
+        self.deferred += 1
+        metrics.count("errors")
+        self._items.append(item)
+        return item
+
+    async def drain(self, handler, on_dead=None, concurrency=None):
+        # handler(item) makes one more attempt and raises if it failed again; on_dead(item) runs for each
+        # item given up on. Items pushed while draining are drained too. Returns how many items recovered.
+        limit = asyncio.Semaphore(concurrency or self.concurrency)
+        recovered = 0
+
+        async def retry(item):
+            nonlocal recovered
+            while not item.permanent and item.attempts < self.max_attempts:
+                await asyncio.sleep(max(0.0, item.failed_at + backoff_delay(item.attempts) - time.monotonic()))
+                async with limit:
+                    self.retried += 1
+                    try:
+                        await handler(item)
+                    except Exception as e:
+                        item.failed(e)
+                        metrics.count("errors")
+                        print(f"🔁 Retry {item.attempts - 1} of {item.url} failed: {e}")
+                        continue
+                self.recovered += 1
+                recovered += 1
+                metrics.count("recovered")
+                return
+            self.dead += 1
+            metrics.count("dead_lettered")
+            if self.dead_letters is not None:
+                self.dead_letters.write(item)
+            if on_dead is not None:
+                on_dead(item)
+
+        while self._items:
+            items, self._items = self._items, []
+            await asyncio.gather(*(retry(item) for item in items))
+        return recovered
+
+    def summary(self):
+        if not self.deferred:
+            return f"🔁 Retries ({self.name}): nothing failed"
+        where = f" -> {self.dead_letters.path}" if self.dead and self.dead_letters is not None else ""
+        return (f"🔁 Retries ({self.name}): {self.deferred} failed on the main pass, {self.recovered} recovered "
+                f"in {self.retried} retries, {self.dead} dead-lettered{where}")
+
+
+def replay(path, frontier_path=None):
+    # Puts every item in a dead-letter file back on its frontier; returns {(site, kind): rows re-queued}
+    grouped = {}
+    for record in read_jsonl(path):
+        target = frontier_path or record.get("frontier")
+        if not target:
+            raise ValueError(f"No frontier recorded for {record['url']}; pass one explicitly")
+        again = record["replay"]
+        key = (target, record["site"], again["kind"], bool(again.get("redo")))
+        # A URL dead-lettered by several runs is re-queued once
+        grouped.setdefault(key, {})[again["url"]] = again.get("payload")
+    counts = {}
+    for (target, site, kind, redo), items in grouped.items():
+        frontier = Frontier(target, site)
+        try:
+            requeued = frontier.requeue(kind, [(url, payload) for url, payload in items.items()], redo)
+        finally:
+            frontier.close()
+        counts[(site, kind)] = counts.get((site, kind), 0) + requeued
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or replay the scrapers' dead-letter files")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show_cmd = sub.add_parser("show", help="list what was given up on and why")
+    show_cmd.add_argument("path")
+    replay_cmd = sub.add_parser("replay", help="put the items back on their frontier for the next run")
+    replay_cmd.add_argument("path")
+    replay_cmd.add_argument("--frontier", help="frontier file to re-queue into instead of the one recorded")
+    replay_cmd.add_argument("--keep", action="store_true", help="leave the dead-letter file where it is")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        for record in read_jsonl(args.path):
+            print(f"💀 [{record['site']}/{record['kind']}] {record['url']} after {record['attempts']} attempt(s), "
+                  f"{record['dead_at']}: {record['errors'][-1] if record['errors'] else '?'}")
+        return
+
+    for (site, kind), count in replay(args.path, args.frontier).items():
+        print(f"♻️ {count} {site} {kind} row(s) re-queued")
+    if not args.keep:
+        # Moved aside so replaying twice doesn't re-queue rows a later run has already finished
+        done_path = f"{args.path}.replayed-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        os.replace(args.path, done_path)
+        print(f"📦 {args.path} -> {done_path}")
+    print("▶️ Run the same job again with the same output folder to retry them")
+
+
+if __name__ == "__main__":
+    main()
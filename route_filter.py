@@ -0,0 +1,102 @@
+import re
+from collections import Counter
+from urllib.parse import urlsplit
+
+from response_cache import install_response_cache
+
+# ----------------------------------------
+# Request interception shared by every Playwright context.
+# The scrapers only read text nodes, so images / media / fonts are aborted,
+# and anything outside the site's own domains (ads, analytics, tag managers)
+# never leaves the browser.
+# ----------------------------------------
+
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+
+# First-party domains each site needs to render its listing / PDP markup
+SITE_ALLOWLISTS = {
+    "amazon": ["amazon.in", "media-amazon.com", "ssl-images-amazon.com"],
+    "flipkart": ["flipkart.com", "flixcart.com"],
+    "ajio": ["ajio.com"],
+    "myntra": ["myntra.com", "myntassets.com"],
+}
+
+# URL patterns that are always let through, even off the allowlist (none needed yet)
+SITE_ALLOWED_URL_PATTERNS = {
+    "amazon": [],
+    "flipkart": [],
+    "ajio": [],
+    "myntra": [],
+}
+
+
+class RouteStats:
+    def __init__(self):
+        self.allowed = 0
+        self.blocked = 0
+        self.blocked_by_type = Counter()
+        self.blocked_by_domain = Counter()
+        self.bytes_received = 0
+
+    def summary(self):
+        total = self.allowed + self.blocked
+        top_types = ", ".join(f"{kind}={count}" for kind, count in self.blocked_by_type.most_common(4))
+        line = f"🛡️ Route filter: blocked {self.blocked}/{total} requests"
+        if top_types:
+            line += f" ({top_types})"
+        if self.bytes_received:
+            line += f", {self.bytes_received / 1e6:.1f} MB received"
+        return line
+
+
+def host_allowed(host, domains):
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+async def install_route_filter(context, site, stats=None, allow_domains=None, track_bytes=False, cache=None):
+    # Returns the RouteStats the context reports into; pass the same stats to several contexts to aggregate.
+    # With a ResponseCache, allowed requests fall back to the cache handler instead of going straight out.
+    stats = stats if stats is not None else RouteStats()
+    if cache is not None:
+        # Playwright tries the most recently registered handler first, so the cache goes in before the filter
+        await install_response_cache(context, cache)
+    domains = allow_domains if allow_domains is not None else SITE_ALLOWLISTS[site]
+    allowed_patterns = [re.compile(p) for p in SITE_ALLOWED_URL_PATTERNS.get(site, [])]
+
+    async def handle(route):
+        request = route.request
+        url = request.url
+        host = urlsplit(url).hostname or ""
+
+        if url.startswith(("data:", "blob:")) or any(p.search(url) for p in allowed_patterns):
+            reason = None
+        elif request.resource_type in BLOCKED_RESOURCE_TYPES:
+            reason = request.resource_type
+        elif not host_allowed(host, domains):
+            reason = "third-party"
+        else:
+            reason = None
+
+        if reason is None:
+            stats.allowed += 1
+            await route.fallback()
+            return
+
+        stats.blocked += 1
+        stats.blocked_by_type[reason] += 1
+        stats.blocked_by_domain[host] += 1
+        await route.abort("blockedbyclient")
+
+    await context.route("**/*", handle)
+
+    if track_bytes:
+        # One extra CDP call per finished request, so only turned on when measuring
+        async def on_finished(request):
+            try:
+                sizes = await request.sizes()
+                stats.bytes_received += sizes["responseBodySize"] + sizes["responseHeadersSize"]
+            except Exception:
+                pass
+        context.on("requestfinished", on_finished)
+
+    return stats
@@ -0,0 +1,163 @@
+import time
+
+_T0 = time.perf_counter()
+
+import argparse
+import importlib
+import json
+import sys
+
+from browser_service import stats as browser_stats
+from sharding import SCRAPER_MODULES, run_sharded
+from work_queue import connect, coordinate, shutdown_workers
+
+# ----------------------------------------
+# Headless batch runner: scrapes from a job file instead of the tkinter GUIs,
+# so runs can be scheduled (cron, containers) or started side by side.
+#     python run_job.py jobs/kurtas.json
+#     python run_job.py jobs/kurtas.toml --check     # validate + import only, then exit
+#
+# Job file (JSON, or TOML on Python 3.11+ / with tomli installed):
+#     {
+#       "output_dir": "runs/2026-10-18",             # default for every job
+#       "settings": {"RESUME": true},                # module constants applied to every job
+#       "jobs": [
+#         {"site": "amazon", "links": ["https://..."], "limit": 50,
+#          "settings": {"PDP_WORKERS": 8, "PDP_CONTEXTS": 3}},
+#         {"site": "flipkart", "links": ["https://..."], "limit": 2, "output_dir": "runs/flipkart"},
+#         {"site": "myntra", "links": ["https://...", "https://..."], "limit": 100, "workers": 4}
+#       ]
+#     }
+# "limit" is products per link for Amazon / Myntra / Ajio and listing pages per link for Flipkart.
+# "settings" override the scraper module's UPPERCASE constants (concurrency, pacing, modes ...);
+# an unknown name is an error rather than a silent no-op. "workers" > 1 shards the job's links and PDPs
+# over that many processes (sharding.py); "broker": "http://host:8765" (or a queue file) hands the job to
+# `work_queue.py work` processes on other hosts and only coordinates here. Nothing here imports tkinter.
+# With `python browser_service.py serve` running, "settings": {"BROWSER_ENDPOINT": "http://127.0.0.1:9222"}
+# makes every job attach to that one Chromium instead of cold-starting its own.
+# ----------------------------------------
+
+# Applied before each job's own settings: no windows in batch runs
+DEFAULT_SETTINGS = {"HEADLESS": True}
+
+_ORIGINALS = {}
+
+
+def load_job_file(path):
+    with open(path, "rb") as f:
+        raw = f.read()
+    if path.lower().endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError:
+            import tomli as tomllib  # Python < 3.11: pip install tomli
+        return tomllib.loads(raw.decode("utf-8"))
+    return json.loads(raw)
+
+
+def parse_jobs(config):
+    if not isinstance(config.get("jobs"), list) or not config["jobs"]:
+        raise ValueError("job file needs a non-empty \"jobs\" list")
+    jobs = []
+    for n, job in enumerate(config["jobs"], 1):
+        site = str(job.get("site", "")).lower()
+        if site not in SCRAPER_MODULES:
+            raise ValueError(f"job {n}: unknown site {job.get('site')!r} (expected one of {', '.join(SCRAPER_MODULES)})")
+        links = job.get("links")
+        if isinstance(links, str):
+            links = [links]
+        if not links or not all(isinstance(link, str) and link.strip() for link in links):
+            raise ValueError(f"job {n} ({site}): \"links\" must be a non-empty list of URLs")
+        output_dir = job.get("output_dir") or config.get("output_dir")
+        if not output_dir:
+            raise ValueError(f"job {n} ({site}): no \"output_dir\" on the job or at the top level")
+        limit = job.get("limit")
+        if limit is not None and (not isinstance(limit, int) or limit <= 0):
+            raise ValueError(f"job {n} ({site}): \"limit\" must be a positive integer")
+        workers = job.get("workers", config.get("workers", 1))
+        if not isinstance(workers, int) or workers <= 0:
+            raise ValueError(f"job {n} ({site}): \"workers\" must be a positive integer")
+        settings = {**DEFAULT_SETTINGS, **config.get("settings", {}), **job.get("settings", {})}
+        jobs.append({
+            "site": site,
+            "links": [link.strip() for link in links],
+            "limit": limit,
+            "output_dir": output_dir,
+            "workers": workers,
+            "broker": job.get("broker") or config.get("broker"),
+            "settings": settings,
+        })
+    return jobs
+
+
+def apply_settings(module, settings):
+    # Puts back whatever an earlier job overrode, so a later job for the same site starts from the module's defaults
+    originals = _ORIGINALS.setdefault(module.__name__, {})
+    for name, value in originals.items():
+        setattr(module, name, value)
+    for name, value in settings.items():
+        if not hasattr(module, name) or not name.isupper():
+            if name in DEFAULT_SETTINGS:
+                continue  # e.g. HEADLESS on a scraper that is always headless
+            raise ValueError(f"{module.__name__} has no setting {name!r}")
+        originals.setdefault(name, getattr(module, name))
+        setattr(module, name, value)
+
+
+def run_one(module, job):
+    if job["broker"]:
+        coordinate(job["site"], job["links"], job["output_dir"], job["broker"], job["limit"], job["settings"])
+    elif job["workers"] > 1:
+        run_sharded(job["site"], job["links"], job["output_dir"], job["limit"], job["workers"], job["settings"])
+    # Every scraper exposes run_pipeline(links, output_dir, limit); without a limit it keeps its own default
+    elif job["limit"] is None:
+        module.run_pipeline(job["links"], job["output_dir"])
+    else:
+        module.run_pipeline(job["links"], job["output_dir"], job["limit"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run scraper jobs from a job file, without the GUI")
+    parser.add_argument("job_file")
+    parser.add_argument("--check", action="store_true", help="validate the job file and import the scrapers, then exit")
+    args = parser.parse_args()
+
+    jobs = parse_jobs(load_job_file(args.job_file))
+    modules = {}
+    for job in jobs:
+        if job["site"] not in modules:
+            modules[job["site"]] = importlib.import_module(SCRAPER_MODULES[job["site"]])
+        apply_settings(modules[job["site"]], job["settings"])
+
+    startup = time.perf_counter() - _T0
+    print(f"⏱️ Startup: {startup * 1000:.0f} ms (job file + {len(modules)} scraper module(s)), "
+          f"tkinter loaded: {'yes' if 'tkinter' in sys.modules else 'no'}")
+    if args.check:
+        print(f"✅ {len(jobs)} job(s) OK: " + ", ".join(f"{j['site']} ({len(j['links'])} links)" for j in jobs))
+        return 0
+
+    failed = 0
+    for n, job in enumerate(jobs, 1):
+        module = modules[job["site"]]
+        apply_settings(module, job["settings"])
+        print(f"\n🚀 Job {n}/{len(jobs)}: {job['site']} - {len(job['links'])} links -> {job['output_dir']}"
+              + (f" ({job['workers']} processes)" if job["workers"] > 1 else ""))
+        started = time.perf_counter()
+        browser_stats.reset()
+        try:
+            run_one(module, job)
+        except Exception as e:
+            failed += 1
+            print(f"❌ Job {n} ({job['site']}) failed: {e}")
+            continue
+        print(f"✅ Job {n} ({job['site']}) done in {time.perf_counter() - started:.1f}s")
+    # Queue workers poll for the next job until told otherwise, so they are only stopped once every job is done
+    for address in dict.fromkeys(job["broker"] for job in jobs if job["broker"]):
+        broker = connect(address)
+        shutdown_workers(broker)
+        broker.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
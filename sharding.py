@@ -0,0 +1,132 @@
+import asyncio
+import importlib
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from metrics import stats as metrics
+
+# ----------------------------------------
+# Multi-process sharded runs.
+# The SQLite frontier is the shard queue: N worker processes, each with its
+# own browser / HTTP client, claim category links one at a time and then PDPs
+# in batches of SHARD_BATCH_SIZE straight from the shared frontier file, so a
+# slow shard never holds work another process could take. Between the two
+# stages the parent dedups the listing results and enqueues PDPs in listing
+# order; at the end it writes the usual JSON / CSV outputs from the frontier's
+# results in that same order, whichever process finished them. Each worker
+# hands its stage timings and counters back, so the run report covers them all.
+#
+# A scraper module takes part by exposing:
+#   open_frontier(output_dir)                  -> Frontier (not begun)
+#   open_dedup(output_dir)                     -> DedupIndex
+#   listing_worker(queue, output_dir, limit)   (async) claims + completes "listing" rows
+#   pdp_worker(queue, output_dir)              (async) claims + completes "pdp" rows
+#   write_outputs(frontier, output_dir)        final files from the frontier results
+#   write_run_report(output_dir)               run report from the metrics (metrics.py)
+# `queue` only needs Frontier's claim / complete / fail.
+# ----------------------------------------
+
+SCRAPER_MODULES = {
+    "amazon": "amazon_scraper_full",
+    "flipkart": "flipkart_scraper_full",
+    "ajio": "ajio_scraper_full",
+    "myntra": "myntra_scraper_full",
+}
+
+SHARD_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+SHARD_BATCH_SIZE = 20
+
+
+def apply_settings(module, settings):
+    # Spawned workers start from a fresh import, so the job's overrides are re-applied there
+    for name, value in (settings or {}).items():
+        if hasattr(module, name):
+            setattr(module, name, value)
+
+
+def _stage_process(module_name, stage, output_dir, limit, settings):
+    module = importlib.import_module(module_name)
+    apply_settings(module, settings)
+    frontier = module.open_frontier(output_dir)
+    started = time.perf_counter()
+    try:
+        if stage == "listing":
+            done = asyncio.run(module.listing_worker(frontier, output_dir, limit))
+        else:
+            done = asyncio.run(module.pdp_worker(frontier, output_dir))
+    finally:
+        frontier.close()
+    return os.getpid(), done, time.perf_counter() - started, metrics.snapshot()
+
+
+def run_stage(site, stage, output_dir, workers=SHARD_WORKERS, limit=None, settings=None):
+    # Runs one stage ("listing" or "pdp") across up to `workers` processes; returns (items done, seconds)
+    module = importlib.import_module(SCRAPER_MODULES[site])
+    frontier = module.open_frontier(output_dir)
+    pending = frontier.counts(stage)["pending"]
+    frontier.close()
+    if not pending:
+        return 0, 0.0
+    # No point starting processes that would find the queue empty
+    per_worker = 1 if stage == "listing" else SHARD_BATCH_SIZE
+    workers = max(1, min(workers, math.ceil(pending / per_worker)))
+
+    print(f"🧩 {site} {stage}: {pending} pending across {workers} worker process(es)")
+    started = time.perf_counter()
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(_stage_process, SCRAPER_MODULES[site], stage, output_dir, limit, settings)
+                   for _ in range(workers)]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+
+    for *_, snapshot in results:
+        metrics.merge(snapshot)
+    done = sum(count for _, count, _, _ in results)
+    rate = done / elapsed if elapsed else 0.0
+    print(f"⚡ {site} {stage}: {done} done in {elapsed:.1f}s ({rate:.2f}/s over {workers} processes; "
+          + ", ".join(f"pid {pid}: {count} in {secs:.1f}s" for pid, count, secs, _ in results) + ")")
+    return done, elapsed
+
+
+def enqueue_pdps(frontier, dedup):
+    # Every listing result in listing order, so the PDP order (and the merged output) does not depend on
+    # which process scraped which link. Rows already enqueued by an interrupted run are left alone.
+    items = []
+    for products in frontier.results("listing"):
+        for item in products:
+            url = item.get("Product URL")
+            if url and url != "N/A" and dedup.admit(item):
+                items.append((url, item))
+    return frontier.enqueue("pdp", items)
+
+
+def run_sharded(site, links, output_dir, limit=None, workers=SHARD_WORKERS, settings=None):
+    module = importlib.import_module(SCRAPER_MODULES[site])
+    apply_settings(module, settings)
+    os.makedirs(output_dir, exist_ok=True)
+    metrics.reset(site)
+
+    frontier = module.open_frontier(output_dir).begin(fresh=not module.RESUME)
+    frontier.enqueue("listing", links)
+    started = time.perf_counter()
+    listing_done, _ = run_stage(site, "listing", output_dir, workers, limit, settings)
+    print(frontier.summary("listing"))
+
+    dedup = module.open_dedup(output_dir)
+    print(f"➕ {enqueue_pdps(frontier, dedup)} PDPs queued")
+    pdp_done, _ = run_stage(site, "pdp", output_dir, workers, limit, settings)
+    print(frontier.summary("pdp"))
+
+    module.write_outputs(frontier, output_dir)
+    for item in frontier.payloads("pdp", "done"):
+        dedup.remember(item)
+    frontier.finish()
+    frontier.close()
+    print(dedup.summary())
+    dedup.close()
+    print(f"🏁 {site}: {listing_done} links + {pdp_done} PDPs in {time.perf_counter() - started:.1f}s "
+          f"with up to {workers} processes")
+    module.write_run_report(output_dir)
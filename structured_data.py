@@ -0,0 +1,210 @@
+import json
+import re
+
+from html_parsing import parse_html, inner_text
+
+# ----------------------------------------
+# Embedded structured-data fast path.
+# Pulls JSON-LD and hydration payloads (window.__myx, window.__INITIAL_STATE__ ...)
+# straight out of the raw HTML and maps them onto the scrapers' existing output
+# keys. Callers fall back to DOM selectors for whatever is missing.
+# ----------------------------------------
+
+_LD_JSON_SCRIPT = re.compile(
+    r"<script[^>]*type=[\"']application/ld\+json[\"'][^>]*>(.*?)</script>",
+    re.IGNORECASE | re.DOTALL,
+)
+_DECODER = json.JSONDecoder()
+
+
+def json_ld_objects(markup):
+    objects = []
+    for block in _LD_JSON_SCRIPT.findall(markup or ""):
+        try:
+            data = json.loads(block.strip())
+        except ValueError:
+            continue
+        stack = data if isinstance(data, list) else [data]
+        for obj in stack:
+            if isinstance(obj, dict):
+                objects.append(obj)
+                objects.extend(o for o in obj.get("@graph", []) if isinstance(o, dict))
+    return objects
+
+
+def json_ld_product(markup):
+    for obj in json_ld_objects(markup):
+        types = obj.get("@type")
+        if types == "Product" or (isinstance(types, list) and "Product" in types):
+            return obj
+    return None
+
+
+def assigned_json(markup, name):
+    # Decodes the object literal in `window.<name> = {...}` without needing the closing </script>
+    match = re.search(rf"(?:window\.)?{re.escape(name)}\s*=\s*", markup or "")
+    if not match:
+        return None
+    try:
+        value, _ = _DECODER.raw_decode(markup, match.end())
+    except ValueError:
+        return None
+    return value
+
+
+def dig(data, *path):
+    for key in path:
+        if isinstance(data, dict):
+            data = data.get(key)
+        elif isinstance(data, list) and isinstance(key, int) and -len(data) <= key < len(data):
+            data = data[key]
+        else:
+            return None
+    return data
+
+
+def format_inr(value):
+    # 129999 -> "₹1,29,999" (Indian digit grouping, as shown on the sites)
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        return None
+    # Rounded once, in whole paise, so 99.999 carries into the rupees ("₹100") instead of showing "₹99.00"
+    rupees, paise = divmod(round(amount * 100), 100)
+    whole = str(rupees)
+    head, tail = whole[:-3], whole[-3:]
+    groups = []
+    while len(head) > 2:
+        groups.insert(0, head[-2:])
+        head = head[:-2]
+    if head:
+        groups.insert(0, head)
+    text = ",".join(groups + [tail]) if groups else tail
+    if paise:
+        text += f".{paise:02d}"
+    return f"₹{text}"
+
+
+def html_to_text(fragment):
+    # <br> is the only separator these payload snippets use between lines
+    return inner_text(parse_html(re.sub(r"<br\s*/?>", " ", fragment, flags=re.IGNORECASE))) if fragment else ""
+
+
+# ---------------- Amazon ----------------
+def amazon_pdp_fields(markup):
+    product = json_ld_product(markup) or {}
+    fields = {}
+    if product.get("description"):
+        fields["Product Description"] = html_to_text(product["description"])
+    return fields
+
+
+# ---------------- Flipkart ----------------
+def flipkart_pdp_fields(markup):
+    product = json_ld_product(markup)
+    if not product:
+        return {}
+    fields = {}
+    brand = dig(product, "brand", "name") if isinstance(product.get("brand"), dict) else product.get("brand")
+    if brand:
+        fields["Brand Name"] = str(brand).strip()
+    offers = product.get("offers")
+    price = dig(offers, 0, "price") if isinstance(offers, list) else dig(offers, "price")
+    if price is not None and format_inr(price):
+        fields["Price (INR)"] = format_inr(price)
+    rating = dig(product, "aggregateRating", "ratingValue")
+    if rating is not None:
+        fields["Rating"] = str(rating)
+    return fields
+
+
+# ---------------- Ajio ----------------
+def ajio_listing_items(payload, timestamp):
+    # One page of the product-list API the category grid loads (/api/category/..., /api/search/...)
+    items = []
+    for product in dig(payload, "products") or []:
+        code = product.get("code")
+        href = product.get("url")
+        if not code or not href:
+            continue
+        price = dig(product, "price", "displayformattedValue") or format_inr(dig(product, "price", "value"))
+        mrp = dig(product, "wasPriceData", "displayformattedValue") or format_inr(dig(product, "wasPriceData", "value"))
+        rating = product.get("averageRating")
+        rating_count = product.get("ratingCount")
+        items.append({
+            "Data ID": str(code),
+            "Brand Name": dig(product, "fnlColorVariantData", "brandName") or product.get("brandName") or "N/A",
+            "Product Name": product.get("name") or "N/A",
+            "Product URL": href if href.startswith("http") else f"https://www.ajio.com{href}",
+            "Rating": f"{float(rating):.1f}" if rating else "N/A",
+            "Rating Count": str(rating_count) if rating_count else "N/A",
+            "Price": price or "N/A",
+            "Original Price": mrp or "N/A",
+            "Discount": product.get("discountPercent") or "N/A",
+            # The payload's exclusive / new-arrival tag is what the grid renders as the .exclusive-new badge
+            "Bestseller": "Yes" if product.get("exclusiveTag") or dig(product, "tags", "exclusiveTag") else "No",
+            "Date of Extraction": timestamp
+        })
+    return items
+
+
+def ajio_listing_pagination(payload):
+    # (current page, total pages); total is None when the payload doesn't say
+    pagination = dig(payload, "pagination") or {}
+    return pagination.get("currentPage") or 0, pagination.get("totalPages")
+
+
+# ---------------- Myntra ----------------
+def myntra_listing_items(markup, timestamp):
+    products = dig(assigned_json(markup, "__myx"), "searchData", "results", "products") or []
+    items = []
+    for product in products:
+        data_id = product.get("productId")
+        href = product.get("landingPageUrl")
+        if not data_id or not href:
+            continue
+        rating = product.get("rating")
+        rating_count = product.get("ratingCount")
+        items.append({
+            "Data ID": str(data_id),
+            "Brand Name": product.get("brand") or "N/A",
+            "Product Name": product.get("additionalInfo") or product.get("productName") or "N/A",
+            "Product URL": f"https://www.myntra.com/{href}",
+            "Rating": f"{float(rating):.1f}" if rating else "N/A",
+            "Rating Count": str(rating_count) if rating_count else "N/A",
+            "Date of Extraction": timestamp
+        })
+    return items
+
+
+def myntra_pdp_fields(markup):
+    pdp = dig(assigned_json(markup, "__myx"), "pdpData")
+    if not pdp:
+        return {}
+
+    fields = {}
+    if pdp.get("name"):
+        fields["Product Name (PDP)"] = pdp["name"]
+
+    sections = {d.get("title"): html_to_text(d.get("description")) for d in pdp.get("productDetails") or []}
+    if sections.get("Product Details"):
+        fields["Product Details"] = [sections["Product Details"]]
+    if sections.get("Size & Fit"):
+        fields["Size & Fit"] = sections["Size & Fit"]
+    if sections.get("Material & Care"):
+        fields["Material & Care"] = sections["Material & Care"]
+
+    price = dig(pdp, "price", "discounted") or dig(pdp, "price", "mrp")
+    mrp = dig(pdp, "price", "mrp") or pdp.get("mrp")
+    if price:
+        fields["Price (INR)"] = f"₹{price}"
+    if mrp:
+        fields["Original Price (INR)"] = f"₹{mrp}"
+    discount = dig(pdp, "price", "discount", "label")
+    if discount:
+        fields["Discount"] = discount
+
+    specs = pdp.get("articleAttributes")
+    if isinstance(specs, dict) and specs:
+        fields["Specifications"] = {k: str(v).strip() for k, v in specs.items() if v not in (None, "", "NA")}
+    return fields
@@ -0,0 +1,36 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from record_stream import JsonlWriter, rebuild_json
+
+
+def write_stream(path, records):
+    with JsonlWriter(str(path)) as sink:
+        for record in records:
+            sink.write(record)
+
+
+def test_rebuild_json_keeps_line_separators_inside_strings(tmp_path):
+    # U+2028 / U+2029 / U+0085 stay raw with ensure_ascii=False and must not be treated as line breaks
+    records = [{"Product Name": "Kurta\u2028Set", "Product Description": "a\u2029b\u0085c\nd"}, {"Price": 499}]
+    jsonl_path, json_path = tmp_path / "out.jsonl", tmp_path / "out.json"
+    write_stream(jsonl_path, records)
+
+    assert rebuild_json(str(jsonl_path), str(json_path), indent=2) == 2
+    with open(json_path, encoding="utf-8") as f:
+        text = f.read()
+    assert json.loads(text) == records
+    assert text == json.dumps(records, indent=2, ensure_ascii=False)
+
+
+def test_rebuild_json_ensure_ascii_matches_json_dump(tmp_path):
+    records = [{"Product Name": "Caf\u00e9 \u20b9 kurta\u2028set"}]
+    jsonl_path, json_path = tmp_path / "out.jsonl", tmp_path / "out.json"
+    write_stream(jsonl_path, records)
+
+    rebuild_json(str(jsonl_path), str(json_path), ensure_ascii=True)
+    with open(json_path, encoding="utf-8") as f:
+        assert f.read() == json.dumps(records, indent=4)
@@ -0,0 +1,523 @@
+import argparse
+import asyncio
+import hmac
+import importlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sharding import SCRAPER_MODULES, apply_settings, enqueue_pdps
+
+# ----------------------------------------
+# Multi-host work queue with leases.
+# A coordinator puts category links on a shared queue, waits for the workers
+# to finish them, queues the PDPs the listings produced (deduped, in listing
+# order), waits again and writes the usual outputs. Workers on any number of
+# hosts lease batches, heartbeat while they hold them and ack / nack each row
+# with its result. A lease nobody renews within LEASE_SECONDS (worker killed,
+# host gone) expires and the rows go back to other workers, up to
+# MAX_DELIVERIES times before they are marked failed. An ack from a worker
+# whose lease has already moved on is dropped, so every row keeps one result.
+#
+# The broker is a SQLite file (fine for several processes on one host or a
+# local disk) or the same file behind a small HTTP server for other hosts.
+# The server only listens on loopback unless given a shared token, which every
+# client then sends (WORK_QUEUE_TOKEN in the environment on each host):
+#     python work_queue.py serve --db queue.sqlite --host 0.0.0.0 --port 8765
+#     python work_queue.py coordinate job.json --broker http://coord:8765
+#     python work_queue.py work --broker http://coord:8765 --work-dir ./worker   (on every host)
+# Workers keep polling for jobs until a coordinator is done with its whole job
+# file and tells them to stop (or `python work_queue.py shutdown --broker ...`).
+# The worker side reuses each scraper's sharding hooks (listing_worker / pdp_worker).
+# ----------------------------------------
+
+LEASE_SECONDS = 120
+HEARTBEAT_SECONDS = 30
+MAX_DELIVERIES = 3
+POLL_SECONDS = 5
+# Environment variable holding the HTTP broker's shared token
+TOKEN_ENV = "WORK_QUEUE_TOKEN"
+_LOOPBACK_HOSTS = {"127.0.0.1", "localhost", "::1"}
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    site TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    url TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    deliveries INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    payload TEXT,
+    result TEXT,
+    error TEXT,
+    enqueued_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (site, kind, url)
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (site, kind, state);
+CREATE INDEX IF NOT EXISTS jobs_owner ON jobs (lease_owner, state);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class FileBroker:
+    def __init__(self, path, lease_seconds=None, max_deliveries=None):
+        # Lease settings given here are stored in the file, so every process opening it later uses the same ones
+        self.path = path
+        self._lock = threading.Lock()  # the HTTP server calls in from several threads
+        self.db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA busy_timeout=5000")
+        self.db.executescript(_SCHEMA)
+        if lease_seconds is not None:
+            self.set_meta("lease_seconds", lease_seconds)
+        if max_deliveries is not None:
+            self.set_meta("max_deliveries", max_deliveries)
+        self.lease_seconds = self.get_meta("lease_seconds") or LEASE_SECONDS
+        self.max_deliveries = self.get_meta("max_deliveries") or MAX_DELIVERIES
+
+    def put(self, site, kind, items):
+        # items: URLs or [url, payload] pairs; URLs already queued (in any state) are left alone
+        now = time.time()
+        rows = []
+        for item in items:
+            url, payload = item if isinstance(item, (list, tuple)) else (item, None)
+            rows.append((site, kind, url, None if payload is None else json.dumps(payload, ensure_ascii=False), now, now))
+        with self._lock:
+            before = self.db.total_changes
+            with self.db:
+                self.db.executemany(
+                    "INSERT OR IGNORE INTO jobs (site, kind, url, payload, enqueued_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+            return self.db.total_changes - before
+
+    def lease(self, site, kind, worker, limit=None):
+        # Expired leases are released first: back to pending, or failed once they used up their deliveries
+        now = time.time()
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                self.db.execute(
+                    "UPDATE jobs SET state = ?, error = 'lease expired', lease_owner = NULL, updated_at = ? "
+                    "WHERE site = ? AND kind = ? AND state = ? AND lease_expires < ? AND deliveries >= ?",
+                    (FAILED, now, site, kind, LEASED, now, self.max_deliveries),
+                )
+                self.db.execute(
+                    "UPDATE jobs SET state = ?, lease_owner = NULL, updated_at = ? "
+                    "WHERE site = ? AND kind = ? AND state = ? AND lease_expires < ?",
+                    (PENDING, now, site, kind, LEASED, now),
+                )
+                rows = self.db.execute(
+                    "SELECT url, payload FROM jobs WHERE site = ? AND kind = ? AND state = ? ORDER BY rowid LIMIT ?",
+                    (site, kind, PENDING, -1 if limit is None else limit),
+                ).fetchall()
+                self.db.executemany(
+                    "UPDATE jobs SET state = ?, deliveries = deliveries + 1, lease_owner = ?, lease_expires = ?, updated_at = ? "
+                    "WHERE site = ? AND kind = ? AND url = ?",
+                    [(LEASED, worker, now + self.lease_seconds, now, site, kind, url) for url, _ in rows],
+                )
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+        return [(url, None if payload is None else json.loads(payload)) for url, payload in rows]
+
+    def extend(self, worker):
+        # Heartbeat: pushes out every lease the worker still holds
+        now = time.time()
+        with self._lock:
+            return self.db.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE lease_owner = ? AND state = ?",
+                (now + self.lease_seconds, now, worker, LEASED),
+            ).rowcount
+
+    def ack(self, site, kind, url, worker, result=None):
+        # False when the lease was lost (expired and handed to someone else); the result is then dropped
+        with self._lock:
+            return self.db.execute(
+                "UPDATE jobs SET state = ?, result = ?, error = NULL, lease_owner = NULL, updated_at = ? "
+                "WHERE site = ? AND kind = ? AND url = ? AND state = ? AND lease_owner = ?",
+                (DONE, None if result is None else json.dumps(result, ensure_ascii=False), time.time(),
+                 site, kind, url, LEASED, worker),
+            ).rowcount == 1
+
+    def nack(self, site, kind, url, worker, error=None):
+        # Straight back on the queue for another worker while deliveries remain
+        with self._lock:
+            return self.db.execute(
+                "UPDATE jobs SET state = CASE WHEN deliveries >= ? THEN ? ELSE ? END, error = ?, lease_owner = NULL, "
+                "updated_at = ? WHERE site = ? AND kind = ? AND url = ? AND state = ? AND lease_owner = ?",
+                (self.max_deliveries, FAILED, PENDING, None if error is None else str(error)[:500], time.time(),
+                 site, kind, url, LEASED, worker),
+            ).rowcount == 1
+
+    def results(self, site, kind):
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT result FROM jobs WHERE site = ? AND kind = ? AND state = ? AND result IS NOT NULL ORDER BY rowid",
+                (site, kind, DONE),
+            ).fetchall()
+        return [json.loads(result) for (result,) in rows]
+
+    def payloads(self, site, kind, state=None):
+        query = "SELECT payload FROM jobs WHERE site = ? AND kind = ? AND payload IS NOT NULL"
+        params = (site, kind)
+        if state is not None:
+            query += " AND state = ?"
+            params += (state,)
+        with self._lock:
+            rows = self.db.execute(query + " ORDER BY rowid", params).fetchall()
+        return [json.loads(payload) for (payload,) in rows]
+
+    def counts(self, site, kind):
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT state, COUNT(*) FROM jobs WHERE site = ? AND kind = ? GROUP BY state", (site, kind)
+            ).fetchall()
+            redelivered, expired = self.db.execute(
+                "SELECT COALESCE(SUM(CASE WHEN deliveries > 1 THEN deliveries - 1 ELSE 0 END), 0), "
+                "COUNT(CASE WHEN state = ? AND lease_expires < ? THEN 1 END) FROM jobs WHERE site = ? AND kind = ?",
+                (LEASED, time.time(), site, kind),
+            ).fetchone()
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0, **dict(rows), "redelivered": redelivered}
+        # Expired leases are handed out again by the next lease() call
+        counts["available"] = counts[PENDING] + expired
+        return counts
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def reset(self, site):
+        with self._lock:
+            self.db.execute("DELETE FROM jobs WHERE site = ?", (site,))
+
+    def close(self):
+        self.db.close()
+
+
+_BROKER_METHODS = {"put", "lease", "extend", "ack", "nack", "results", "payloads", "counts", "set_meta", "get_meta", "reset"}
+
+
+class HttpBroker:
+    # Same methods as FileBroker, each one a JSON POST to a `serve` process
+    def __init__(self, url, timeout=30, token=None):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.token = token or os.environ.get(TOKEN_ENV)
+
+    def _call(self, method, **kwargs):
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        request = urllib.request.Request(
+            f"{self.url}/{method}", data=json.dumps(kwargs).encode("utf-8"), headers=headers, method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            body = json.loads(response.read())
+        if "error" in body:
+            raise RuntimeError(f"broker {method} failed: {body['error']}")
+        return body["result"]
+
+    def __getattr__(self, method):
+        if method not in _BROKER_METHODS:
+            raise AttributeError(method)
+        return lambda *args, **kwargs: self._call(method, **dict(zip(_ARGS[method], args)), **kwargs)
+
+    def lease(self, site, kind, worker, limit=None):
+        return [tuple(row) for row in self._call("lease", site=site, kind=kind, worker=worker, limit=limit)]
+
+    def close(self):
+        pass
+
+
+_ARGS = {
+    "put": ("site", "kind", "items"),
+    "extend": ("worker",),
+    "ack": ("site", "kind", "url", "worker", "result"),
+    "nack": ("site", "kind", "url", "worker", "error"),
+    "results": ("site", "kind"),
+    "payloads": ("site", "kind", "state"),
+    "counts": ("site", "kind"),
+    "set_meta": ("key", "value"),
+    "get_meta": ("key",),
+    "reset": ("site",),
+}
+
+
+def connect(address):
+    if address.startswith(("http://", "https://")):
+        return HttpBroker(address)
+    return FileBroker(address)
+
+
+def serve(path, host="127.0.0.1", port=8765, lease_seconds=None, max_deliveries=None, token=None):
+    # The broker hands out reset / put to anyone who can reach it, so other interfaces need a shared token
+    token = token or os.environ.get(TOKEN_ENV)
+    if not token and host not in _LOOPBACK_HOSTS:
+        raise ValueError(f"serving on {host} needs a shared token: set {TOKEN_ENV} here and on every client")
+    broker = FileBroker(path, lease_seconds, max_deliveries)
+    expected = f"Bearer {token}".encode("utf-8") if token else None
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            method = self.path.strip("/")
+            if expected and not hmac.compare_digest(self.headers.get("Authorization", "").encode("utf-8"), expected):
+                self.send_error(403, "missing or wrong broker token")
+                return
+            try:
+                if method not in _BROKER_METHODS:
+                    raise ValueError(f"unknown method {method!r}")
+                kwargs = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                body = {"result": getattr(broker, method)(**kwargs)}
+            except Exception as e:
+                body = {"error": str(e)}
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    print(f"📡 Broker on http://{host}:{server.server_address[1]} ({path}, {broker.lease_seconds}s leases"
+          + (", token required)" if token else ")"))
+    return server
+
+
+class SiteQueue:
+    # Frontier-shaped view of one site's rows, which is what the scrapers' listing_worker / pdp_worker expect
+    def __init__(self, broker, site, worker=None):
+        self.broker = broker
+        self.site = site
+        self.worker = worker or worker_id()
+
+    def enqueue(self, kind, items):
+        return self.broker.put(self.site, kind, list(items))
+
+    def claim(self, kind, limit=None):
+        return self.broker.lease(self.site, kind, self.worker, limit)
+
+    def claims(self, kind):
+        while True:
+            batch = self.claim(kind, 1)
+            if not batch:
+                return
+            yield batch[0]
+
+    def complete(self, kind, url, result=None):
+        if not self.broker.ack(self.site, kind, url, self.worker, result):
+            print(f"⚠️ Lease on {url} was lost before it finished; another worker has it")
+
+    def fail(self, kind, url, error):
+        self.broker.nack(self.site, kind, url, self.worker, str(error))
+
+    def results(self, kind):
+        return self.broker.results(self.site, kind)
+
+    def payloads(self, kind, state=None):
+        return self.broker.payloads(self.site, kind, state)
+
+    def counts(self, kind):
+        return self.broker.counts(self.site, kind)
+
+    def summary(self, kind):
+        c = self.counts(kind)
+        return (f"📡 Queue [{self.site}/{kind}]: {c[DONE]} done, {c[FAILED]} failed, "
+                f"{c[PENDING] + c[LEASED]} left, {c['redelivered']} redeliveries")
+
+
+class Heartbeat:
+    # Background thread renewing this worker's leases while a stage runs; it has its own broker connection
+    def __init__(self, address, worker, interval=HEARTBEAT_SECONDS):
+        self.address = address
+        self.worker = worker
+        self.interval = interval
+        self.beats = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lease-heartbeat", daemon=True)
+
+    def _run(self):
+        broker = connect(self.address)
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    broker.extend(self.worker)
+                    self.beats += 1
+                except Exception as e:
+                    print(f"⚠️ Heartbeat failed: {e}")
+        finally:
+            broker.close()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def wait_until_drained(queue, kind, poll=POLL_SECONDS):
+    while True:
+        c = queue.counts(kind)
+        if not c[PENDING] and not c[LEASED]:
+            return c
+        print(f"⏳ {queue.site} {kind}: {c[DONE]} done, {c[PENDING]} pending, {c[LEASED]} leased, {c[FAILED]} failed")
+        time.sleep(poll)
+
+
+def coordinate(site, links, output_dir, address, limit=None, settings=None, fresh=True, poll=POLL_SECONDS):
+    module = importlib.import_module(SCRAPER_MODULES[site])
+    os.makedirs(output_dir, exist_ok=True)
+    broker = connect(address)
+    queue = SiteQueue(broker, site, "coordinator")
+    if fresh:
+        broker.reset(site)
+    started = time.perf_counter()
+
+    # Workers read the job (limit, setting overrides) from the broker before running a stage for it
+    broker.set_meta(f"job:{site}", {"state": "running", "limit": limit, "settings": settings or {}})
+    queue.enqueue("listing", links)
+    wait_until_drained(queue, "listing", poll)
+    print(queue.summary("listing"))
+
+    dedup = module.open_dedup(output_dir)
+    print(f"➕ {enqueue_pdps(queue, dedup)} PDPs queued")
+    wait_until_drained(queue, "pdp", poll)
+    print(queue.summary("pdp"))
+
+    module.write_outputs(queue, output_dir)
+    for item in queue.payloads("pdp", DONE):
+        dedup.remember(item)
+    print(dedup.summary())
+    dedup.close()
+    broker.set_meta(f"job:{site}", {"state": "finished", "limit": limit, "settings": settings or {}})
+    broker.close()
+    print(f"🏁 {site}: coordinated run done in {time.perf_counter() - started:.1f}s")
+
+
+def shutdown_workers(broker):
+    # Workers stop once this counter differs from the value they saw when they started. A counter rather
+    # than a flag, so a worker started the next night is not sent home by last night's stop
+    generation = (broker.get_meta("shutdown") or 0) + 1
+    broker.set_meta("shutdown", generation)
+    print(f"🛑 Workers told to stop (shutdown #{generation})")
+    return generation
+
+
+def work(address, work_dir, sites=None, poll=POLL_SECONDS, heartbeat=HEARTBEAT_SECONDS):
+    # Runs whatever stage has work for each site, polling between jobs, until a coordinator calls shutdown_workers().
+    # Finished jobs say nothing about the next one: a coordinator may not have posted it yet
+    broker = connect(address)
+    me = worker_id()
+    started_under = broker.get_meta("shutdown")
+    beat = Heartbeat(address, me, heartbeat).start()
+    processed = 0
+    try:
+        while broker.get_meta("shutdown") == started_under:
+            busy = False
+            jobs = {site: broker.get_meta(f"job:{site}") for site in (sites or SCRAPER_MODULES)}
+            running = {site: job for site, job in jobs.items() if job and job["state"] != "finished"}
+            for site, job in running.items():
+                module = importlib.import_module(SCRAPER_MODULES[site])
+                apply_settings(module, job["settings"])
+                queue = SiteQueue(broker, site, me)
+                site_dir = os.path.join(work_dir, site)
+                os.makedirs(site_dir, exist_ok=True)
+                if queue.counts("listing")["available"]:
+                    processed += asyncio.run(module.listing_worker(queue, site_dir, job["limit"]))
+                    busy = True
+                if queue.counts("pdp")["available"]:
+                    processed += asyncio.run(module.pdp_worker(queue, site_dir))
+                    busy = True
+            if not busy:
+                time.sleep(poll)
+    finally:
+        beat.stop()
+        broker.close()
+    print(f"👷 Worker {me}: {processed} rows processed, {beat.beats} heartbeats")
+    return processed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Coordinator / worker runs over a shared lease queue")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_cmd = commands.add_parser("serve", help="expose a SQLite queue file over HTTP")
+    serve_cmd.add_argument("--db", required=True)
+    serve_cmd.add_argument("--host", default="127.0.0.1",
+                           help=f"interface to listen on; anything but loopback needs {TOKEN_ENV} set")
+    serve_cmd.add_argument("--port", type=int, default=8765)
+    serve_cmd.add_argument("--lease", type=float, help=f"lease length in seconds (default {LEASE_SECONDS})")
+    serve_cmd.add_argument("--max-deliveries", type=int, help=f"deliveries before a row fails (default {MAX_DELIVERIES})")
+
+    coordinate_cmd = commands.add_parser("coordinate", help="queue a job file's links and collect the results")
+    coordinate_cmd.add_argument("job_file")
+    coordinate_cmd.add_argument("--broker", required=True, help="queue file path or http://host:port")
+    coordinate_cmd.add_argument("--resume", action="store_true", help="keep rows already on the broker")
+    coordinate_cmd.add_argument("--keep-workers", action="store_true",
+                                help="leave the workers polling afterwards, for another job file")
+
+    shutdown_cmd = commands.add_parser("shutdown", help="tell every worker on the broker to stop")
+    shutdown_cmd.add_argument("--broker", required=True, help="queue file path or http://host:port")
+
+    work_cmd = commands.add_parser("work", help="lease and process rows until a coordinator tells workers to stop")
+    work_cmd.add_argument("--broker", required=True, help="queue file path or http://host:port")
+    work_cmd.add_argument("--work-dir", default="worker_data", help="local cache / fingerprint files")
+    work_cmd.add_argument("--site", action="append", choices=sorted(SCRAPER_MODULES))
+    work_cmd.add_argument("--heartbeat", type=float, default=HEARTBEAT_SECONDS)
+    work_cmd.add_argument("--poll", type=float, default=POLL_SECONDS)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        server = serve(args.db, args.host, args.port, args.lease, args.max_deliveries)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.shutdown()
+    elif args.command == "coordinate":
+        from run_job import load_job_file, parse_jobs
+
+        for job in parse_jobs(load_job_file(args.job_file)):
+            coordinate(job["site"], job["links"], job["output_dir"], args.broker, job["limit"], job["settings"],
+                       fresh=not args.resume)
+        if not args.keep_workers:
+            broker = connect(args.broker)
+            shutdown_workers(broker)
+            broker.close()
+    elif args.command == "shutdown":
+        broker = connect(args.broker)
+        shutdown_workers(broker)
+        broker.close()
+    else:
+        work(args.broker, args.work_dir, args.site, args.poll, args.heartbeat)